@@ -1,567 +1,1546 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS, cross_origin
-import pickle
-import numpy as np
-import os
-
-import tensorflow as tf
-# from tensorflow.lite.interpreter import Interpreter
-from ai_edge_litert.interpreter import Interpreter
-from tensorflow.keras.preprocessing import image
-import io
-from PIL import Image
-
-app = Flask(__name__)
-cors = CORS(app)
-
-# Define model paths - update if your models are in a different directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-crop_model_path = os.path.join(current_dir, "crop-recommendation.pkl")
-fert_model_path = os.path.join(current_dir, "fertilizer-recommendation.pkl")
-plant_model_path = os.path.join(current_dir, "medicinal-plant-prediction.tflite")
-
-# Check if model files exist
-if not os.path.exists(crop_model_path):
-    print(f"Error: Crop model file not found at {crop_model_path}")
-    
-if not os.path.exists(fert_model_path):
-    print(f"Error: Fertilizer model file not found at {fert_model_path}")
-
-if not os.path.exists(plant_model_path):
-    print(f"Error: Plant classification model file not found at {plant_model_path}")
-
-# Load the crop recommendation model
-try:
-    with open(crop_model_path, "rb") as f:
-        crop_model = pickle.load(f)
-    print("Crop recommendation model loaded successfully!")
-except Exception as e:
-    print(f"Error loading crop recommendation model: {e}")
-    crop_model = None
-
-# Load the fertilizer recommendation model
-try:
-    with open(fert_model_path, "rb") as f:
-        fertilizer_model = pickle.load(f)
-    print("Fertilizer recommendation model loaded successfully!")
-except Exception as e:
-    print(f"Error loading fertilizer recommendation model: {e}")
-    fertilizer_model = None
-
-
-try:
-    # Load TFLite model and allocate tensors
-    plant_interpreter = Interpreter(model_path=plant_model_path)
-    plant_interpreter.allocate_tensors()
-    print("Plant classification TFLite model loaded successfully!")
-
-    # Get input and output tensors
-    input_details = plant_interpreter.get_input_details()
-    output_details = plant_interpreter.get_output_details()
-
-    # Load class names
-    # with open(plant_classes_path, 'r') as f:
-    #     PLANT_NAMES = json.load(f)
-    # print(f"Loaded {len(PLANT_NAMES)} plant classes")
-except Exception as e:
-    print(f"Error loading plant classification model: {e}")
-    plant_interpreter = None
-    PLANT_NAMES = []
-
-# Crop dictionary for reverse mapping
-crop_dict = {
-    1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 
-    6: "Papaya", 7: "Orange", 8: "Apple", 9: "Muskmelon", 
-    10: "Watermelon", 11: "Grapes", 12: "Mango", 13: "Banana",
-    14: "Pomegranate", 15: "Lentil", 16: "Blackgram", 17: "Mungbean", 
-    18: "Mothbeans", 19: "Pigeonpeas", 20: "Kidneybeans", 
-    21: "Chickpea", 22: "Coffee"
-}
-
-# Fertilizer dictionary for reverse mapping
-fertilizer_dict = {
-    'Urea': 'Urea is a high-nitrogen fertilizer that is suitable for promoting leafy growth.',
-    'DAP': 'Diammonium Phosphate (DAP) provides both nitrogen and phosphorus, promoting root development and overall plant growth.',
-    '14-35-14': 'This NPK fertilizer has a balanced ratio (14% Nitrogen, 35% Phosphorus, 14% Potassium) good for flowering and fruiting.',
-    '28-28': 'This fertilizer has equal parts of nitrogen and phosphorus (28% each) but no potassium.',
-    '17-17-17': 'A balanced NPK fertilizer (17% each) suitable for overall plant development.',
-    '20-20': 'Contains equal parts of nitrogen and phosphorus (20% each) but no potassium.',
-    '10-26-26': 'NPK fertilizer with emphasis on phosphorus and potassium, good for root development and disease resistance.'
-}
-
-# Soil type mapping (for fertilizer recommendation)
-soil_dict = {
-    'Loamy': 1,
-    'Sandy': 2,
-    'Clayey': 3,
-    'Black': 4,
-    'Red': 5
-}
-
-# Crop type mapping (for fertilizer recommendation)
-crop_type_dict = {
-    'Sugarcane': 1,
-    'Cotton': 2,
-    'Millets': 3,
-    'Paddy': 4,
-    'Pulses': 5,
-    'Wheat': 6,
-    'Tobacco': 7,
-    'Barley': 8,
-    'Oil seeds': 9,
-    'Ground Nuts': 10,
-    'Maize': 11
-}
-
-PLANT_NAMES = ['Alpinia Galanga (Rasna)', 'Amaranthus Viridis (Arive-Dantu)', 'Artocarpus Heterophyllus (Jackfruit)', 'Azadirachta Indica (Neem)', 'Basella Alba (Basale)', 'Brassica Juncea (Indian Mustard)', 'Carissa Carandas (Karanda)', 'Citrus Limon (Lemon)', 'Ficus Auriculata (Roxburgh fig)', 'Ficus Religiosa (Peepal Tree)', 'Hibiscus Rosa-sinensis', 'Jasminum (Jasmine)', 'Mangifera Indica (Mango)', 'Mentha (Mint)', 'Moringa Oleifera (Drumstick)', 'Muntingia Calabura (Jamaica Cherry-Gasagase)', 'Murraya Koenigii (Curry)', 'Nerium Oleander (Oleander)', 'Nyctanthes Arbor-tristis (Parijata)', 'Ocimum Tenuiflorum (Tulsi)', 'Piper Betle (Betel)', 'Plectranthus Amboinicus (Mexican Mint)', 'Pongamia Pinnata (Indian Beech)', 'Psidium Guajava (Guava)', 'Punica Granatum (Pomegranate)', 'Santalum Album (Sandalwood)', 'Syzygium Cumini (Jamun)', 'Syzygium Jambos (Rose Apple)', 'Tabernaemontana Divaricata (Crape Jasmine)', 'Trigonella Foenum-graecum (Fenugreek)']
-AYURVEDIC_INFO = {
-    'Alpinia Galanga (Rasna)': {
-        'description': 'Alpinia Galanga, commonly known as Rasna in Ayurveda, is a rhizomatous herb.',
-        'uses': [
-            'Treats rheumatoid arthritis and joint pain',
-            'Helps with respiratory disorders',
-            'Improves digestion and appetite',
-            'Has antimicrobial and anti-inflammatory properties'
-        ]
-    },
-    'Amaranthus Viridis (Arive-Dantu)': {
-        'description': 'Amaranthus Viridis is an annual herb known for its leafy greens.',
-        'uses': [
-            'Rich source of dietary nutrients',
-            'Treats digestive disorders',
-            'Helps reduce inflammation',
-            'Supports liver function'
-        ]
-    },
-    'Artocarpus Heterophyllus (Jackfruit)': {
-        'description': 'Artocarpus Heterophyllus, commonly known as Jackfruit, is a large tropical fruit tree.',
-        'uses': [
-            'Builds strength and improves energy levels',
-            'Treats skin diseases',
-            'Aids in digestion',
-            'Balances Kapha and Pitta doshas'
-        ]
-    },
-    'Azadirachta Indica (Neem)': {
-        'description': 'Azadirachta Indica, or Neem, is revered as a versatile medicinal plant.',
-        'uses': [
-            'Purifies blood and detoxifies the body',
-            'Treats skin disorders and infections',
-            'Has antibacterial and antifungal properties',
-            'Helps manage diabetes'
-        ]
-    },
-    'Basella Alba (Basale)': {
-        'description': 'Basella Alba is a fast-growing perennial vine cultivated as a vegetable.',
-        'uses': [
-            'Helps in treating ulcers',
-            'Relieves constipation',
-            'Contains anti-inflammatory properties',
-            'Supports healthy blood formation'
-        ]
-    },
-    'Brassica Juncea (Indian Mustard)': {
-        'description': 'Brassica Juncea is a species of mustard plant cultivated for its seeds and leaves.',
-        'uses': [
-            'Improves digestion and stimulates appetite',
-            'Relieves congestion and respiratory issues',
-            'Helps treat skin infections',
-            'Reduces muscle and joint pain'
-        ]
-    },
-    'Carissa Carandas (Karanda)': {
-        'description': 'Carissa Carandas is a flowering shrub that bears small berry-sized fruits.',
-        'uses': [
-            'Treats anemia and improves blood count',
-            'Helps with indigestion and gastric issues',
-            'Has anti-inflammatory properties',
-            'Used for fever and diarrhea'
-        ]
-    },
-    'Citrus Limon (Lemon)': {
-        'description': 'Citrus Limon is a small evergreen tree that produces the popular citrus fruit lemon.',
-        'uses': [
-            'Detoxifies the body and stimulates liver function',
-            'Improves digestion and relieves constipation',
-            'Treats respiratory issues and throat infections',
-            'Rich in Vitamin C and antioxidants'
-        ]
-    },
-    'Ficus Auriculata (Roxburgh fig)': {
-        'description': 'Ficus Auriculata is a fig species native to Southeast Asia.',
-        'uses': [
-            'Treats digestive disorders',
-            'Has cooling properties',
-            'Helps with bleeding disorders',
-            'Used for urinary tract infections'
-        ]
-    },
-    'Ficus Religiosa (Peepal Tree)': {
-        'description': 'Ficus Religiosa is a sacred tree in many South Asian cultures.',
-        'uses': [
-            'Treats neurological disorders',
-            'Helps with diabetes management',
-            'Reduces inflammation',
-            'Used for asthma and respiratory conditions'
-        ]
-    },
-    'Hibiscus Rosa-sinensis': {
-        'description': 'Hibiscus Rosa-sinensis is an ornamental flowering plant with medicinal properties.',
-        'uses': [
-            'Cools the body and reduces pitta dosha',
-            'Promotes hair growth and prevents greying',
-            'Helps regulate menstrual cycles',
-            'Treats coughs and respiratory issues'
-        ]
-    },
-    'Jasminum (Jasmine)': {
-        'description': 'Jasminum is a genus of fragrant flowering plants known for their beautiful blooms.',
-        'uses': [
-            'Calms the mind and reduces anxiety',
-            'Treats eye disorders',
-            'Helps with skin problems',
-            'Used as a uterine tonic'
-        ]
-    },
-    'Mangifera Indica (Mango)': {
-        'description': 'Mangifera Indica is a tropical fruit tree that produces the popular mango fruit.',
-        'uses': [
-            'Improves digestion and treats digestive disorders',
-            'Has cooling properties that balance Pitta dosha',
-            'Beneficial for skin health',
-            'Strengthens the heart and cardiovascular system'
-        ]
-    },
-    'Mentha (Mint)': {
-        'description': 'Mentha, commonly known as Mint, is an aromatic herb used extensively in Ayurveda.',
-        'uses': [
-            'Treats digestive issues and improves digestion',
-            'Relieves respiratory problems',
-            'Has cooling properties',
-            'Helps with headaches and migraines'
-        ]
-    },
-    'Moringa Oleifera (Drumstick)': {
-        'description': 'Moringa Oleifera is a nutrient-rich plant known as a "miracle tree".',
-        'uses': [
-            'Provides essential nutrients and vitamins',
-            'Treats inflammation and joint pain',
-            'Helps manage blood sugar levels',
-            'Supports liver health and detoxification'
-        ]
-    },
-    'Muntingia Calabura (Jamaica Cherry-Gasagase)': {
-        'description': 'Muntingia Calabura is a fast-growing tropical tree with edible fruits.',
-        'uses': [
-            'Reduces inflammation',
-            'Treats headaches and cold symptoms',
-            'Has antioxidant properties',
-            'Helps with gastrointestinal issues'
-        ]
-    },
-    'Murraya Koenigii (Curry)': {
-        'description': 'Murraya Koenigii, known as curry leaf tree, is aromatic and used in many dishes.',
-        'uses': [
-            'Improves digestion and treats digestive disorders',
-            'Manages diabetes and blood glucose levels',
-            'Beneficial for hair health',
-            'Treats infections and inflammation'
-        ]
-    },
-    'Nerium Oleander (Oleander)': {
-        'description': 'Nerium Oleander is an evergreen shrub that contains potent bioactive compounds.',
-        'uses': [
-            'CAUTION: Highly toxic plant, used only in extremely diluted preparations',
-            'External application for skin diseases (by experts only)',
-            'Used in extremely small doses for specific heart conditions (by specialized practitioners)',
-            'Most preparations require extensive purification and expert preparation'
-        ]
-    },
-    'Nyctanthes Arbor-tristis (Parijata)': {
-        'description': 'Nyctanthes Arbor-tristis is a night-flowering jasmine tree.',
-        'uses': [
-            'Treats fevers, especially malaria',
-            'Used for arthritis and joint pain',
-            'Helps with constipation',
-            'Has anti-inflammatory properties'
-        ]
-    },
-    'Ocimum Tenuiflorum (Tulsi)': {
-        'description': 'Ocimum Tenuiflorum, Holy Basil or Tulsi, is a sacred plant in Hindu tradition.',
-        'uses': [
-            'Treats respiratory conditions like bronchitis and asthma',
-            'Reduces stress and anxiety',
-            'Helps with fever and common cold',
-            'Has adaptogenic and anti-inflammatory properties'
-        ]
-    },
-    'Piper Betle (Betel)': {
-        'description': 'Piper Betle is a perennial, dioecious creeper with glossy heart-shaped leaves.',
-        'uses': [
-            'Improves digestive function',
-            'Treats respiratory conditions',
-            'Has antimicrobial properties',
-            'Used as a mouth freshener and oral health aid'
-        ]
-    },
-    'Plectranthus Amboinicus (Mexican Mint)': {
-        'description': 'Plectranthus Amboinicus is a semi-succulent perennial plant with medicinal properties.',
-        'uses': [
-            'Treats cough, cold and respiratory ailments',
-            'Helps with digestive issues',
-            'Has antimicrobial properties',
-            'Used for urinary problems'
-        ]
-    },
-    'Pongamia Pinnata (Indian Beech)': {
-        'description': 'Pongamia Pinnata is a legume tree with numerous medicinal applications.',
-        'uses': [
-            'Treats skin diseases and wounds',
-            'Has anti-inflammatory properties',
-            'Used for rheumatic conditions',
-            'Helps with gastrointestinal worms'
-        ]
-    },
-    'Psidium Guajava (Guava)': {
-        'description': 'Psidium Guajava is a tropical fruit tree with edible fruits and medicinal leaves.',
-        'uses': [
-            'Controls diabetes and improves insulin sensitivity',
-            'Treats diarrhea and dysentery',
-            'Helps with dental problems',
-            'Has antimicrobial and anti-inflammatory properties'
-        ]
-    },
-    'Punica Granatum (Pomegranate)': {
-        'description': 'Punica Granatum is a fruit-bearing shrub with multiple medicinal benefits.',
-        'uses': [
-            'Treats digestive disorders like diarrhea',
-            'Helps with parasitic infections',
-            'Used for throat infections',
-            'Has antioxidant properties'
-        ]
-    },
-    'Santalum Album (Sandalwood)': {
-        'description': 'Santalum Album is a fragrant wood with cooling properties in Ayurveda.',
-        'uses': [
-            'Cools the body and reduces Pitta dosha',
-            'Treats skin disorders and rashes',
-            'Used for urinary tract infections',
-            'Calms the mind and reduces stress'
-        ]
-    },
-    'Syzygium Cumini (Jamun)': {
-        'description': 'Syzygium Cumini, also known as Jamun or Black Plum, is a tropical tree with edible fruits.',
-        'uses': [
-            'Manages diabetes and blood sugar levels',
-            'Treats digestive disorders',
-            'Has astringent properties for dental health',
-            'Helps with urinary problems'
-        ]
-    },
-    'Syzygium Jambos (Rose Apple)': {
-        'description': 'Syzygium Jambos produces rose apple fruits and has medicinal properties.',
-        'uses': [
-            'Treats digestive disorders',
-            'Has anti-inflammatory properties',
-            'Used for respiratory conditions',
-            'Helps with fever'
-        ]
-    },
-    'Tabernaemontana Divaricata (Crape Jasmine)': {
-        'description': 'Tabernaemontana Divaricata is an evergreen shrub with fragrant white flowers.',
-        'uses': [
-            'Reduces pain and inflammation',
-            'Treats eye diseases',
-            'Used for skin conditions',
-            'Has calming effects on the nervous system'
-        ]
-    },
-    'Trigonella Foenum-graecum (Fenugreek)': {
-        'description': 'Trigonella Foenum-graecum, or Fenugreek, is an annual plant in the family Fabaceae.',
-        'uses': [
-            'Increases breast milk production in nursing mothers',
-            'Manages diabetes and blood glucose levels',
-            'Improves digestion and reduces inflammation',
-            'Helps lower cholesterol levels'
-        ]
-    }
-}
-
-@app.route('/')
-def home():
-    return jsonify({
-        "status": "success",
-        "message": "Welcome to AgriAI API",
-        "endpoints": {
-            "/crop-recommendation": "POST - Get crop recommendations",
-            "/fertilizer-recommendation": "POST - Get fertilizer recommendations",
-            "/medicinal-plant-prediction": "POST - Get medicinal plant predictions"
-        }
-    })
-
-@app.route('/crop-recommendation', methods=['POST'])
-def crop_recommendation():
-    try:
-        # Get input data from request
-        data = request.get_json()
-        
-        # Extract features
-        N = int(data['nitrogen'])
-        P = int(data['phosphorus'])
-        K = int(data['potassium'])
-        temperature = float(data['temperature'])
-        humidity = float(data['humidity'])
-        ph = float(data['ph'])
-        rainfall = float(data['rainfall'])
-        
-        # Make prediction
-        features = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
-        prediction = crop_model.predict(features)[0]
-        
-        # Get the crop name
-        crop = crop_dict.get(prediction, "Unknown crop")
-        
-        return jsonify({
-            "status": "success",
-            "recommendation": {
-                "crop": crop,
-                "crop_id": int(prediction)
-            },
-            "message": f"{crop} is recommended for the given soil and environmental conditions."
-        })
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 400
-
-@app.route('/fertilizer-recommendation', methods=['POST'])
-def fertilizer_recommendation():
-    try:
-        # Get input data from request
-        data = request.get_json()
-        
-        # Extract features
-        temperature = int(data['temperature'])
-        humidity = int(data['humidity'])
-        moisture = int(data['moisture'])
-        nitrogen = int(data['nitrogen'])
-        potassium = int(data['potassium'])
-        phosphorous = int(data['phosphorous'])
-        
-        # Convert soil_type and crop_type to numerical values
-        soil_type = data['soil_type']
-        crop_type = data['crop_type']
-        
-        soil_num = soil_dict.get(soil_type, 0)
-        crop_num = crop_type_dict.get(crop_type, 0)
-        
-        if soil_num == 0:
-            return jsonify({
-                "status": "error",
-                "message": f"Invalid soil type. Valid types are: {list(soil_dict.keys())}"
-            }), 400
-            
-        if crop_num == 0:
-            return jsonify({
-                "status": "error",
-                "message": f"Invalid crop type. Valid types are: {list(crop_type_dict.keys())}"
-            }), 400
-        
-        # Make prediction
-        features = np.array([[temperature, humidity, moisture, nitrogen, potassium, phosphorous, soil_num, crop_num]])
-        prediction = fertilizer_model.predict(features)[0]
-        
-        # Get fertilizer details
-        fertilizer_info = fertilizer_dict.get(prediction, "No specific recommendation")
-        
-        return jsonify({
-            "status": "success",
-            "recommendation": {
-                "fertilizer": prediction,
-                "description": fertilizer_info
-            },
-            "message": f"{prediction} is recommended for the given conditions."
-        })
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 400
-
-@app.route('/medicinal-plant-prediction', methods=['POST'])
-def predict_plant():
-    if 'file' not in request.files:
-        return jsonify({'error': 'Image file not found'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
-    # Read and preprocess the image
-    try:
-        img_bytes = file.read()
-        img = Image.open(io.BytesIO(img_bytes))
-        img = img.resize((256, 256)) # 224
-        img_array = image.img_to_array(img)
-
-        # Handle preprocessing based on input shape
-        if input_details[0]['shape'][3] == 3:  # RGB input
-            # Normalize to [0,1]
-            img_array = img_array / 255.0
-        else:  # If model expects different preprocessing
-            img_array = preprocess_input(img_array)
-
-        # Ensure correct data type
-        input_dtype = input_details[0]['dtype']
-        img_array = img_array.astype(input_dtype)
-
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Make prediction using TFLite
-        plant_interpreter.set_tensor(input_details[0]['index'], img_array)
-        plant_interpreter.invoke()
-        predictions = plant_interpreter.get_tensor(output_details[0]['index'])
-
-        predicted_class = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class])
-        class_name = PLANT_NAMES[predicted_class]
-        
-        ayurvedic_info = AYURVEDIC_INFO.get(class_name, {
-            'description': 'No detailed information available.',
-            'uses': ['Information not available']
-        })
-        
-        top_3_indices = np.argsort(predictions[0])[-3:][::-1]
-        top_3_predictions = [
-            {
-                "class_name": PLANT_NAMES[idx],
-                "confidence": float(predictions[0][idx]),
-                "class_index": int(idx),
-                "ayurvedic_info": AYURVEDIC_INFO.get(PLANT_NAMES[idx], {
-                    'description': 'No detailed information available.',
-                    'uses': ['Information not available']
-                })
-            } for idx in top_3_indices
-        ]
-
-        return jsonify({
-            "status": "success",
-            "prediction": {
-                "class_name": class_name,
-                "confidence": confidence,
-                "class_index": int(predicted_class),
-                "ayurvedic_info": ayurvedic_info
-            },
-            "top_predictions": top_3_predictions
-        }), 200
-        
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-if __name__ == '__main__':
-    app.run(debug=True)
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask_cors import CORS, cross_origin
+from PIL import Image, UnidentifiedImageError
+import pickle
+import numpy as np
+import os
+import io
+import hashlib
+import csv
+import itertools
+import json
+import math
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from batching import MicroBatcher, QueueFull
+from categories import crop_type_dict, soil_dict
+from interpreter_pool import InterpreterPool, PoolTimeout
+from metrics import Metrics
+from model_registry import ModelRegistry
+from preprocess import (BudgetTimeout, ImagePreprocessor, ImageTooLarge, MemoryBudget, TensorFormatError,
+                        parse_npy_header, parse_shape)
+from prediction_cache import PredictionCache
+from preprocess_pool import DecodePool, SlotTimeout
+from profiling import Profiler
+from tree_engine import SizeRoutedModel, load_compiled
+
+app = Flask(__name__)
+cors = CORS(app)
+
+# Define model paths - update if your models are in a different directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+crop_model_path = os.path.join(current_dir, "crop-recommendation.pkl")
+fert_model_path = os.path.join(current_dir, "fertilizer-recommendation.pkl")
+plant_model_path = os.environ.get("PLANT_MODEL_PATH", os.path.join(current_dir, "medicinal-plant-prediction.tflite"))
+
+# Maximum number of samples accepted in a single batch request
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 1000))
+
+# Rows parsed and scored at a time by the streaming CSV endpoints
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", 1000))
+
+# Largest grid scored by one what-if sweep request
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 40000))
+
+# Field advisories of at least ADVISORY_PARALLEL_ROWS fields run the fertilizer model on one of
+# ADVISORY_THREADS pool threads while the crop model runs; smaller ones are scored in turn
+ADVISORY_PARALLEL_ROWS = int(os.environ.get("ADVISORY_PARALLEL_ROWS", 256))
+ADVISORY_THREADS = int(os.environ.get("ADVISORY_THREADS", 4))
+
+# Concurrent plant predictions are grouped into one interpreter call of at most
+# PLANT_MAX_BATCH_SIZE images, waiting up to PLANT_MAX_WAIT_MS for a batch to fill
+PLANT_MAX_BATCH_SIZE = int(os.environ.get("PLANT_MAX_BATCH_SIZE", 8))
+PLANT_MAX_WAIT_MS = float(os.environ.get("PLANT_MAX_WAIT_MS", 5))
+
+# Number of TFLite interpreters per worker process and the intra-op threads each one uses
+PLANT_POOL_SIZE = int(os.environ.get("PLANT_POOL_SIZE", 1))
+PLANT_NUM_THREADS = int(os.environ.get("PLANT_NUM_THREADS", 1))
+# Seconds a request waits for its prediction, and how many may queue, before getting a 503
+PLANT_REQUEST_TIMEOUT = float(os.environ.get("PLANT_REQUEST_TIMEOUT", 10))
+PLANT_MAX_QUEUE = int(os.environ.get("PLANT_MAX_QUEUE", 64))
+
+# Images accepted by one multi-image request, and the threads that decode them concurrently
+PLANT_BATCH_MAX_FILES = int(os.environ.get("PLANT_BATCH_MAX_FILES", 32))
+PLANT_PREPROCESS_THREADS = int(os.environ.get("PLANT_PREPROCESS_THREADS", 4))
+
+# Decode, resize and normalize plant photos in PLANT_DECODE_PROCESSES worker processes instead
+# of the request threads (0: off). They write into PLANT_DECODE_SLOTS shared-memory input
+# tensors (default: 2 per process), which also caps the images being preprocessed at once.
+PLANT_DECODE_PROCESSES = int(os.environ.get("PLANT_DECODE_PROCESSES", 0))
+PLANT_DECODE_SLOTS = int(os.environ.get("PLANT_DECODE_SLOTS", 0))
+
+# Largest request body accepted, in bytes. The streaming CSV endpoints use
+# BULK_MAX_UPLOAD_BYTES instead, since they never hold the whole upload.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 64 * 1024 * 1024))
+BULK_MAX_UPLOAD_BYTES = int(os.environ.get("BULK_MAX_UPLOAD_BYTES", 2 * 1024 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# Images are checked from their header before decoding: more than PLANT_MAX_IMAGE_PIXELS
+# pixels (after JPEG draft scaling) is rejected. Concurrent decodes in one worker may
+# hold at most UPLOAD_MEMORY_BUDGET_BYTES; further decodes wait up to PLANT_REQUEST_TIMEOUT.
+PLANT_MAX_IMAGE_PIXELS = int(os.environ.get("PLANT_MAX_IMAGE_PIXELS", 25_000_000))
+UPLOAD_MEMORY_BUDGET_BYTES = int(os.environ.get("UPLOAD_MEMORY_BUDGET_BYTES", 256 * 1024 * 1024))
+
+# Cache of model outputs keyed by image hash or feature tuple. CACHE_SHARED_PATH
+# points at a SQLite file so all workers on the host share cache hits.
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 4096))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 16 * 1024 * 1024))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 300))
+CACHE_SHARED_PATH = os.environ.get("CACHE_SHARED_PATH")
+
+# Serve the sklearn models through the flat NumPy export from compile_models.py when available
+USE_COMPILED_MODELS = os.environ.get("USE_COMPILED_MODELS", "1") == "1"
+
+# Inputs of at least COMPILED_MAX_ROWS rows (large sweeps) are scored by sklearn instead, which
+# is faster on large matrices; the pickle is loaded at warmup. 0 keeps everything compiled.
+COMPILED_MAX_ROWS = int(os.environ.get("COMPILED_MAX_ROWS", 4000))
+
+# Load every model at startup instead of on first use. Under gunicorn (see
+# gunicorn.conf.py) this also loads the app in the master, so the tree models
+# are shared by all workers, and each worker then creates its own interpreters.
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+
+# Directory where each worker writes its metrics, so /metrics can report all workers
+# together. Must be shared by the workers and emptied when the server starts.
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1))
+
+# Profiling is off unless PROFILE_DIR is set. Then requests carrying the
+# X-Profile-Token header with PROFILE_TOKEN, plus a PROFILE_SAMPLE_RATE fraction
+# of all requests, are profiled into that directory. PROFILE_MEMORY=1 also
+# records allocation sites with tracemalloc while profiling.
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY", "0") == "1"
+
+# Check if model files exist
+if not os.path.exists(crop_model_path):
+    print(f"Error: Crop model file not found at {crop_model_path}")
+    
+if not os.path.exists(fert_model_path):
+    print(f"Error: Fertilizer model file not found at {fert_model_path}")
+
+if not os.path.exists(plant_model_path):
+    print(f"Error: Plant classification model file not found at {plant_model_path}")
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def load_tree_model(pickle_path):
+    # The compiled export is only used if it was built from the current pickle
+    compiled_path = os.path.splitext(pickle_path)[0] + ".compiled"
+    if (USE_COMPILED_MODELS and os.path.exists(compiled_path)
+            and os.path.getmtime(compiled_path) >= os.path.getmtime(pickle_path)):
+        compiled = load_compiled(compiled_path)
+        if COMPILED_MAX_ROWS > 0:
+            return SizeRoutedModel(compiled, lambda: load_pickle(pickle_path), COMPILED_MAX_ROWS)
+        return compiled
+    return load_pickle(pickle_path)
+
+def load_plant_pool():
+    # A pool of TFLite interpreters, each with its own allocated tensors
+    return InterpreterPool(plant_model_path, size=PLANT_POOL_SIZE,
+                           num_threads=PLANT_NUM_THREADS, timeout=PLANT_REQUEST_TIMEOUT)
+
+def warm_up_tree_model(model):
+    # A single row and a batch, covering both the per-request and the batch endpoints
+    rows = np.random.default_rng(0).uniform(0, 100, (BULK_CHUNK_SIZE, model.n_features_in_))
+    model.predict(rows[:1])
+    model.predict(rows)
+    if isinstance(model, SizeRoutedModel):
+        # Large sweeps go to sklearn; load it now rather than in the first such request.
+        # With PRELOAD_MODELS this happens in the master, so the workers share it.
+        model.load_estimator()
+
+def make_warmup_photo(width=1024, height=768):
+    # A synthetic JPEG, so the decoder, draft scaling and resize paths all run
+    gradient = Image.linear_gradient("L")
+    img = Image.merge("RGB", [gradient, Image.radial_gradient("L"), gradient.rotate(90)])
+    buf = io.BytesIO()
+    img.resize((width, height)).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+def warm_up_plant_pool(pool):
+    photo = make_warmup_photo()
+    preprocessor = ImagePreprocessor.from_input_details(pool.input_details[0])
+    image = preprocessor(io.BytesIO(photo))
+    pool.warmup(image[np.newaxis])
+    if PLANT_DECODE_PROCESSES > 0:
+        get_plant_decode_pool(pool).warmup(photo)
+
+# Models are loaded on first use; call models.warmup() to load and warm them eagerly.
+# Interpreters own native threads, so they are never created before a fork.
+models = ModelRegistry()
+models.register("crop", lambda: load_tree_model(crop_model_path), warmup=warm_up_tree_model)
+models.register("fertilizer", lambda: load_tree_model(fert_model_path), warmup=warm_up_tree_model)
+models.register("plant", load_plant_pool, fork_safe=False, warmup=warm_up_plant_pool)
+
+metrics = Metrics(directory=METRICS_DIR, flush_interval=METRICS_FLUSH_SECONDS)
+metrics.describe("requests_total", "counter", "HTTP requests by route and status code")
+metrics.describe("request_duration_seconds", "histogram", "Time to build the response, by route")
+metrics.describe("stage_duration_seconds", "histogram", "Time spent in each stage of the inference endpoints")
+metrics.describe("model_loaded", "gauge", "Whether the model is loaded in the worker")
+metrics.describe("model_load_seconds", "gauge", "Time taken to load the model in the worker")
+metrics.describe("model_rss_delta_bytes", "gauge", "Resident memory growth while loading the model")
+metrics.describe("model_warmed_up", "gauge", "Whether the model has been warmed up in the worker")
+metrics.describe("model_warmup_seconds", "gauge", "Time taken to warm up the model in the worker")
+
+def collect_model_metrics(metrics):
+    for name, stats in models.stats()["models"].items():
+        metrics.set_gauge("model_loaded", {"model": name}, int(stats["loaded"]))
+        metrics.set_gauge("model_warmed_up", {"model": name}, int(stats["warmed_up"]))
+        if stats["loaded"]:
+            metrics.set_gauge("model_load_seconds", {"model": name}, stats["load_seconds"])
+            metrics.set_gauge("model_rss_delta_bytes", {"model": name}, stats["rss_delta_bytes"])
+        if stats["warmed_up"]:
+            metrics.set_gauge("model_warmup_seconds", {"model": name}, stats["warmup_seconds"])
+
+metrics.register_collector(collect_model_metrics)
+
+def model_fingerprint(path):
+    # Part of every cache key, so a redeployed model never serves stale shared entries
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    except OSError:
+        return "missing"
+
+prediction_cache = PredictionCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS,
+                                   CACHE_SHARED_PATH) if CACHE_ENABLED else None
+cache_prefixes = {
+    "crop": f"crop:{model_fingerprint(crop_model_path)}:",
+    "fertilizer": f"fertilizer:{model_fingerprint(fert_model_path)}:",
+    "plant": f"plant:{model_fingerprint(plant_model_path)}:"
+}
+
+def cached(model, key, compute):
+    if prediction_cache is None:
+        return compute()
+    return prediction_cache.get_or_compute(cache_prefixes[model] + key, compute)
+
+# Crop dictionary for reverse mapping
+crop_dict = {
+    1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 
+    6: "Papaya", 7: "Orange", 8: "Apple", 9: "Muskmelon", 
+    10: "Watermelon", 11: "Grapes", 12: "Mango", 13: "Banana",
+    14: "Pomegranate", 15: "Lentil", 16: "Blackgram", 17: "Mungbean", 
+    18: "Mothbeans", 19: "Pigeonpeas", 20: "Kidneybeans", 
+    21: "Chickpea", 22: "Coffee"
+}
+
+# Fertilizer dictionary for reverse mapping
+fertilizer_dict = {
+    'Urea': 'Urea is a high-nitrogen fertilizer that is suitable for promoting leafy growth.',
+    'DAP': 'Diammonium Phosphate (DAP) provides both nitrogen and phosphorus, promoting root development and overall plant growth.',
+    '14-35-14': 'This NPK fertilizer has a balanced ratio (14% Nitrogen, 35% Phosphorus, 14% Potassium) good for flowering and fruiting.',
+    '28-28': 'This fertilizer has equal parts of nitrogen and phosphorus (28% each) but no potassium.',
+    '17-17-17': 'A balanced NPK fertilizer (17% each) suitable for overall plant development.',
+    '20-20': 'Contains equal parts of nitrogen and phosphorus (20% each) but no potassium.',
+    '10-26-26': 'NPK fertilizer with emphasis on phosphorus and potassium, good for root development and disease resistance.'
+}
+
+def build_code_table(mapping):
+    # Sorted keys with their codes, so whole columns can be encoded with searchsorted
+    keys = np.array(sorted(mapping))
+    codes = np.array([mapping[key] for key in keys])
+    return keys, codes
+
+SOIL_KEYS, SOIL_CODES = build_code_table(soil_dict)
+CROP_TYPE_KEYS, CROP_TYPE_CODES = build_code_table(crop_type_dict)
+INVALID_SOIL_TYPE = f"Invalid soil type. Valid types are: {list(soil_dict.keys())}"
+INVALID_CROP_TYPE = f"Invalid crop type. Valid types are: {list(crop_type_dict.keys())}"
+
+def encode_categories(values, keys, codes):
+    # Vectorized equivalent of mapping.get(value, 0) over a whole column
+    values = np.array([value if isinstance(value, str) else '' for value in values], dtype=str)
+    positions = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return np.where(keys[positions] == values, codes[positions], 0)
+
+PLANT_NAMES = ['Alpinia Galanga (Rasna)', 'Amaranthus Viridis (Arive-Dantu)', 'Artocarpus Heterophyllus (Jackfruit)', 'Azadirachta Indica (Neem)', 'Basella Alba (Basale)', 'Brassica Juncea (Indian Mustard)', 'Carissa Carandas (Karanda)', 'Citrus Limon (Lemon)', 'Ficus Auriculata (Roxburgh fig)', 'Ficus Religiosa (Peepal Tree)', 'Hibiscus Rosa-sinensis', 'Jasminum (Jasmine)', 'Mangifera Indica (Mango)', 'Mentha (Mint)', 'Moringa Oleifera (Drumstick)', 'Muntingia Calabura (Jamaica Cherry-Gasagase)', 'Murraya Koenigii (Curry)', 'Nerium Oleander (Oleander)', 'Nyctanthes Arbor-tristis (Parijata)', 'Ocimum Tenuiflorum (Tulsi)', 'Piper Betle (Betel)', 'Plectranthus Amboinicus (Mexican Mint)', 'Pongamia Pinnata (Indian Beech)', 'Psidium Guajava (Guava)', 'Punica Granatum (Pomegranate)', 'Santalum Album (Sandalwood)', 'Syzygium Cumini (Jamun)', 'Syzygium Jambos (Rose Apple)', 'Tabernaemontana Divaricata (Crape Jasmine)', 'Trigonella Foenum-graecum (Fenugreek)']
+AYURVEDIC_INFO = {
+    'Alpinia Galanga (Rasna)': {
+        'description': 'Alpinia Galanga, commonly known as Rasna in Ayurveda, is a rhizomatous herb.',
+        'uses': [
+            'Treats rheumatoid arthritis and joint pain',
+            'Helps with respiratory disorders',
+            'Improves digestion and appetite',
+            'Has antimicrobial and anti-inflammatory properties'
+        ]
+    },
+    'Amaranthus Viridis (Arive-Dantu)': {
+        'description': 'Amaranthus Viridis is an annual herb known for its leafy greens.',
+        'uses': [
+            'Rich source of dietary nutrients',
+            'Treats digestive disorders',
+            'Helps reduce inflammation',
+            'Supports liver function'
+        ]
+    },
+    'Artocarpus Heterophyllus (Jackfruit)': {
+        'description': 'Artocarpus Heterophyllus, commonly known as Jackfruit, is a large tropical fruit tree.',
+        'uses': [
+            'Builds strength and improves energy levels',
+            'Treats skin diseases',
+            'Aids in digestion',
+            'Balances Kapha and Pitta doshas'
+        ]
+    },
+    'Azadirachta Indica (Neem)': {
+        'description': 'Azadirachta Indica, or Neem, is revered as a versatile medicinal plant.',
+        'uses': [
+            'Purifies blood and detoxifies the body',
+            'Treats skin disorders and infections',
+            'Has antibacterial and antifungal properties',
+            'Helps manage diabetes'
+        ]
+    },
+    'Basella Alba (Basale)': {
+        'description': 'Basella Alba is a fast-growing perennial vine cultivated as a vegetable.',
+        'uses': [
+            'Helps in treating ulcers',
+            'Relieves constipation',
+            'Contains anti-inflammatory properties',
+            'Supports healthy blood formation'
+        ]
+    },
+    'Brassica Juncea (Indian Mustard)': {
+        'description': 'Brassica Juncea is a species of mustard plant cultivated for its seeds and leaves.',
+        'uses': [
+            'Improves digestion and stimulates appetite',
+            'Relieves congestion and respiratory issues',
+            'Helps treat skin infections',
+            'Reduces muscle and joint pain'
+        ]
+    },
+    'Carissa Carandas (Karanda)': {
+        'description': 'Carissa Carandas is a flowering shrub that bears small berry-sized fruits.',
+        'uses': [
+            'Treats anemia and improves blood count',
+            'Helps with indigestion and gastric issues',
+            'Has anti-inflammatory properties',
+            'Used for fever and diarrhea'
+        ]
+    },
+    'Citrus Limon (Lemon)': {
+        'description': 'Citrus Limon is a small evergreen tree that produces the popular citrus fruit lemon.',
+        'uses': [
+            'Detoxifies the body and stimulates liver function',
+            'Improves digestion and relieves constipation',
+            'Treats respiratory issues and throat infections',
+            'Rich in Vitamin C and antioxidants'
+        ]
+    },
+    'Ficus Auriculata (Roxburgh fig)': {
+        'description': 'Ficus Auriculata is a fig species native to Southeast Asia.',
+        'uses': [
+            'Treats digestive disorders',
+            'Has cooling properties',
+            'Helps with bleeding disorders',
+            'Used for urinary tract infections'
+        ]
+    },
+    'Ficus Religiosa (Peepal Tree)': {
+        'description': 'Ficus Religiosa is a sacred tree in many South Asian cultures.',
+        'uses': [
+            'Treats neurological disorders',
+            'Helps with diabetes management',
+            'Reduces inflammation',
+            'Used for asthma and respiratory conditions'
+        ]
+    },
+    'Hibiscus Rosa-sinensis': {
+        'description': 'Hibiscus Rosa-sinensis is an ornamental flowering plant with medicinal properties.',
+        'uses': [
+            'Cools the body and reduces pitta dosha',
+            'Promotes hair growth and prevents greying',
+            'Helps regulate menstrual cycles',
+            'Treats coughs and respiratory issues'
+        ]
+    },
+    'Jasminum (Jasmine)': {
+        'description': 'Jasminum is a genus of fragrant flowering plants known for their beautiful blooms.',
+        'uses': [
+            'Calms the mind and reduces anxiety',
+            'Treats eye disorders',
+            'Helps with skin problems',
+            'Used as a uterine tonic'
+        ]
+    },
+    'Mangifera Indica (Mango)': {
+        'description': 'Mangifera Indica is a tropical fruit tree that produces the popular mango fruit.',
+        'uses': [
+            'Improves digestion and treats digestive disorders',
+            'Has cooling properties that balance Pitta dosha',
+            'Beneficial for skin health',
+            'Strengthens the heart and cardiovascular system'
+        ]
+    },
+    'Mentha (Mint)': {
+        'description': 'Mentha, commonly known as Mint, is an aromatic herb used extensively in Ayurveda.',
+        'uses': [
+            'Treats digestive issues and improves digestion',
+            'Relieves respiratory problems',
+            'Has cooling properties',
+            'Helps with headaches and migraines'
+        ]
+    },
+    'Moringa Oleifera (Drumstick)': {
+        'description': 'Moringa Oleifera is a nutrient-rich plant known as a "miracle tree".',
+        'uses': [
+            'Provides essential nutrients and vitamins',
+            'Treats inflammation and joint pain',
+            'Helps manage blood sugar levels',
+            'Supports liver health and detoxification'
+        ]
+    },
+    'Muntingia Calabura (Jamaica Cherry-Gasagase)': {
+        'description': 'Muntingia Calabura is a fast-growing tropical tree with edible fruits.',
+        'uses': [
+            'Reduces inflammation',
+            'Treats headaches and cold symptoms',
+            'Has antioxidant properties',
+            'Helps with gastrointestinal issues'
+        ]
+    },
+    'Murraya Koenigii (Curry)': {
+        'description': 'Murraya Koenigii, known as curry leaf tree, is aromatic and used in many dishes.',
+        'uses': [
+            'Improves digestion and treats digestive disorders',
+            'Manages diabetes and blood glucose levels',
+            'Beneficial for hair health',
+            'Treats infections and inflammation'
+        ]
+    },
+    'Nerium Oleander (Oleander)': {
+        'description': 'Nerium Oleander is an evergreen shrub that contains potent bioactive compounds.',
+        'uses': [
+            'CAUTION: Highly toxic plant, used only in extremely diluted preparations',
+            'External application for skin diseases (by experts only)',
+            'Used in extremely small doses for specific heart conditions (by specialized practitioners)',
+            'Most preparations require extensive purification and expert preparation'
+        ]
+    },
+    'Nyctanthes Arbor-tristis (Parijata)': {
+        'description': 'Nyctanthes Arbor-tristis is a night-flowering jasmine tree.',
+        'uses': [
+            'Treats fevers, especially malaria',
+            'Used for arthritis and joint pain',
+            'Helps with constipation',
+            'Has anti-inflammatory properties'
+        ]
+    },
+    'Ocimum Tenuiflorum (Tulsi)': {
+        'description': 'Ocimum Tenuiflorum, Holy Basil or Tulsi, is a sacred plant in Hindu tradition.',
+        'uses': [
+            'Treats respiratory conditions like bronchitis and asthma',
+            'Reduces stress and anxiety',
+            'Helps with fever and common cold',
+            'Has adaptogenic and anti-inflammatory properties'
+        ]
+    },
+    'Piper Betle (Betel)': {
+        'description': 'Piper Betle is a perennial, dioecious creeper with glossy heart-shaped leaves.',
+        'uses': [
+            'Improves digestive function',
+            'Treats respiratory conditions',
+            'Has antimicrobial properties',
+            'Used as a mouth freshener and oral health aid'
+        ]
+    },
+    'Plectranthus Amboinicus (Mexican Mint)': {
+        'description': 'Plectranthus Amboinicus is a semi-succulent perennial plant with medicinal properties.',
+        'uses': [
+            'Treats cough, cold and respiratory ailments',
+            'Helps with digestive issues',
+            'Has antimicrobial properties',
+            'Used for urinary problems'
+        ]
+    },
+    'Pongamia Pinnata (Indian Beech)': {
+        'description': 'Pongamia Pinnata is a legume tree with numerous medicinal applications.',
+        'uses': [
+            'Treats skin diseases and wounds',
+            'Has anti-inflammatory properties',
+            'Used for rheumatic conditions',
+            'Helps with gastrointestinal worms'
+        ]
+    },
+    'Psidium Guajava (Guava)': {
+        'description': 'Psidium Guajava is a tropical fruit tree with edible fruits and medicinal leaves.',
+        'uses': [
+            'Controls diabetes and improves insulin sensitivity',
+            'Treats diarrhea and dysentery',
+            'Helps with dental problems',
+            'Has antimicrobial and anti-inflammatory properties'
+        ]
+    },
+    'Punica Granatum (Pomegranate)': {
+        'description': 'Punica Granatum is a fruit-bearing shrub with multiple medicinal benefits.',
+        'uses': [
+            'Treats digestive disorders like diarrhea',
+            'Helps with parasitic infections',
+            'Used for throat infections',
+            'Has antioxidant properties'
+        ]
+    },
+    'Santalum Album (Sandalwood)': {
+        'description': 'Santalum Album is a fragrant wood with cooling properties in Ayurveda.',
+        'uses': [
+            'Cools the body and reduces Pitta dosha',
+            'Treats skin disorders and rashes',
+            'Used for urinary tract infections',
+            'Calms the mind and reduces stress'
+        ]
+    },
+    'Syzygium Cumini (Jamun)': {
+        'description': 'Syzygium Cumini, also known as Jamun or Black Plum, is a tropical tree with edible fruits.',
+        'uses': [
+            'Manages diabetes and blood sugar levels',
+            'Treats digestive disorders',
+            'Has astringent properties for dental health',
+            'Helps with urinary problems'
+        ]
+    },
+    'Syzygium Jambos (Rose Apple)': {
+        'description': 'Syzygium Jambos produces rose apple fruits and has medicinal properties.',
+        'uses': [
+            'Treats digestive disorders',
+            'Has anti-inflammatory properties',
+            'Used for respiratory conditions',
+            'Helps with fever'
+        ]
+    },
+    'Tabernaemontana Divaricata (Crape Jasmine)': {
+        'description': 'Tabernaemontana Divaricata is an evergreen shrub with fragrant white flowers.',
+        'uses': [
+            'Reduces pain and inflammation',
+            'Treats eye diseases',
+            'Used for skin conditions',
+            'Has calming effects on the nervous system'
+        ]
+    },
+    'Trigonella Foenum-graecum (Fenugreek)': {
+        'description': 'Trigonella Foenum-graecum, or Fenugreek, is an annual plant in the family Fabaceae.',
+        'uses': [
+            'Increases breast milk production in nursing mothers',
+            'Manages diabetes and blood glucose levels',
+            'Improves digestion and reduces inflammation',
+            'Helps lower cholesterol levels'
+        ]
+    }
+}
+
+def parse_crop_features(data):
+    # Feature order must match the columns the crop model was trained on
+    return [
+        int(data['nitrogen']),
+        int(data['phosphorus']),
+        int(data['potassium']),
+        float(data['temperature']),
+        float(data['humidity']),
+        float(data['ph']),
+        float(data['rainfall'])
+    ]
+
+def parse_fertilizer_features(data):
+    # Numeric features in training column order, followed by the raw categorical values
+    numeric = [
+        int(data['temperature']),
+        int(data['humidity']),
+        int(data['moisture']),
+        int(data['nitrogen']),
+        int(data['potassium']),
+        int(data['phosphorous'])
+    ]
+    return numeric, data['soil_type'], data['crop_type']
+
+def parse_field_features(data):
+    # Crop and fertilizer features of one field, as one row: the crop model's columns followed by
+    # the fertilizer model's numeric columns, then the raw categorical values. The inputs both
+    # models use are read once; the fertilizer model takes them as whole numbers.
+    nitrogen = int(data['nitrogen'])
+    # Crop samples spell it "phosphorus", fertilizer samples "phosphorous"
+    phosphorus = int(data['phosphorous'] if 'phosphorous' in data else data['phosphorus'])
+    potassium = int(data['potassium'])
+    temperature = float(data['temperature'])
+    humidity = float(data['humidity'])
+    crop = [nitrogen, phosphorus, potassium, temperature, humidity, float(data['ph']), float(data['rainfall'])]
+    fertilizer = [int(temperature), int(humidity), int(data['moisture']), nitrogen, potassium, phosphorus]
+    return crop + fertilizer, data['soil_type'], data['crop_type']
+
+# Column ranges of a parsed field row that each model takes
+FIELD_CROP_COLUMNS = slice(0, 7)
+FIELD_FERTILIZER_COLUMNS = slice(7, 15)
+
+def predict_crop(features):
+    # Single-sample predictions, reusing the result for identical feature vectors
+    # Keyed on float values, so 90 and 90.0 share an entry whichever route parsed them
+    return cached("crop", repr(tuple(map(float, features))),
+                  lambda: int(models.get("crop").predict(np.array([features]))[0]))
+
+def predict_fertilizer(features):
+    return cached("fertilizer", repr(tuple(map(float, features))),
+                  lambda: str(models.get("fertilizer").predict(np.array([features]))[0]))
+
+class BatchTooLarge(Exception):
+    # Answered with 413
+    pass
+
+def get_batch_samples(data):
+    # Batch bodies are either a bare JSON array or {"samples": [...]}
+    if isinstance(data, dict):
+        data = data.get('samples')
+    if not isinstance(data, list) or not data:
+        raise ValueError("Request body must be a non-empty list of samples or {\"samples\": [...]}")
+    if len(data) > BATCH_MAX_SIZE:
+        raise BatchTooLarge(f"Batch size {len(data)} exceeds the maximum of {BATCH_MAX_SIZE} samples")
+    return data
+
+def require_finite(row):
+    # The models reject the whole matrix if any value is NaN or infinite, so check each row first
+    if not np.isfinite(row).all():
+        raise ValueError("Features must be finite numbers, not NaN or infinity")
+
+def recommend_crops(samples):
+    # Validate every row first, then score all valid rows with one predict call
+    results = [None] * len(samples)
+    features = np.empty((len(samples), 7), dtype=np.float64)
+    valid = []
+    for i, sample in enumerate(samples):
+        try:
+            features[len(valid)] = parse_crop_features(sample)
+            require_finite(features[len(valid)])
+            valid.append(i)
+        except Exception as e:
+            results[i] = {"index": i, "status": "error", "message": str(e)}
+
+    if valid:
+        predictions = models.get("crop").predict(features[:len(valid)])
+        for i, prediction in zip(valid, predictions):
+            results[i] = {
+                "index": i,
+                "status": "success",
+                "recommendation": {
+                    "crop": crop_dict.get(prediction, "Unknown crop"),
+                    "crop_id": int(prediction)
+                }
+            }
+    return results
+
+def parse_fertilizer_rows(samples, parse_row, width):
+    # Shared by every route that feeds the fertilizer model. parse_row returns (numeric, soil_type,
+    # crop_type); the numeric values are parsed per row and both categorical columns are encoded at
+    # once into the last two columns. Returns the rows in sample order, the index of the sample each
+    # row came from, and the per-sample results with the errors of the samples that have no row.
+    results = [None] * len(samples)
+    # Floats, like the single endpoints' features once the model converts them, so any integer
+    # one accepts is accepted by the other too
+    features = np.zeros((len(samples), width), dtype=np.float64)
+    soil_types, crop_types, parsed = [], [], []
+    for i, sample in enumerate(samples):
+        try:
+            numeric, soil_type, crop_type = parse_row(sample)
+            # Integers beyond the float range (10**400) overflow here, in this row only
+            features[len(parsed), :-2] = numeric
+            require_finite(features[len(parsed), :-2])
+        except Exception as e:
+            results[i] = {"index": i, "status": "error", "message": str(e)}
+            continue
+        soil_types.append(soil_type)
+        crop_types.append(crop_type)
+        parsed.append(i)
+
+    count = len(parsed)
+    features[:count, -2] = encode_categories(soil_types, SOIL_KEYS, SOIL_CODES)
+    features[:count, -1] = encode_categories(crop_types, CROP_TYPE_KEYS, CROP_TYPE_CODES)
+
+    invalid_soil = features[:count, -2] == 0
+    invalid_crop = features[:count, -1] == 0
+    for row in np.flatnonzero(invalid_soil | invalid_crop):
+        message = INVALID_SOIL_TYPE if invalid_soil[row] else INVALID_CROP_TYPE
+        results[parsed[row]] = {"index": parsed[row], "status": "error", "message": message}
+
+    valid_rows = np.flatnonzero(~(invalid_soil | invalid_crop))
+    return features[valid_rows], [parsed[row] for row in valid_rows], results
+
+def fertilizer_details(prediction):
+    return {"fertilizer": str(prediction), "description": fertilizer_dict.get(prediction, "No specific recommendation")}
+
+def recommend_fertilizers(samples):
+    # Score every fully valid row with one predict call
+    features, rows, results = parse_fertilizer_rows(samples, parse_fertilizer_features, 8)
+    if rows:
+        predictions = models.get("fertilizer").predict(features)
+        for i, prediction in zip(rows, predictions):
+            results[i] = {"index": i, "status": "success", "recommendation": fertilizer_details(prediction)}
+    return results
+
+advisory_pool = ThreadPoolExecutor(ADVISORY_THREADS, thread_name_prefix="field-advisory")
+
+def predict_fields(crop_features, fertilizer_features):
+    crop_model, fertilizer_model = models.get("crop"), models.get("fertilizer")
+    if len(crop_features) < ADVISORY_PARALLEL_ROWS:
+        # Both models take about a millisecond here; a thread handoff would cost more than it saves
+        return crop_model.predict(crop_features), fertilizer_model.predict(fertilizer_features)
+    fertilizer = advisory_pool.submit(fertilizer_model.predict, fertilizer_features)
+    return crop_model.predict(crop_features), fertilizer.result()
+
+def advise_fields(samples):
+    # Crop and fertilizer recommendations for every field. Each field is parsed once into one row
+    # holding both models' features, and the valid rows are scored with one predict call per model.
+    features, rows, results = parse_fertilizer_rows(samples, parse_field_features, 15)
+    if rows:
+        crops, fertilizers = predict_fields(features[:, FIELD_CROP_COLUMNS], features[:, FIELD_FERTILIZER_COLUMNS])
+        for i, crop, fertilizer in zip(rows, crops, fertilizers):
+            results[i] = {
+                "index": i,
+                "status": "success",
+                "recommendation": {"crop": crop_label(crop), "fertilizer": fertilizer_details(fertilizer)}
+            }
+    return results
+
+# Features in model column order, for the what-if sweeps
+CROP_FEATURES = ['nitrogen', 'phosphorus', 'potassium', 'temperature', 'humidity', 'ph', 'rainfall']
+CROP_INTEGER_FEATURES = {'nitrogen', 'phosphorus', 'potassium'}
+FERTILIZER_FEATURES = ['temperature', 'humidity', 'moisture', 'nitrogen', 'potassium', 'phosphorous',
+                       'soil_type', 'crop_type']
+FERTILIZER_INTEGER_FEATURES = set(FERTILIZER_FEATURES[:6])
+FERTILIZER_CATEGORIES = {'soil_type': soil_dict, 'crop_type': crop_type_dict}
+
+def crop_feature_row(sample):
+    return np.array(parse_crop_features(sample), dtype=np.float64)
+
+def fertilizer_feature_row(sample):
+    features, rows, results = parse_fertilizer_rows([sample], parse_fertilizer_features, 8)
+    if not rows:
+        raise ValueError(results[0]["message"])
+    return features[0]
+
+def crop_label(prediction):
+    return {"crop": crop_dict.get(int(prediction), "Unknown crop"), "crop_id": int(prediction)}
+
+def fertilizer_label(prediction):
+    return {"fertilizer": str(prediction)}
+
+def parse_sweep_axis(axis, features, integer_features, categories):
+    # {"feature": ..., "values": [...]} or {"feature": ..., "start": ..., "stop": ..., "steps": ...};
+    # categorical features take a list of labels and default to all of them.
+    # Returns (feature, values as reported, values as model input).
+    name = axis.get('feature') if isinstance(axis, dict) else None
+    if name not in features:
+        raise ValueError(f"Unknown sweep feature {name!r}. Sweepable features are: {features}")
+    if name in categories:
+        mapping = categories[name]
+        labels = axis.get('values', list(mapping))
+        invalid = [label for label in labels if label not in mapping] if isinstance(labels, list) else [labels]
+        if not labels or invalid:
+            raise ValueError(f"Invalid {name} values {invalid}. Valid values are: {list(mapping.keys())}")
+        return name, labels, np.array([mapping[label] for label in labels], dtype=np.float64)
+
+    if 'values' in axis:
+        values = np.asarray(axis['values'], dtype=np.float64)
+    else:
+        steps = int(axis['steps'])
+        if steps > SWEEP_MAX_POINTS:
+            raise BatchTooLarge(f"{steps} steps exceed the maximum of {SWEEP_MAX_POINTS} sweep points")
+        values = np.linspace(float(axis['start']), float(axis['stop']), steps)
+    if values.ndim != 1 or not len(values) or not np.isfinite(values).all():
+        raise ValueError(f"Sweep of {name} needs a non-empty list of finite values")
+    if name in integer_features:
+        # int() truncation, as in the single-sample endpoints
+        values = np.trunc(values)
+        return name, values.astype(np.int64).tolist(), values
+    return name, values.tolist(), values
+
+def score_with_confidence(model, features):
+    # predict() is the argmax of predict_proba() for the forest models, so one call gives both
+    if hasattr(model, "predict_proba"):
+        probabilities = model.predict_proba(features)
+        best = np.argmax(probabilities, axis=1)
+        return model.classes_.take(best, axis=0), probabilities[np.arange(len(best)), best]
+    return np.asarray(model.predict(features)), None
+
+def run_length_encode(codes, confidence):
+    # [code, run length] per run of equal codes, plus the run's mean confidence when available
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    lengths = np.diff(np.append(starts, len(codes)))
+    columns = [codes[starts].tolist(), lengths.tolist()]
+    if confidence is not None:
+        columns.append(np.round(np.add.reduceat(confidence, starts) / lengths, 4).tolist())
+    return [list(run) for run in zip(*columns)]
+
+def run_sweep(model_name, data, features, integer_features, categories, feature_row, label, stage):
+    # Scores every combination of one or two swept features around a base sample with a
+    # single model call, and returns the decision map run-length encoded
+    with stage("parse"):
+        if not isinstance(data, dict) or not isinstance(data.get('base'), dict):
+            raise ValueError('Request body must be {"base": {...}, "sweep": [{"feature": ..., ...}]}')
+        sweep = data.get('sweep')
+        sweep = [sweep] if isinstance(sweep, dict) else sweep
+        if not isinstance(sweep, list) or not 1 <= len(sweep) <= 2:
+            raise ValueError("sweep must list one or two features")
+        axes = [parse_sweep_axis(axis, features, integer_features, categories) for axis in sweep]
+        if len(axes) == 2 and axes[0][0] == axes[1][0]:
+            raise ValueError("The two sweep features must differ")
+        shape = [len(values) for _, values, _ in axes]
+        points = math.prod(shape)
+        if points > SWEEP_MAX_POINTS:
+            raise BatchTooLarge(f"Sweep of {points} points exceeds the maximum of {SWEEP_MAX_POINTS}")
+
+        # Swept features may be left out of the base sample
+        base = dict(data['base'])
+        for name, values, _ in axes:
+            base.setdefault(name, values[0])
+        base_row = feature_row(base)
+
+        # The grid, first feature outermost, followed by the base sample itself
+        grid = np.empty((points + 1, len(base_row)), dtype=np.float64)
+        grid[:] = base_row
+        for (name, _, column), values in zip(axes, np.meshgrid(*[column for _, _, column in axes], indexing='ij')):
+            grid[:points, features.index(name)] = values.ravel()
+
+    with stage("predict"):
+        predictions, confidence = score_with_confidence(models.get(model_name), grid)
+
+    with stage("postprocess"):
+        classes, codes = np.unique(predictions[:points], return_inverse=True)
+        return {
+            "status": "success",
+            "axes": [{"feature": name, "values": values} for name, values, _ in axes],
+            "shape": shape,
+            "points": points,
+            "base": {
+                "recommendation": label(predictions[points]),
+                "confidence": None if confidence is None else round(float(confidence[points]), 4)
+            },
+            "classes": [label(prediction) for prediction in classes],
+            "runs": run_length_encode(codes.ravel(), None if confidence is None else confidence[:points])
+        }
+
+def sweep_response(model_name, endpoint, **options):
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint=endpoint)
+    try:
+        result = run_sweep(model_name, request.get_json(), stage=stage, **options)
+        with stage("serialize"):
+            return jsonify(result)
+    except BatchTooLarge as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 413
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+# CSV headers that do not normalize to the JSON field names (the training dataset column names)
+CROP_CSV_ALIASES = {"N": "nitrogen", "P": "phosphorus", "K": "potassium"}
+FERTILIZER_CSV_ALIASES = {"Temparature": "temperature"}
+
+def normalize_csv_header(name, aliases):
+    # "Soil Type" -> "soil_type", "Humidity " -> "humidity", plus explicit aliases
+    name = name.strip()
+    return aliases.get(name, name.lower().replace(' ', '_'))
+
+def open_csv_upload():
+    # Multipart uploads are spooled to a temporary file by werkzeug; raw bodies are read off the socket
+    if 'file' in request.files:
+        stream = request.files['file'].stream
+    else:
+        stream = io.BufferedReader(request.stream)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+def score_csv(recommend, aliases):
+    # Yields NDJSON lines chunk by chunk, so memory use does not depend on the file size
+    # Bad values only fail their own row; the stream ends early only if the upload cannot be read
+    rows = errors = 0
+    try:
+        reader = csv.reader(open_csv_upload())
+        header = next(reader, None)
+    except Exception as e:
+        yield json.dumps({"status": "error", "message": f"Failed after {rows} rows: {e}"}) + "\n"
+        return
+    fields = [normalize_csv_header(name, aliases) for name in header or []]
+    while True:
+        try:
+            chunk = list(itertools.islice(reader, BULK_CHUNK_SIZE))
+        except Exception as e:
+            yield json.dumps({"status": "error", "message": f"Failed after {rows} rows: {e}"}) + "\n"
+            return
+        if not chunk:
+            break
+        samples = [dict(zip(fields, row)) for row in chunk]
+        try:
+            results = recommend(samples)
+        except Exception as e:
+            results = [{"index": i, "status": "error", "message": str(e)} for i in range(len(samples))]
+        lines = []
+        for result in results:
+            result["index"] += rows
+            errors += result["status"] == "error"
+            lines.append(json.dumps(result))
+        rows += len(chunk)
+        yield "\n".join(lines) + "\n"
+    yield json.dumps({"status": "complete", "rows": rows, "errors": errors}) + "\n"
+
+def bulk_response(recommend, aliases):
+    # The upload is read inside the generator, while stream_with_context keeps the request open
+    return Response(stream_with_context(score_csv(recommend, aliases)), mimetype='application/x-ndjson')
+
+_plant_preprocessor = None
+# Shared by every request in this worker, including the images of a batch request
+upload_budget = MemoryBudget(UPLOAD_MEMORY_BUDGET_BYTES, timeout=PLANT_REQUEST_TIMEOUT)
+
+def get_plant_preprocessor():
+    # Built from the interpreter's input shape and dtype once the model is loaded
+    global _plant_preprocessor
+    if _plant_preprocessor is None:
+        _plant_preprocessor = ImagePreprocessor.from_input_details(
+            models.get("plant").input_details[0], max_pixels=PLANT_MAX_IMAGE_PIXELS, budget=upload_budget)
+    return _plant_preprocessor
+
+_plant_decode_pool = None
+_plant_decode_pool_lock = threading.Lock()
+
+def get_plant_decode_pool(interpreter_pool=None):
+    # None unless PLANT_DECODE_PROCESSES is set. Created on first use, so the processes
+    # and shared memory belong to the worker that uses them rather than a pre-fork parent.
+    global _plant_decode_pool
+    if PLANT_DECODE_PROCESSES <= 0:
+        return None
+    with _plant_decode_pool_lock:
+        if _plant_decode_pool is None:
+            details = (interpreter_pool or models.get("plant")).input_details[0]
+            _plant_decode_pool = DecodePool.from_input_details(
+                details, processes=PLANT_DECODE_PROCESSES, slots=PLANT_DECODE_SLOTS,
+                max_pixels=PLANT_MAX_IMAGE_PIXELS, timeout=PLANT_REQUEST_TIMEOUT)
+            atexit.register(_plant_decode_pool.close)
+    return _plant_decode_pool
+
+def observe_stages(endpoint, timings):
+    # Stage durations measured in a decoding process
+    for stage, seconds in timings.items():
+        metrics.observe("stage_duration_seconds", {"endpoint": endpoint, "stage": stage}, seconds)
+
+def run_plant_batch(images):
+    # Copy the queued images straight into the interpreter's input tensor and run a single invoke
+    plant_pool = models.get("plant")
+    input_index = plant_pool.input_details[0]['index']
+    batch_shape = (len(images),) + images[0].shape
+    with plant_pool.checkout() as interpreter:
+        if tuple(interpreter.get_input_details()[0]['shape']) != batch_shape:
+            interpreter.resize_tensor_input(input_index, batch_shape)
+            interpreter.allocate_tensors()
+        # The tensor view must not outlive this statement, or invoke() refuses to run
+        np.stack(images, out=interpreter.tensor(input_index)())
+        with metrics.timer("stage_duration_seconds", endpoint="/medicinal-plant-prediction", stage="invoke"):
+            interpreter.invoke()
+        return list(interpreter.get_tensor(plant_pool.output_details[0]['index']))
+
+# One batching thread per pooled interpreter, so batches run in parallel
+plant_batcher = MicroBatcher(run_plant_batch, PLANT_MAX_BATCH_SIZE, PLANT_MAX_WAIT_MS,
+                             workers=PLANT_POOL_SIZE, max_queue=PLANT_MAX_QUEUE, name="plant-batcher")
+
+# All interpreters, decode slots or decode memory are busy, or a decoding process died and is
+# being replaced. These are not the client's fault: plant requests answer them with 503.
+PLANT_CAPACITY_ERRORS = (QueueFull, PoolTimeout, TimeoutError, SlotTimeout, BudgetTimeout, BrokenProcessPool)
+
+# Decoding and resizing release the GIL, so the images of one upload are preprocessed in parallel
+plant_preprocess_pool = ThreadPoolExecutor(PLANT_PREPROCESS_THREADS, thread_name_prefix="plant-preprocess")
+
+UNKNOWN_PLANT_INFO = {
+    'description': 'No detailed information available.',
+    'uses': ['Information not available']
+}
+
+def build_catalog():
+    # Static reference data shared by every response, served once from /catalog
+    return {
+        "plants": [
+            {"class_index": idx, "class_name": name, "ayurvedic_info": AYURVEDIC_INFO.get(name, UNKNOWN_PLANT_INFO)}
+            for idx, name in enumerate(PLANT_NAMES)
+        ],
+        "crops": {str(crop_id): name for crop_id, name in crop_dict.items()},
+        "fertilizers": fertilizer_dict,
+        "soil_types": list(soil_dict),
+        "crop_types": list(crop_type_dict)
+    }
+
+# Encoded once at startup; the version is a content hash, so it changes whenever the data does
+CATALOG_JSON = json.dumps(build_catalog(), separators=(',', ':')).encode()
+CATALOG_VERSION = hashlib.sha256(CATALOG_JSON).hexdigest()[:16]
+CATALOG_MAX_AGE = int(os.environ.get("CATALOG_MAX_AGE", 3600))
+
+# Pre-encoded JSON for the static part of each class, spliced into full plant responses
+PLANT_CLASS_JSON = [
+    (json.dumps(name), json.dumps(AYURVEDIC_INFO.get(name, UNKNOWN_PLANT_INFO))) for name in PLANT_NAMES
+]
+
+def parse_plant_response_options(args):
+    # ?format=compact returns only class indices and confidences; ?top_k= sets how many classes are ranked
+    response_format = args.get('format', 'full')
+    if response_format not in ('full', 'compact'):
+        raise ValueError("format must be 'full' or 'compact'")
+    top_k = int(args.get('top_k', 3))
+    if not 1 <= top_k <= len(PLANT_NAMES):
+        raise ValueError(f"top_k must be between 1 and {len(PLANT_NAMES)}")
+    return top_k, response_format == 'compact'
+
+def encode_plant_class(predictions, idx, compact):
+    confidence = json.dumps(float(predictions[idx]))
+    if compact:
+        return '{"class_index":%d,"confidence":%s}' % (idx, confidence)
+    name, info = PLANT_CLASS_JSON[idx]
+    return '{"class_name":%s,"confidence":%s,"class_index":%d,"ayurvedic_info":%s}' % (name, confidence, idx, info)
+
+def encode_plant_prediction(predictions, top_k=3, compact=False):
+    # The "prediction" and "top_predictions" members of a response, as JSON text
+    top_indices = np.argsort(predictions)[-top_k:][::-1]
+    fragment = '"prediction":%s,"top_predictions":[%s]' % (
+        encode_plant_class(predictions, int(np.argmax(predictions)), compact),
+        ",".join(encode_plant_class(predictions, int(idx), compact) for idx in top_indices))
+    if compact:
+        fragment += ',"catalog_version":"%s"' % CATALOG_VERSION
+    return fragment
+
+# Bodies holding client-preprocessed pixels instead of an image file
+PLANT_TENSOR_MIMETYPES = {'application/octet-stream', 'application/x-npy'}
+
+def read_plant_tensor(body):
+    # A .npy file, or raw pixels described by the X-Tensor-Shape (default: the model input
+    # shape) and X-Tensor-Dtype (default: uint8) headers
+    preprocessor = get_plant_preprocessor()
+    if request.mimetype == 'application/x-npy':
+        shape, dtype, offset = parse_npy_header(body)
+        return preprocessor.tensor(body, shape, dtype, offset)
+    shape = request.headers.get('X-Tensor-Shape')
+    return preprocessor.tensor(body, parse_shape(shape) if shape else None,
+                               request.headers.get('X-Tensor-Dtype', 'uint8'))
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype='application/json')
+
+def classify_plants(files, stage, endpoint):
+    # Preprocess every upload concurrently into one batch array, then run a single invoke
+    # over the images that decoded. A bad image only fails its own entry.
+    preprocessor = get_plant_preprocessor()
+    decode_pool = get_plant_decode_pool()
+    batch = np.empty((len(files),) + preprocessor.shape, dtype=preprocessor.dtype)
+
+    def preprocess(i):
+        if not files[i].filename:
+            raise ValueError("No selected file")
+        if decode_pool is None:
+            preprocessor(files[i].stream, out=batch[i], timer=stage)
+            return
+        # Copied out of the shared slot right away, so a large batch never holds many slots
+        with decode_pool.decode(files[i].stream.read()) as (image, timings):
+            batch[i] = image
+        observe_stages(endpoint, timings)
+
+    # (predictions, error message) per upload
+    results = [None] * len(files)
+    valid = []
+    for i, future in enumerate([plant_preprocess_pool.submit(preprocess, i) for i in range(len(files))]):
+        try:
+            future.result()
+            valid.append(i)
+        except PLANT_CAPACITY_ERRORS:
+            # Fails the whole request with 503, as on the single endpoint
+            raise
+        except UnidentifiedImageError:
+            results[i] = (None, "Could not read image: not a supported image file")
+        except ImageTooLarge as e:
+            results[i] = (None, f"Image too large: {e}")
+        except (OSError, ValueError) as e:
+            # Truncated or corrupt image data, or an empty file part
+            results[i] = (None, f"Could not read image: {e}")
+
+    if valid:
+        images = batch if len(valid) == len(files) else batch[valid]
+        with stage("inference"):
+            outputs = run_plant_batch(images)
+        for i, predictions in zip(valid, outputs):
+            results[i] = (predictions, None)
+    return results
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Routes rather than raw paths, so unknown URLs cannot blow up the label set.
+    # Streaming responses are timed up to the first byte.
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.inc("requests_total", {"route": route, "method": request.method, "status": response.status_code})
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe("request_duration_seconds", {"route": route}, time.perf_counter() - started)
+    return response
+
+@app.errorhandler(413)
+def request_too_large(e):
+    # Raised by werkzeug while reading a body larger than the request's max_content_length
+    limit = request.max_content_length
+    return jsonify({
+        "status": "error",
+        "message": f"Request body exceeds the limit of {limit} bytes" if limit else "Request body too large"
+    }), 413
+
+Profiler(PROFILE_DIR, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE, memory=PROFILE_MEMORY).install(app)
+
+@app.route('/')
+def home():
+    return jsonify({
+        "status": "success",
+        "message": "Welcome to AgriAI API",
+        "endpoints": {
+            "/crop-recommendation": "POST - Get crop recommendations",
+            "/crop-recommendation/batch": "POST - Get crop recommendations for many samples",
+            "/fertilizer-recommendation": "POST - Get fertilizer recommendations",
+            "/fertilizer-recommendation/batch": "POST - Get fertilizer recommendations for many samples",
+            "/crop-recommendation/bulk": "POST - Score a CSV upload, streaming NDJSON results",
+            "/fertilizer-recommendation/bulk": "POST - Score a CSV upload, streaming NDJSON results",
+            "/crop-recommendation/sweep": "POST - What-if map of crop recommendations over one or two features",
+            "/fertilizer-recommendation/sweep": "POST - What-if map of fertilizer recommendations over one or two features",
+            "/field-advisory": "POST - Get crop and fertilizer recommendations for one field in one call",
+            "/field-advisory/batch": "POST - Get crop and fertilizer recommendations for many fields",
+            "/medicinal-plant-prediction": "POST - Get medicinal plant predictions",
+            "/medicinal-plant-prediction/batch": "POST - Get medicinal plant predictions for several images at once",
+            "/catalog": "GET - Plant, crop and fertilizer reference data (ETag cached)",
+            "/medicinal-plant-prediction/stats": "GET - Plant prediction batching and interpreter pool statistics",
+            "/models": "GET - Model load times and memory usage",
+            "/ready": "GET - Readiness probe: 200 once every model is loaded and warmed up",
+            "/cache/stats": "GET - Prediction cache hit/miss/eviction counters",
+            "/metrics": "GET - Prometheus metrics: per-stage latency, request counts and model loading"
+        }
+    })
+
+@app.route('/crop-recommendation', methods=['POST'])
+def crop_recommendation():
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint="/crop-recommendation")
+    try:
+        with stage("parse"):
+            # Get input data from request
+            data = request.get_json()
+
+            # Extract features
+            features = parse_crop_features(data)
+
+        with stage("predict"):
+            # Make prediction, reusing the result for identical feature vectors
+            prediction = predict_crop(features)
+        
+        # Get the crop name
+        crop = crop_dict.get(prediction, "Unknown crop")
+        
+        with stage("serialize"):
+            return jsonify({
+                "status": "success",
+                "recommendation": {
+                    "crop": crop,
+                    "crop_id": int(prediction)
+                },
+                "message": f"{crop} is recommended for the given soil and environmental conditions."
+            })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/crop-recommendation/batch', methods=['POST'])
+def crop_recommendation_batch():
+    try:
+        samples = get_batch_samples(request.get_json())
+        results = recommend_crops(samples)
+
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            "results": results
+        })
+    except BatchTooLarge as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 413
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/crop-recommendation/bulk', methods=['POST'])
+def crop_recommendation_bulk():
+    request.max_content_length = BULK_MAX_UPLOAD_BYTES
+    return bulk_response(recommend_crops, CROP_CSV_ALIASES)
+
+@app.route('/crop-recommendation/sweep', methods=['POST'])
+def crop_recommendation_sweep():
+    return sweep_response("crop", "/crop-recommendation/sweep", features=CROP_FEATURES,
+                          integer_features=CROP_INTEGER_FEATURES, categories={},
+                          feature_row=crop_feature_row, label=crop_label)
+
+@app.route('/fertilizer-recommendation', methods=['POST'])
+def fertilizer_recommendation():
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint="/fertilizer-recommendation")
+    try:
+        with stage("parse"):
+            # Get input data from request and extract features, parsed like a batch row
+            features, rows, results = parse_fertilizer_rows([request.get_json()], parse_fertilizer_features, 8)
+
+        if not rows:
+            return jsonify({
+                "status": "error",
+                "message": results[0]["message"]
+            }), 400
+        
+        # Make prediction
+        with stage("predict"):
+            prediction = predict_fertilizer(features[0].tolist())
+        
+        # Get fertilizer details
+        fertilizer_info = fertilizer_dict.get(prediction, "No specific recommendation")
+        
+        with stage("serialize"):
+            return jsonify({
+                "status": "success",
+                "recommendation": {
+                    "fertilizer": prediction,
+                    "description": fertilizer_info
+                },
+                "message": f"{prediction} is recommended for the given conditions."
+            })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/fertilizer-recommendation/batch', methods=['POST'])
+def fertilizer_recommendation_batch():
+    try:
+        samples = get_batch_samples(request.get_json())
+        results = recommend_fertilizers(samples)
+
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            "results": results
+        })
+    except BatchTooLarge as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 413
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/fertilizer-recommendation/bulk', methods=['POST'])
+def fertilizer_recommendation_bulk():
+    request.max_content_length = BULK_MAX_UPLOAD_BYTES
+    return bulk_response(recommend_fertilizers, FERTILIZER_CSV_ALIASES)
+
+@app.route('/fertilizer-recommendation/sweep', methods=['POST'])
+def fertilizer_recommendation_sweep():
+    return sweep_response("fertilizer", "/fertilizer-recommendation/sweep", features=FERTILIZER_FEATURES,
+                          integer_features=FERTILIZER_INTEGER_FEATURES, categories=FERTILIZER_CATEGORIES,
+                          feature_row=fertilizer_feature_row, label=fertilizer_label)
+
+@app.route('/field-advisory', methods=['POST'])
+def field_advisory():
+    # Crop and fertilizer recommendations for one field in a single call
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint="/field-advisory")
+    try:
+        with stage("parse"):
+            features, rows, results = parse_fertilizer_rows([request.get_json()], parse_field_features, 15)
+
+        if not rows:
+            return jsonify({
+                "status": "error",
+                "message": results[0]["message"]
+            }), 400
+
+        # Same cache entries as the single crop and fertilizer endpoints
+        with stage("predict"):
+            crop_id = predict_crop(features[0, FIELD_CROP_COLUMNS].tolist())
+            fertilizer = predict_fertilizer(features[0, FIELD_FERTILIZER_COLUMNS].tolist())
+
+        crop = crop_dict.get(crop_id, "Unknown crop")
+
+        with stage("serialize"):
+            return jsonify({
+                "status": "success",
+                "recommendation": {
+                    "crop": {
+                        "crop": crop,
+                        "crop_id": crop_id
+                    },
+                    "fertilizer": {
+                        "fertilizer": fertilizer,
+                        "description": fertilizer_dict.get(fertilizer, "No specific recommendation")
+                    }
+                },
+                "message": f"{crop} is recommended for the given conditions, with {fertilizer} fertilizer."
+            })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/field-advisory/batch', methods=['POST'])
+def field_advisory_batch():
+    try:
+        samples = get_batch_samples(request.get_json())
+        results = advise_fields(samples)
+
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            "results": results
+        })
+    except BatchTooLarge as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 413
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+@app.route('/medicinal-plant-prediction', methods=['POST'])
+def predict_plant():
+    # Client-preprocessed pixels skip decoding; see read_plant_tensor()
+    tensor_input = request.mimetype in PLANT_TENSOR_MIMETYPES
+    if not tensor_input:
+        if 'file' not in request.files:
+            return jsonify({'error': 'Image file not found'}), 400
+
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
+
+    try:
+        top_k, compact = parse_plant_response_options(request.args)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    
+    # Hash and preprocess the image straight from the upload, without copying it into memory,
+    # unless it goes to the decoding processes
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint="/medicinal-plant-prediction")
+    decode_pool = None if tensor_input else get_plant_decode_pool()
+    try:
+        if tensor_input:
+            with stage("read"):
+                body = request.get_data(cache=False)
+                digest = hashlib.sha256(body).hexdigest()
+            with stage("validate"):
+                tensor = read_plant_tensor(body)
+        elif decode_pool is not None:
+            with stage("read"):
+                body = file.stream.read()
+                digest = hashlib.sha256(body).hexdigest()
+        else:
+            with stage("read"):
+                digest = hashlib.file_digest(file.stream, "sha256").hexdigest()
+                file.stream.seek(0)
+
+        def infer(img_array):
+            # Make prediction using TFLite, batched together with concurrent requests.
+            # "inference" includes the batching wait; "invoke" is timed per batch.
+            with stage("inference"):
+                return plant_batcher.submit(img_array, timeout=PLANT_REQUEST_TIMEOUT).tolist()
+
+        def classify():
+            if tensor_input:
+                return infer(tensor)
+            if decode_pool is None:
+                # Decoded, resized and normalized into this thread's reusable input buffer
+                return infer(get_plant_preprocessor()(file.stream, timer=stage))
+            # Written by a decoding process into a shared slot, which the batcher reads in place
+            with decode_pool.decode(body) as (img_array, timings):
+                observe_stages("/medicinal-plant-prediction", timings)
+                return infer(img_array)
+
+        # Repeated uploads of the same photo are answered from the cache
+        predictions = np.asarray(cached("plant", f"{request.mimetype}:{digest}" if tensor_input else digest, classify),
+                                 dtype=np.float32)
+
+        with stage("postprocess"):
+            fragment = encode_plant_prediction(predictions, top_k, compact)
+
+        with stage("serialize"):
+            return json_response('{"status":"success",%s}' % fragment)
+
+    except ImageTooLarge as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Image too large: {e}"
+        }), 413
+    except TensorFormatError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    except PLANT_CAPACITY_ERRORS as e:
+        # Ask the client to retry instead of piling up work
+        response = jsonify({
+            "status": "error",
+            "message": str(e)
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    except UnidentifiedImageError:
+        # PIL's message includes the repr of the upload stream
+        return jsonify({
+            "status": "error",
+            "message": "Could not read image: not a supported image file"
+        }), 400
+    except OSError as e:
+        # Truncated or corrupt image data; TimeoutError is an OSError too, so this comes after PLANT_CAPACITY_ERRORS
+        return jsonify({
+            "status": "error",
+            "message": f"Could not read image: {e}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/medicinal-plant-prediction/batch', methods=['POST'])
+def predict_plant_batch():
+    # Any number of "file" or "files" parts; results are returned in upload order
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'Image file not found'}), 400
+    if len(files) > PLANT_BATCH_MAX_FILES:
+        return jsonify({
+            "status": "error",
+            "message": f"{len(files)} images exceed the maximum of {PLANT_BATCH_MAX_FILES} per request"
+        }), 413
+    try:
+        top_k, compact = parse_plant_response_options(request.args)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    stage = metrics.stage_timer("stage_duration_seconds", endpoint="/medicinal-plant-prediction/batch")
+    try:
+        results = classify_plants(files, stage, "/medicinal-plant-prediction/batch")
+
+        with stage("postprocess"):
+            entries = []
+            for i, (predictions, error) in enumerate(results):
+                head = '"index":%d,"filename":%s' % (i, json.dumps(files[i].filename))
+                if error is None:
+                    entries.append('{%s,"status":"success",%s}' % (head, encode_plant_prediction(predictions, top_k, compact)))
+                else:
+                    entries.append('{%s,"status":"error","message":%s}' % (head, json.dumps(error)))
+
+        with stage("serialize"):
+            return json_response('{"status":"success","count":%d,"results":[%s]}' % (len(entries), ",".join(entries)))
+
+    except PLANT_CAPACITY_ERRORS as e:
+        response = jsonify({
+            "status": "error",
+            "message": str(e)
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/catalog')
+@app.route('/catalog/<version>')
+def catalog(version=None):
+    # Revalidated with ETag on the plain URL; the versioned URL never changes, so it is cached for a year
+    if version is not None and version != CATALOG_VERSION:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown catalog version; the current version is {CATALOG_VERSION}",
+            "version": CATALOG_VERSION
+        }), 404
+    response = json_response(CATALOG_JSON)
+    response.headers['X-Catalog-Version'] = CATALOG_VERSION
+    if version is None:
+        response.headers['Cache-Control'] = f'public, max-age={CATALOG_MAX_AGE}'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.set_etag(CATALOG_VERSION)
+    return response.make_conditional(request)
+
+@app.route('/medicinal-plant-prediction/stats')
+def plant_batching_stats():
+    return jsonify({
+        "status": "success",
+        "batching": plant_batcher.stats(),
+        "interpreter_pool": models.get("plant").stats() if models.is_loaded("plant") else None,
+        "upload_budget": upload_budget.stats(),
+        "decode_pool": _plant_decode_pool.stats() if _plant_decode_pool is not None else None
+    })
+
+@app.route('/models')
+def model_stats():
+    # Per-model load time and resident memory growth, for measuring startup cost
+    return jsonify({
+        "status": "success",
+        **models.stats()
+    })
+
+@app.route('/ready')
+def readiness():
+    # 200 only once every model is loaded and warmed up in this worker. Without
+    # PRELOAD_MODELS the first probe starts the warmup in the background.
+    ready = models.ready()
+    if not ready:
+        models.warmup_in_background()
+    return jsonify({
+        "status": "ready" if ready else "not ready",
+        **models.stats()
+    }), 200 if ready else 503
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify({
+        "status": "success",
+        "cache": prediction_cache.stats() if prediction_cache is not None else None
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Merged across all workers when METRICS_DIR is set, otherwise this worker only
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+if PRELOAD_MODELS:
+    # The rest are loaded per process: by gunicorn.conf.py in each worker, or below
+    models.warmup(fork_safe_only=True)
+
+if __name__ == '__main__':
+    if PRELOAD_MODELS:
+        models.warmup()
+    app.run(debug=True)
@@ -0,0 +1,224 @@
+"""ASGI entry point serving the Flask app with asynchronous request I/O.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 [--workers 4]
+
+Request bodies are received on the event loop and spooled (in memory up to
+ASGI_SPOOL_BYTES, then to a temporary file), so a slow upload holds a coroutine
+rather than a thread.  Once the body is complete, the request runs through the
+unchanged Flask app on a pool of ASGI_MAX_CONCURRENCY threads, where image
+decoding and inference happen; concurrent plant requests still meet in the
+micro-batcher.  Request and response formats are therefore identical to the
+gunicorn deployment, streamed NDJSON responses included.
+
+A request that waits longer than ASGI_QUEUE_TIMEOUT seconds for a thread, or
+arrives while ASGI_MAX_QUEUE requests are already waiting, gets a 503 with a
+Retry-After header.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import BULK_MAX_UPLOAD_BYTES, MAX_UPLOAD_BYTES, PRELOAD_MODELS, app as wsgi_app, metrics, models
+
+# Requests handled by the Flask app at the same time, i.e. the size of the thread pool
+ASGI_MAX_CONCURRENCY = int(os.environ.get("ASGI_MAX_CONCURRENCY", 8))
+# Requests that may wait for a thread, and for how many seconds, before getting a 503
+ASGI_MAX_QUEUE = int(os.environ.get("ASGI_MAX_QUEUE", 64))
+ASGI_QUEUE_TIMEOUT = float(os.environ.get("ASGI_QUEUE_TIMEOUT", 10))
+# Request bodies up to this size are kept in memory; larger ones go to a temporary file
+ASGI_SPOOL_BYTES = int(os.environ.get("ASGI_SPOOL_BYTES", 1024 * 1024))
+
+# Bodies beyond every route's limit are refused before they are received.
+# Flask applies the limit of the route itself once the request reaches it.
+BODY_LIMIT = max(MAX_UPLOAD_BYTES, BULK_MAX_UPLOAD_BYTES)
+
+metrics.describe("asgi_rejected_total", "counter", "Requests refused by the ASGI server before reaching the app")
+metrics.describe("asgi_queue_seconds", "histogram", "Time requests waited for an app thread")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def error_body(message):
+    # Byte for byte what jsonify() produces for the app's own errors
+    return wsgi_app.json.response({"status": "error", "message": message}).get_data()
+
+
+def build_environ(scope, body, length):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        # The spooled size, which also covers chunked uploads without a Content-Length
+        "CONTENT_LENGTH": str(length),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiAdapter:
+    def __init__(self, wsgi_app, max_concurrency=ASGI_MAX_CONCURRENCY, max_queue=ASGI_MAX_QUEUE,
+                 queue_timeout=ASGI_QUEUE_TIMEOUT, spool_bytes=ASGI_SPOOL_BYTES, body_limit=BODY_LIMIT):
+        self.wsgi_app = wsgi_app
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.spool_bytes = spool_bytes
+        self.body_limit = body_limit
+        self.executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix="asgi-app")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self.http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if PRELOAD_MODELS:
+                    # Same as gunicorn's post_worker_init: the worker is ready before it accepts requests
+                    await loop.run_in_executor(self.executor, models.warmup)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def reject(self, send, status, message, reason, retry_after=None):
+        metrics.inc("asgi_rejected_total", {"reason": reason})
+        body = error_body(message)
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(retry_after).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def read_body(self, receive):
+        # Spools the whole body without blocking the event loop on the network
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.body_limit:
+                body.close()
+                raise OverflowError()
+            if chunk:
+                body.write(chunk)
+            more_body = message.get("more_body", False)
+        body.seek(0)
+        return body, size
+
+    async def http(self, scope, receive, send):
+        too_large = f"Request body exceeds the limit of {self.body_limit} bytes"
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.body_limit:
+                await self.reject(send, 413, too_large, "too_large")
+                return
+        try:
+            body, length = await self.read_body(receive)
+        except ClientDisconnected:
+            return
+        except OverflowError:
+            await self.reject(send, 413, too_large, "too_large")
+            return
+
+        with body:
+            if self._waiting >= self.max_queue:
+                await self.reject(send, 503, f"More than {self.max_queue} requests are waiting",
+                                  "queue_full", retry_after=1)
+                return
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self.reject(send, 503, f"No worker thread became available within {self.queue_timeout} seconds",
+                                  "queue_timeout", retry_after=1)
+                return
+            finally:
+                self._waiting -= 1
+            metrics.observe("asgi_queue_seconds", {}, loop.time() - started)
+            try:
+                await self.run(build_environ(scope, body, length), send)
+            finally:
+                self._slots.release()
+
+    async def run(self, environ, send):
+        loop = asyncio.get_running_loop()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+            return response.setdefault("written", []).append
+
+        def start():
+            # Calls the app and produces the first chunk in one hop to the thread pool
+            iterable = self.wsgi_app(environ, start_response)
+            iterator = iter(iterable)
+            return iterable, iterator, next(iterator, None)
+
+        def close(iterable):
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+        # Every step of one request runs in the same context, so Flask's request context,
+        # pushed by stream_with_context, survives hopping between pool threads
+        context = contextvars.copy_context()
+        iterable, iterator, chunk = await loop.run_in_executor(self.executor, context.run, start)
+        try:
+            response["started"] = True
+            await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+            for written in response.get("written", ()):
+                await send({"type": "http.response.body", "body": written, "more_body": True})
+            while chunk is not None:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                # Streaming responses (the bulk CSV endpoints) score each chunk on the thread pool
+                chunk = await loop.run_in_executor(self.executor, context.run, next, iterator, None)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await loop.run_in_executor(self.executor, context.run, close, iterable)
+
+
+app = AsgiAdapter(wsgi_app)
@@ -0,0 +1,137 @@
+"""Request coalescing for the plant classifier.
+
+Concurrent callers submit one item each; background worker threads group
+whatever arrives within a short window into a single batch and run it in one
+call.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=5.0, workers=1, max_queue=0, name="batcher"):
+        # run_batch receives a list of items and must return one result per item
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.workers = max(1, int(workers))
+        # Submissions are rejected once this many items are waiting (0 = unbounded)
+        self.max_queue = max(0, int(max_queue))
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = {}
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._rejected = 0
+        self._timed_out = 0
+        self._late = 0
+
+    def submit(self, item, timeout=None):
+        # Block until the batch containing this item has been run
+        self._ensure_started()
+        if self.max_queue and self._queue.qsize() >= self.max_queue:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFull(f"{self.name} queue is full ({self.max_queue} waiting)")
+
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if not future.cancel():
+                # A worker already took the item and may still read it. Items can be views of the
+                # caller's memory (a shared decode slot, a reused buffer), so the caller must not
+                # release it before the batch is done; wait for the batch and return its result.
+                with self._lock:
+                    self._late += 1
+                return future.result()
+            # No worker had picked it up yet, so it is dropped
+            with self._lock:
+                self._timed_out += 1
+            raise TimeoutError(f"{self.name} did not produce a result within {timeout} seconds")
+
+    def _ensure_started(self):
+        # Worker threads are started lazily so the batcher can be created at import time
+        if len(self._threads) == self.workers and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._loop, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _take(self, timeout=None):
+        # Next queued entry whose caller is still waiting for it
+        while True:
+            entry = self._queue.get(timeout=timeout) if timeout is not None else self._queue.get()
+            if entry[1].set_running_or_notify_cancel():
+                return entry
+
+    def _collect(self):
+        batch = [self._take()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Once the window has closed, still take anything already queued
+            remaining = max(deadline - time.perf_counter(), 0.0)
+            try:
+                batch.append(self._take(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            finished = time.perf_counter()
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+                self._run_seconds += finished - started
+
+    def stats(self):
+        with self._lock:
+            batches, items = self._batches, self._items
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "workers": self.workers,
+                "batches": batches,
+                "items": items,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "late": self._late,
+                "mean_batch_size": items / batches if batches else 0.0,
+                "batch_size_counts": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "mean_queue_wait_ms": self._wait_seconds / items * 1000.0 if items else 0.0,
+                "mean_batch_run_ms": self._run_seconds / batches * 1000.0 if batches else 0.0
+            }
@@ -0,0 +1,127 @@
+"""Throughput of plant prediction with in-thread versus multi-process decoding.
+
+Sends phone photos to /medicinal-plant-prediction through Flask's test client
+from twice as many client threads as cores, once with preprocessing in the
+request threads and once with PLANT_DECODE_PROCESSES set to the core count.
+Each configuration runs in a fresh process pinned to the first N cores (the
+decoding processes inherit the pinning), for N = 1, 2, 4, ... up to the cores
+available.  The speedup column is relative to the same mode on the fewest
+cores, so it shows how each mode scales.
+
+    python bench_decode_pool.py [--cores 1 2 4 8] [--duration 10] [--size 4032x3024] [--json results.json]
+
+A stand-in plant model is generated when medicinal-plant-prediction.tflite
+is missing, and the prediction cache is disabled.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+import warnings
+
+from bench_preprocess import make_photo
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+MODES = ["threads", "processes"]
+
+
+def run_config(mode, cores, duration, warmup, photo, model_path, results):
+    # Runs in a fresh process; the environment is set before the app is imported
+    os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:cores])
+    os.environ.update(CACHE_ENABLED="0", PLANT_MODEL_PATH=model_path,
+                      PLANT_DECODE_PROCESSES=str(cores if mode == "processes" else 0))
+    warnings.filterwarnings("ignore")
+    import app
+
+    app.models.warmup()
+    client = app.app.test_client()
+    started = time.perf_counter()
+    measure_from, end = started + warmup, started + warmup + duration
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def send():
+        recorded, failed = [], 0
+        while True:
+            sent = time.perf_counter()
+            if sent >= end:
+                break
+            response = client.post("/medicinal-plant-prediction", data={"file": (io.BytesIO(photo), "photo.jpg")})
+            if sent >= measure_from:
+                recorded.append(time.perf_counter() - sent)
+                failed += response.status_code != 200
+        with lock:
+            timings.extend(recorded)
+            errors.append(failed)
+
+    clients = [threading.Thread(target=send) for _ in range(2 * cores)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    # atexit handlers do not run in a multiprocessing child, so stop the decoding processes here
+    if app.get_plant_decode_pool() is not None:
+        app.get_plant_decode_pool().close()
+
+    results.put({
+        "mode": mode,
+        "cores": cores,
+        "clients": len(clients),
+        "images_per_second": len(timings) / duration,
+        "p50_ms": statistics.median(timings) * 1000 if timings else None,
+        "errors": sum(errors),
+    })
+
+
+def main():
+    available = len(os.sched_getaffinity(0))
+    default_cores = [n for n in (1, 2, 4, 8, 16, 32, 64) if n < available] + [available]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cores", type=int, nargs="+", default=default_cores)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per configuration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--size", default="4032x3024", help="photo size, WIDTHxHEIGHT")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    model_path = os.environ.get("PLANT_MODEL_PATH", os.path.join(current_dir, "medicinal-plant-prediction.tflite"))
+    if not os.path.exists(model_path):
+        from standin_model import write_standin_model
+        standin_dir = tempfile.TemporaryDirectory()  # removed when the script exits
+        model_path = write_standin_model(os.path.join(standin_dir.name, "standin-plant-model.tflite"))
+        print(f"Plant model not found; using a generated stand-in at {model_path}")
+
+    width, height = (int(n) for n in args.size.split("x"))
+    photo = make_photo(width, height, "JPEG", "RGB")
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    print(f"{'cores':>5} {'mode':<10} {'images/s':>9} {'speedup':>8} {'p50 ms':>9}")
+    for cores in args.cores:
+        for mode in MODES:
+            results = ctx.Queue()
+            proc = ctx.Process(target=run_config,
+                               args=(mode, min(cores, available), args.duration, args.warmup, photo, model_path,
+                                     results))
+            proc.start()
+            row = results.get()
+            proc.join()
+            # Relative to the same mode on the fewest cores
+            first = next((r for r in rows if r["mode"] == mode), row)
+            row["speedup"] = row["images_per_second"] / first["images_per_second"]
+            rows.append(row)
+            print(f"{row['cores']:5d} {mode:<10} {row['images_per_second']:9.1f} {row['speedup']:7.2f}x "
+                  f"{row['p50_ms']:9.1f}{'  ' + str(row['errors']) + ' errors' if row['errors'] else ''}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
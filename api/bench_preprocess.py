@@ -0,0 +1,136 @@
+"""Microbenchmark for plant image preprocessing.
+
+Compares the original pipeline (full decode, resize, float conversion, divide,
+astype, expand_dims) against ImagePreprocessor on phone-camera-sized photos.
+Each case runs in a fresh process so peak memory numbers do not leak between
+cases.
+
+    python bench_preprocess.py [--iterations 10] [--json results.json]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from model_registry import current_rss
+from preprocess import ImagePreprocessor
+
+INPUT_SIZE = (256, 256)
+
+# (label, width, height, format, mode)
+CASES = [
+    ("12MP JPEG", 4032, 3024, "JPEG", "RGB"),
+    ("48MP JPEG", 8000, 6000, "JPEG", "RGB"),
+    ("12MP JPEG grayscale", 4032, 3024, "JPEG", "L"),
+    ("12MP PNG RGBA", 4032, 3024, "PNG", "RGBA"),
+]
+
+
+def make_photo(width, height, fmt, mode):
+    # Smooth gradients plus noise, so the file compresses like a real photo
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    channels = [
+        (x / width * 200 + y / height * 55),
+        (np.sin(x / 97.0) * 60 + 120),
+        (np.cos(y / 131.0) * 60 + 100),
+    ]
+    pixels = np.stack(channels, axis=-1) + rng.normal(0, 12, (height, width, 3))
+    img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).convert(mode)
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=90)
+    return buf.getvalue()
+
+
+def reset_peak_rss():
+    # Linux resets VmHWM (peak RSS) when "5" is written to clear_refs
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def peak_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def original_pipeline(img_bytes):
+    img = Image.open(io.BytesIO(img_bytes))
+    img = img.convert("RGB")  # the original code skipped this and failed on RGBA/grayscale
+    img = img.resize(INPUT_SIZE)
+    img_array = np.asarray(img, dtype=np.float32)
+    img_array = img_array / 255.0
+    img_array = img_array.astype(np.float32)
+    return np.expand_dims(img_array, axis=0)
+
+
+def make_preprocessor():
+    preprocessor = ImagePreprocessor(INPUT_SIZE[1], INPUT_SIZE[0], 3, np.float32)
+    return lambda img_bytes: preprocessor(io.BytesIO(img_bytes))
+
+
+PIPELINES = {
+    "original": lambda: original_pipeline,
+    "preprocessor": make_preprocessor,
+}
+
+
+def run_case(pipeline, img_bytes, iterations, results):
+    fn = PIPELINES[pipeline]()
+    fn(img_bytes)  # warm up decoders and the reusable buffer
+
+    rss_before = current_rss()
+    reset_peak_rss()
+    tracemalloc.start()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(img_bytes)
+        timings.append(time.perf_counter() - started)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results.put({
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "peak_traced_bytes": traced_peak,
+        "peak_rss_growth_bytes": max(0, peak_rss() - rss_before),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for label, width, height, fmt, mode in CASES:
+        img_bytes = make_photo(width, height, fmt, mode)
+        for pipeline in PIPELINES:
+            results = ctx.Queue()
+            proc = ctx.Process(target=run_case, args=(pipeline, img_bytes, args.iterations, results))
+            proc.start()
+            row = {"case": label, "file_bytes": len(img_bytes), "pipeline": pipeline, **results.get()}
+            proc.join()
+            rows.append(row)
+            print(f"{label:<22} {pipeline:<13} {row['median_ms']:8.1f} ms  "
+                  f"numpy peak {row['peak_traced_bytes'] / 2**20:7.1f} MiB  "
+                  f"RSS peak growth {row['peak_rss_growth_bytes'] / 2**20:7.1f} MiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Offline API benchmark through Flask's test client.
+
+Measures requests/sec, rows/sec, latency percentiles and CPU time per request
+for every prediction endpoint across batch sizes and image resolutions.  No server or network is
+needed.  If medicinal-plant-prediction.tflite is missing, a stand-in with the
+same input and output shape is generated (see standin_model.py), and the results
+are marked accordingly.
+
+    python benchmark.py [--duration 2] [--output results.json]
+    python benchmark.py --baseline previous.json [--tolerance 0.2]
+
+With --baseline, a case whose median latency is more than --tolerance slower
+than in the baseline file counts as a regression, and the script exits non-zero.
+The prediction cache is disabled unless --cache is given, so repeated payloads
+measure the models rather than cache hits.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from categories import crop_type_dict, soil_dict
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+BATCH_SIZES = [1, 10, 100, 1000]
+BULK_ROWS = [1000, 10000]
+# (label, width, height)
+IMAGE_SIZES = [
+    ("256x256", 256, 256),
+    ("1024x768", 1024, 768),
+    ("12MP", 4032, 3024),
+]
+
+CROP_SAMPLE = {"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 20.87,
+               "humidity": 82.00, "ph": 6.5, "rainfall": 202.93}
+FERTILIZER_SAMPLE = {"temperature": 26, "humidity": 52, "moisture": 38, "nitrogen": 37, "potassium": 0,
+                     "phosphorous": 0, "soil_type": "Sandy", "crop_type": "Maize"}
+FIELD_SAMPLE = {**CROP_SAMPLE, "moisture": 38, "soil_type": "Sandy", "crop_type": "Maize"}
+
+
+def crop_samples(count, seed=0):
+    # Spread over realistic ranges so the trees take varied paths
+    rng = np.random.default_rng(seed)
+    return [{
+        "nitrogen": int(rng.integers(0, 140)), "phosphorus": int(rng.integers(5, 145)),
+        "potassium": int(rng.integers(5, 205)), "temperature": float(rng.uniform(9, 43)),
+        "humidity": float(rng.uniform(14, 100)), "ph": float(rng.uniform(3.5, 9.9)),
+        "rainfall": float(rng.uniform(20, 298))
+    } for _ in range(count)]
+
+
+def fertilizer_samples(count, seed=0):
+    rng = np.random.default_rng(seed)
+    soil_types, crop_types = list(soil_dict), list(crop_type_dict)
+    return [{
+        "temperature": int(rng.integers(25, 38)), "humidity": int(rng.integers(50, 72)),
+        "moisture": int(rng.integers(25, 65)), "nitrogen": int(rng.integers(4, 42)),
+        "potassium": int(rng.integers(0, 19)), "phosphorous": int(rng.integers(0, 42)),
+        "soil_type": soil_types[rng.integers(len(soil_types))],
+        "crop_type": crop_types[rng.integers(len(crop_types))]
+    } for _ in range(count)]
+
+
+def field_samples(count, seed=0):
+    # Fertilizer inputs with the crop-only ones (ph, rainfall) added
+    rng = np.random.default_rng(seed + 1)
+    return [{**sample, "ph": float(rng.uniform(3.5, 9.9)), "rainfall": float(rng.uniform(20, 298))}
+            for sample in fertilizer_samples(count, seed)]
+
+
+def to_csv(samples):
+    fields = list(samples[0])
+    lines = [",".join(fields)] + [",".join(str(sample[field]) for field in fields) for sample in samples]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def build_cases(args):
+    # (name, endpoint, rows per request, function that sends one request)
+    from bench_preprocess import make_photo
+    cases = [
+        ("crop", "/crop-recommendation", 1, lambda client: client.post("/crop-recommendation", json=CROP_SAMPLE)),
+        ("fertilizer", "/fertilizer-recommendation", 1,
+         lambda client: client.post("/fertilizer-recommendation", json=FERTILIZER_SAMPLE)),
+        ("field-advisory", "/field-advisory", 1, lambda client: client.post("/field-advisory", json=FIELD_SAMPLE)),
+    ]
+    for size in args.batch_sizes:
+        crop_body, fertilizer_body = crop_samples(size), fertilizer_samples(size)
+        cases.append((f"crop-batch-{size}", "/crop-recommendation/batch", size,
+                      lambda client, body=crop_body: client.post("/crop-recommendation/batch", json=body)))
+        cases.append((f"fertilizer-batch-{size}", "/fertilizer-recommendation/batch", size,
+                      lambda client, body=fertilizer_body: client.post("/fertilizer-recommendation/batch", json=body)))
+        cases.append((f"field-advisory-batch-{size}", "/field-advisory/batch", size,
+                      lambda client, body=field_samples(size): client.post("/field-advisory/batch", json=body)))
+    for rows in args.bulk_rows:
+        crop_csv, fertilizer_csv = to_csv(crop_samples(rows)), to_csv(fertilizer_samples(rows))
+        cases.append((f"crop-bulk-{rows}", "/crop-recommendation/bulk", rows,
+                      lambda client, body=crop_csv: client.post("/crop-recommendation/bulk", data=body,
+                                                                content_type="text/csv")))
+        cases.append((f"fertilizer-bulk-{rows}", "/fertilizer-recommendation/bulk", rows,
+                      lambda client, body=fertilizer_csv: client.post("/fertilizer-recommendation/bulk", data=body,
+                                                                      content_type="text/csv")))
+    crop_sweep = {"base": CROP_SAMPLE, "sweep": [{"feature": "rainfall", "start": 20, "stop": 300, "steps": 100},
+                                                 {"feature": "ph", "start": 3.5, "stop": 9.5, "steps": 100}]}
+    fertilizer_sweep = {"base": FERTILIZER_SAMPLE, "sweep": [{"feature": "moisture", "start": 25, "stop": 65, "steps": 100},
+                                                             {"feature": "nitrogen", "start": 4, "stop": 42, "steps": 100}]}
+    cases.append(("crop-sweep-100x100", "/crop-recommendation/sweep", 10000,
+                  lambda client: client.post("/crop-recommendation/sweep", json=crop_sweep)))
+    cases.append(("fertilizer-sweep-100x100", "/fertilizer-recommendation/sweep", 10000,
+                  lambda client: client.post("/fertilizer-recommendation/sweep", json=fertilizer_sweep)))
+    for label, width, height in IMAGE_SIZES:
+        photo = make_photo(width, height, "JPEG", "RGB")
+        cases.append((f"plant-{label}", "/medicinal-plant-prediction", 1,
+                      lambda client, body=photo: client.post("/medicinal-plant-prediction",
+                                                             data={"file": (io.BytesIO(body), "photo.jpg")})))
+    photos = [make_photo(1024, 768, "JPEG", "RGB")] * 8
+    cases.append(("plant-batch-8x1024x768", "/medicinal-plant-prediction/batch", len(photos),
+                  lambda client: client.post("/medicinal-plant-prediction/batch",
+                                             data={"files": [(io.BytesIO(photo), "photo.jpg") for photo in photos]})))
+
+    # The same photo as already-resized pixels, the way an on-device client would send it
+    from app import get_plant_preprocessor
+    preprocessor = get_plant_preprocessor()
+    pixels = np.asarray(preprocessor.load(io.BytesIO(make_photo(1024, 768, "JPEG", "RGB"))))
+    if pixels.ndim == 2:
+        pixels = pixels[..., np.newaxis]
+    normalized = preprocessor.fill(pixels, np.empty(preprocessor.shape, preprocessor.dtype))
+    npy = io.BytesIO()
+    np.save(npy, pixels)
+    shape = "x".join(map(str, preprocessor.shape))
+    for label, body, content_type, dtype in [("tensor-uint8", pixels.tobytes(), "application/octet-stream", "uint8"),
+                                             (f"tensor-{preprocessor.dtype}", normalized.tobytes(),
+                                              "application/octet-stream", str(preprocessor.dtype)),
+                                             ("npy-uint8", npy.getvalue(), "application/x-npy", "uint8")]:
+        cases.append((f"plant-{label}", "/medicinal-plant-prediction", 1,
+                      lambda client, body=body, content_type=content_type, dtype=dtype: client.post(
+                          "/medicinal-plant-prediction", data=body, content_type=content_type,
+                          headers={"X-Tensor-Shape": shape, "X-Tensor-Dtype": dtype})))
+    return cases
+
+
+def run_case(client, send, rows, duration, min_requests, warmup):
+    for _ in range(warmup):
+        send(client)
+    timings, errors = [], 0
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    while len(timings) < min_requests or time.perf_counter() - started < duration:
+        request_started = time.perf_counter()
+        response = send(client)
+        response.get_data()  # drain streaming responses inside the timing
+        timings.append(time.perf_counter() - request_started)
+        errors += response.status_code != 200
+    elapsed = time.perf_counter() - started
+    # CPU of the whole process, including batching and interpreter threads
+    cpu = time.process_time() - cpu_started
+
+    percentiles = np.percentile(timings, [50, 90, 95, 99]) * 1000
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "rows_per_request": rows,
+        "requests_per_second": len(timings) / elapsed,
+        "rows_per_second": len(timings) * rows / elapsed,
+        "cpu_ms_per_request": cpu / len(timings) * 1000,
+        "latency_ms": {
+            "min": min(timings) * 1000,
+            "mean": statistics.fmean(timings) * 1000,
+            "p50": percentiles[0],
+            "p90": percentiles[1],
+            "p95": percentiles[2],
+            "p99": percentiles[3],
+            "max": max(timings) * 1000,
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=current_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    # Cases whose median latency grew by more than tolerance relative to the baseline
+    with open(baseline_path) as f:
+        baseline = {row["case"]: row for row in json.load(f)["results"]}
+    regressions = []
+    for row in results:
+        previous = baseline.get(row["case"])
+        if previous is None:
+            continue
+        before, after = previous["latency_ms"]["p50"], row["latency_ms"]["p50"]
+        change = after / before - 1 if before else 0.0
+        flag = "REGRESSION" if change > tolerance else ""
+        print(f"{row['case']:<24} p50 {before:9.3f} -> {after:9.3f} ms ({change:+7.1%}) {flag}")
+        if flag:
+            regressions.append(row["case"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds spent on each case")
+    parser.add_argument("--min-requests", type=int, default=20, help="minimum requests per case")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests before each case")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--bulk-rows", type=int, nargs="+", default=BULK_ROWS)
+    parser.add_argument("--only", help="run only cases whose name contains this string")
+    parser.add_argument("--cache", action="store_true", help="leave the prediction cache enabled")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    # Configure the app before importing it
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "0"
+    model_path = os.environ.get("PLANT_MODEL_PATH", os.path.join(current_dir, "medicinal-plant-prediction.tflite"))
+    standin = not os.path.exists(model_path)
+    if standin:
+        from standin_model import write_standin_model
+        standin_dir = tempfile.TemporaryDirectory()  # removed when the script exits
+        model_path = write_standin_model(os.path.join(standin_dir.name, "standin-plant-model.tflite"))
+        os.environ["PLANT_MODEL_PATH"] = model_path
+        print(f"Plant model not found; using a generated stand-in at {model_path}")
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    from app import app
+    client = app.test_client()
+
+    results = []
+    for name, endpoint, rows, send in build_cases(args):
+        if args.only and args.only not in name:
+            continue
+        row = {"case": name, "endpoint": endpoint, **run_case(client, send, rows, args.duration,
+                                                            args.min_requests, args.warmup)}
+        results.append(row)
+        latency = row["latency_ms"]
+        print(f"{name:<24} {row['requests_per_second']:9.1f} req/s {row['rows_per_second']:11.1f} rows/s  "
+              f"p50 {latency['p50']:8.3f}  p95 {latency['p95']:8.3f}  p99 {latency['p99']:8.3f} ms  "
+              f"cpu {row['cpu_ms_per_request']:8.3f} ms/req"
+              f"{'  ' + str(row['errors']) + ' errors' if row['errors'] else ''}")
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "plant_model": "stand-in" if standin else os.path.basename(model_path),
+            "cache_enabled": args.cache,
+            "duration_seconds": args.duration,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+    failed = sum(row["errors"] for row in results)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Codes of the fertilizer model's categorical features.
+
+The fertilizer model was trained with soil and crop types encoded as these
+integers.  The API and the model compiler both need them; keeping them here
+lets compile_models.py read the training data without importing the app.
+"""
+
+# Soil type mapping (for fertilizer recommendation)
+soil_dict = {
+    'Loamy': 1,
+    'Sandy': 2,
+    'Clayey': 3,
+    'Black': 4,
+    'Red': 5
+}
+
+# Crop type mapping (for fertilizer recommendation)
+crop_type_dict = {
+    'Sugarcane': 1,
+    'Cotton': 2,
+    'Millets': 3,
+    'Paddy': 4,
+    'Pulses': 5,
+    'Wheat': 6,
+    'Tobacco': 7,
+    'Barley': 8,
+    'Oil seeds': 9,
+    'Ground Nuts': 10,
+    'Maize': 11
+}
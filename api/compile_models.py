@@ -0,0 +1,120 @@
+"""Compile the pickled sklearn models into flat NumPy arrays.
+
+    python compile_models.py              # compile and verify parity
+    python compile_models.py --benchmark  # also compare latency against sklearn
+
+Writes crop-recommendation.compiled/ and fertilizer-recommendation.compiled/
+(directories of memory-mappable .npy files) next to the pickles.  Parity is checked on the training datasets (when present) plus random
+samples spanning each feature's range, and the script exits non-zero if any
+prediction or probability differs from sklearn.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from categories import crop_type_dict, soil_dict
+from tree_engine import check_parity, compile_estimator, load_compiled, save_compiled
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+models_dir = os.path.join(current_dir, "..", "models")
+
+MODELS = {
+    "crop": os.path.join(current_dir, "crop-recommendation.pkl"),
+    "fertilizer": os.path.join(current_dir, "fertilizer-recommendation.pkl"),
+}
+
+BENCHMARK_BATCH_SIZES = [1, 100, 100_000]
+
+
+def compiled_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + ".compiled"
+
+
+def load_dataset(name):
+    # Feature matrices from the training CSVs, in the column order the API uses
+    import csv
+    if name == "crop":
+        path = os.path.join(models_dir, "crop-recommender", "dataset.csv")
+        columns = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+        encoders = {}
+    else:
+        path = os.path.join(models_dir, "fertilizer-recommendation", "Fertilizer Prediction.csv")
+        columns = ["Temparature", "Humidity ", "Moisture", "Nitrogen", "Potassium", "Phosphorous",
+                   "Soil Type", "Crop Type"]
+        encoders = {"Soil Type": soil_dict, "Crop Type": crop_type_dict}
+    if not os.path.exists(path):
+        return np.empty((0, len(columns)))
+    with open(path, newline="") as f:
+        rows = [[encoders[c][row[c]] if c in encoders else float(row[c]) for c in columns]
+                for row in csv.DictReader(f)]
+    return np.array(rows, dtype=np.float64)
+
+
+def random_samples(estimator, dataset, count, seed=0):
+    # Uniform samples over (slightly beyond) each feature's observed range
+    rng = np.random.default_rng(seed)
+    if len(dataset):
+        low, high = dataset.min(axis=0), dataset.max(axis=0)
+    else:
+        low, high = np.zeros(estimator.n_features_in_), np.full(estimator.n_features_in_, 100.0)
+    span = high - low
+    return rng.uniform(low - 0.1 * span, high + 0.1 * span, size=(count, estimator.n_features_in_))
+
+
+def time_call(fn, X, min_seconds=0.5):
+    fn(X)
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmark", action="store_true", help="compare latency against sklearn")
+    parser.add_argument("--samples", type=int, default=100_000, help="random samples used for the parity check")
+    args = parser.parse_args()
+
+    # The models were fitted on DataFrames; predicting on arrays is expected here
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    failed = False
+    for name, pickle_path in MODELS.items():
+        with open(pickle_path, "rb") as f:
+            estimator = pickle.load(f)
+        output_path = compiled_path(pickle_path)
+        save_compiled(output_path, compile_estimator(estimator))
+        compiled = load_compiled(output_path)
+        size = sum(entry.stat().st_size for entry in os.scandir(output_path))
+        print(f"{name}: {compiled.n_trees} tree(s), {len(compiled.feature)} nodes -> {os.path.basename(output_path)}/ "
+              f"({size / 1024:.0f} KiB)")
+
+        dataset = load_dataset(name)
+        X = np.vstack([dataset, random_samples(estimator, dataset, args.samples)])
+        parity = check_parity(estimator, compiled, X)
+        ok = parity["prediction_mismatches"] == 0 and parity["max_proba_difference"] == 0.0
+        failed |= not ok
+        print(f"  parity on {parity['rows']} rows: {parity['prediction_mismatches']} mismatches, "
+              f"max |proba diff| {parity['max_proba_difference']:.3g} -> {'OK' if ok else 'FAILED'}")
+
+        if args.benchmark:
+            for batch_size in BENCHMARK_BATCH_SIZES:
+                batch = random_samples(estimator, dataset, batch_size, seed=batch_size)
+                sklearn_seconds = time_call(estimator.predict, batch)
+                compiled_seconds = time_call(compiled.predict, batch)
+                print(f"  batch {batch_size:>7}: sklearn {sklearn_seconds * 1000:9.3f} ms, "
+                      f"compiled {compiled_seconds * 1000:9.3f} ms ({sklearn_seconds / compiled_seconds:5.1f}x)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""gunicorn settings.
+
+With PRELOAD_MODELS=1 the app is imported once in the master, which loads the
+fork-safe models (the memory-mapped tree models) before any worker is forked.
+Each worker then drops anything fork-unsafe it inherited and loads its own
+TFLite interpreters.
+"""
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+# gunicorn also reads WEB_CONCURRENCY for the worker count
+
+preload_models = os.environ.get("PRELOAD_MODELS", "0") == "1"
+# GUNICORN_PRELOAD=0 keeps eager loading but does it separately in every worker
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1" if preload_models else "0") == "1"
+
+
+def on_starting(server):
+    # Counters from a previous run would otherwise be summed into this one
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir:
+        from metrics import clear_snapshots
+        clear_snapshots(metrics_dir)
+
+
+def pre_fork(server, worker):
+    # Move everything the master has allocated out of the GC's reach, so the
+    # collector in each worker does not write to (and so copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    app = sys.modules.get("app")
+    if app is not None:
+        app.models.after_fork()
+
+
+def post_worker_init(worker):
+    if preload_models:
+        import app
+        app.models.warmup()
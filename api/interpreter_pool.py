@@ -0,0 +1,96 @@
+"""A fixed-size pool of TFLite interpreters.
+
+A single Interpreter must not be used by two threads at once, so every caller
+checks one out for the duration of its set_tensor/invoke/get_tensor sequence.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from ai_edge_litert.interpreter import Interpreter
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class InterpreterPool:
+    def __init__(self, model_path, size=1, num_threads=1, timeout=10.0):
+        self.model_path = model_path
+        self.size = max(1, int(size))
+        self.num_threads = max(1, int(num_threads))
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._waiting = 0
+        # Total time callers spent waiting for an interpreter, including those that timed out
+        self._wait_seconds = 0.0
+
+        for _ in range(self.size):
+            interpreter = Interpreter(model_path=model_path, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            self._idle.put(interpreter)
+
+        # Tensor indices and dtypes are identical across instances of the same model
+        interpreter = self._idle.get()
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+        self._idle.put(interpreter)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self._waiting += 1
+        started = time.perf_counter()
+        try:
+            interpreter = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No interpreter became available within {timeout} seconds")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                self._wait_seconds += time.perf_counter() - started
+
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield interpreter
+        finally:
+            self._idle.put(interpreter)
+
+    def warmup(self, batch):
+        # Run batch through every interpreter once, so kernel preparation and allocation
+        # happen now rather than in the first requests each interpreter serves
+        interpreters = [self._idle.get(timeout=self.timeout) for _ in range(self.size)]
+        try:
+            input_index = self.input_details[0]['index']
+            for interpreter in interpreters:
+                if tuple(interpreter.get_input_details()[0]['shape']) != batch.shape:
+                    interpreter.resize_tensor_input(input_index, batch.shape)
+                    interpreter.allocate_tensors()
+                interpreter.set_tensor(input_index, batch)
+                interpreter.invoke()
+        finally:
+            for interpreter in interpreters:
+                self._idle.put(interpreter)
+
+    def stats(self):
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "num_threads": self.num_threads,
+                "idle": idle,
+                "in_use": self.size - idle,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds": self._wait_seconds
+            }
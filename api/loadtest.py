@@ -0,0 +1,254 @@
+"""Load test the API under gunicorn and find where it saturates.
+
+Starts gunicorn locally (gunicorn.conf.py, models preloaded) and drives it
+with a mix of crop, fertilizer and plant requests from a growing number of
+concurrent clients.  Each client sends its next request as soon as the last
+one is answered.  For every concurrency step it reports throughput, p50 and
+p99 latency, the error rate, and the CPU use and RSS of every gunicorn worker,
+read from /proc.  The knee is the last step whose throughput still grew by at
+least --knee-gain over the step before; beyond it, added concurrency mostly
+adds latency.
+
+    python loadtest.py [--workers 2] [--threads 4] [--concurrency 1 2 4 8 16 32]
+                       [--duration 10] [--mix crop=5,fertilizer=3,plant=2] [--json results.json]
+
+Photos are synthetic and, when medicinal-plant-prediction.tflite is missing,
+a stand-in model is generated (see standin_model.py).  The prediction cache
+is disabled unless --cache is given.  The clients are threads in this
+process, so run it on a machine with cores to spare, or the client becomes
+the bottleneck.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmark import crop_samples, fertilizer_samples
+from bench_preprocess import make_photo
+from measure_memory import child_pids, multipart, smaps_rollup
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Phone uploads of a few sizes
+PHOTO_SIZES = [(640, 480), (1024, 768), (2048, 1536)]
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("crop", "fertilizer", "plant"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} in the mix")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_requests(seed=0):
+    # endpoint -> list of (path, body, content type) to pick from
+    json_type = "application/json"
+    photos = [multipart("photo.jpg", make_photo(width, height, "JPEG", "RGB")) for width, height in PHOTO_SIZES]
+    return {
+        "crop": [("/crop-recommendation", json.dumps(sample).encode(), json_type)
+                 for sample in crop_samples(200, seed)],
+        "fertilizer": [("/fertilizer-recommendation", json.dumps(sample).encode(), json_type)
+                       for sample in fertilizer_samples(200, seed)],
+        "plant": [("/medicinal-plant-prediction", body, content_type) for body, content_type in photos],
+    }
+
+
+def cpu_seconds(pid):
+    # User plus system time of one process
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def worker_usage(pids):
+    usage = {}
+    for pid in pids:
+        try:
+            usage[pid] = (cpu_seconds(pid), smaps_rollup(pid)["rss"])
+        except OSError:
+            continue  # the worker was restarted
+    return usage
+
+
+def run_step(args, requests, mix, concurrency, workers, seed):
+    # Closed loop: every client sends its next request as soon as the previous one is answered.
+    # Requests started during the warmup are not recorded.
+    names, weights = list(mix), list(mix.values())
+    started = time.perf_counter()
+    measure_from, end = started + args.warmup, started + args.warmup + args.duration
+    samples = []
+    lock = threading.Lock()
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        connection, recorded = None, []
+        while True:
+            sent = time.perf_counter()
+            if sent >= end:
+                break
+            name = rng.choices(names, weights)[0]
+            path, body, content_type = rng.choice(requests[name])
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=args.timeout)
+                connection.request("POST", path, body, {"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                if connection is not None:
+                    connection.close()
+                connection = None
+            if sent >= measure_from:
+                recorded.append((name, time.perf_counter() - sent, ok))
+        if connection is not None:
+            connection.close()
+        with lock:
+            samples.extend(recorded)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(max(0.0, measure_from - time.perf_counter()))
+    before = worker_usage(workers)
+    time.sleep(max(0.0, end - time.perf_counter()))
+    after = worker_usage(workers)
+    for thread in threads:
+        thread.join()
+
+    def summarize(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        errors = sum(not ok for _, _, ok in rows)
+        return {
+            "requests": len(rows),
+            "requests_per_second": len(rows) / args.duration,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(rows) else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(rows) else None,
+            "error_rate": errors / len(rows) if rows else 0.0,
+        }
+
+    return {
+        "concurrency": concurrency,
+        **summarize(samples),
+        "endpoints": {name: summarize([row for row in samples if row[0] == name]) for name in names},
+        "workers": [{
+            "pid": pid,
+            "cpu_percent": (after[pid][0] - before[pid][0]) / args.duration * 100,
+            "rss_bytes": after[pid][1],
+        } for pid in after if pid in before],
+    }
+
+
+def find_knee(steps, gain):
+    # The last step that still raised throughput by at least `gain` over the step before it
+    knee = steps[0]
+    for previous, step in zip(steps, steps[1:]):
+        if step["requests_per_second"] < previous["requests_per_second"] * (1 + gain):
+            break
+        knee = step
+    return knee
+
+
+def wait_until_ready(port, proc, workers, timeout=120):
+    # Every worker warms its models before accepting requests, so once all of them
+    # have been forked, a run of successful /ready probes means the server is up
+    deadline = time.time() + timeout
+    ready = 0
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/ready")
+            ready = ready + 1 if connection.getresponse().status == 200 else 0
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            ready = 0
+        if ready >= 2 * workers and len(child_pids(proc.pid)) == workers:
+            return child_pids(proc.pid)
+        time.sleep(0.1)
+    raise RuntimeError("gunicorn did not become ready in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each step")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("crop=5,fertilizer=3,plant=2"),
+                        help="relative weight of each endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout per request")
+    parser.add_argument("--knee-gain", type=float, default=0.1, help="throughput gain that still counts as scaling")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--cache", action="store_true", help="leave the prediction cache enabled")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    plant_model_path = os.environ.get("PLANT_MODEL_PATH",
+                                      os.path.join(current_dir, "medicinal-plant-prediction.tflite"))
+    standin_dir = None
+    if not os.path.exists(plant_model_path):
+        from standin_model import write_standin_model
+        standin_dir = tempfile.TemporaryDirectory()
+        plant_model_path = write_standin_model(os.path.join(standin_dir.name, "standin-plant-model.tflite"))
+        print(f"Plant model not found; using a generated stand-in at {plant_model_path}")
+    os.environ["PLANT_MODEL_PATH"] = plant_model_path
+
+    requests = build_requests()
+    env = dict(os.environ, PRELOAD_MODELS="1", WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               PORT=str(args.port), CACHE_ENABLED="1" if args.cache else "0")
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                            cwd=current_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    steps = []
+    try:
+        workers = wait_until_ready(args.port, proc, args.workers)
+        print(f"gunicorn: {len(workers)} workers x {args.threads} threads; "
+              f"mix {', '.join(f'{name}={weight:g}' for name, weight in args.mix.items())}")
+        print(f"{'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}  "
+              f"{'worker CPU %':>14} {'worker RSS MiB':>15}")
+        for seed, concurrency in enumerate(args.concurrency):
+            step = run_step(args, requests, args.mix, concurrency, workers, seed)
+            steps.append(step)
+            cpu = "/".join(f"{worker['cpu_percent']:.0f}" for worker in step["workers"])
+            rss = "/".join(f"{worker['rss_bytes'] / 2 ** 20:.0f}" for worker in step["workers"])
+            p50 = f"{step['p50_ms']:9.1f}" if step["p50_ms"] is not None else f"{'-':>9}"
+            p99 = f"{step['p99_ms']:9.1f}" if step["p99_ms"] is not None else f"{'-':>9}"
+            print(f"{concurrency:7d} {step['requests_per_second']:9.1f} {p50} {p99} "
+                  f"{step['error_rate']:7.1%}  {cpu:>14} {rss:>15}")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    knee = find_knee(steps, args.knee_gain)
+    print(f"knee: {knee['concurrency']} concurrent clients, {knee['requests_per_second']:.1f} req/s "
+          f"at p99 {knee['p99_ms']:.1f} ms")
+    for name in args.mix:
+        endpoint = knee["endpoints"][name]
+        if endpoint["requests"]:
+            print(f"  {name:<11} {endpoint['requests_per_second']:8.1f} req/s  p50 {endpoint['p50_ms']:8.1f} ms  "
+                  f"p99 {endpoint['p99_ms']:8.1f} ms  errors {endpoint['error_rate']:.1%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"workers": args.workers, "threads": args.threads, "mix": args.mix,
+                       "knee_concurrency": knee["concurrency"], "steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Measure per-worker memory under gunicorn with and without model sharing.
+
+Starts gunicorn with PRELOAD_MODELS=1 in four configurations:
+
+    per-worker pickled    every worker unpickles the sklearn models
+    per-worker compiled   every worker maps the compiled .npy models
+    preload pickled       the master unpickles once; workers inherit copy-on-write
+    preload compiled      the master maps the compiled models once
+
+For each one it sends a few requests to every endpoint and then reads
+/proc/<pid>/smaps_rollup for the master and every worker.  The most important
+figure is PSS (proportional set size): shared pages are divided among the
+processes that map them, so the total PSS is the memory the server actually
+uses.  USS is the memory private to one process.
+
+    python compile_models.py    # the compiled scenarios need the .compiled/ exports
+    python measure_memory.py [--workers 4] [--json results.json]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = [
+    ("per-worker pickled", {"GUNICORN_PRELOAD": "0", "USE_COMPILED_MODELS": "0"}),
+    ("per-worker compiled", {"GUNICORN_PRELOAD": "0", "USE_COMPILED_MODELS": "1"}),
+    ("preload pickled", {"GUNICORN_PRELOAD": "1", "USE_COMPILED_MODELS": "0"}),
+    ("preload compiled", {"GUNICORN_PRELOAD": "1", "USE_COMPILED_MODELS": "1"}),
+]
+
+CROP_SAMPLE = {"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 20.87,
+               "humidity": 82.00, "ph": 6.5, "rainfall": 202.93}
+FERTILIZER_SAMPLE = {"temperature": 26, "humidity": 52, "moisture": 38, "nitrogen": 37, "potassium": 0,
+                     "phosphorous": 0, "soil_type": "Sandy", "crop_type": "Maize"}
+
+
+def smaps_rollup(pid):
+    # Memory counters of one process in bytes
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+        "shared": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+    }
+
+
+def child_pids(parent):
+    children = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; the ppid follows the closing parenthesis
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            if ppid == parent:
+                children.append(int(entry))
+    return children
+
+
+def post(url, body, content_type):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def multipart(filename, payload):
+    boundary = "measure-memory-boundary"
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n").encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def exercise(base_url, photo, requests_per_endpoint):
+    body, content_type = multipart("photo.jpg", photo)
+    for _ in range(requests_per_endpoint):
+        post(f"{base_url}/crop-recommendation", json.dumps(CROP_SAMPLE).encode(), "application/json")
+        post(f"{base_url}/fertilizer-recommendation", json.dumps(FERTILIZER_SAMPLE).encode(), "application/json")
+        post(f"{base_url}/medicinal-plant-prediction", body, content_type)
+
+
+def wait_until_ready(base_url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"{base_url}/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready in time")
+
+
+def run_scenario(name, overrides, args, photo, plant_model_path):
+    env = dict(os.environ, PRELOAD_MODELS="1", WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS="2",
+               PORT=str(args.port), CACHE_ENABLED="0", PLANT_MODEL_PATH=plant_model_path, **overrides)
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                            cwd=current_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, proc)
+        # Every worker loads its interpreters in post_worker_init; give all of them time to finish
+        time.sleep(args.settle)
+        exercise(base_url, photo, args.requests)
+        time.sleep(1)
+        workers = [smaps_rollup(pid) for pid in child_pids(proc.pid)]
+        master = smaps_rollup(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    count = len(workers)
+    return {
+        "scenario": name,
+        "workers": count,
+        "master": master,
+        "mean_worker": {key: sum(w[key] for w in workers) / count for key in master},
+        "total_pss": master["pss"] + sum(w["pss"] for w in workers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--requests", type=int, default=5, help="requests per endpoint before measuring")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds to wait after startup")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    from bench_preprocess import make_photo
+    photo = make_photo(1024, 768, "JPEG", "RGB")
+
+    plant_model_path = os.environ.get("PLANT_MODEL_PATH",
+                                      os.path.join(current_dir, "medicinal-plant-prediction.tflite"))
+    standin_dir = None
+    if not os.path.exists(plant_model_path):
+        from standin_model import write_standin_model
+        standin_dir = tempfile.TemporaryDirectory()
+        plant_model_path = write_standin_model(os.path.join(standin_dir.name, "standin-plant-model.tflite"))
+        print(f"Plant model not found; using a generated stand-in at {plant_model_path}")
+
+    mib = 2 ** 20
+    rows = []
+    print(f"{'scenario':<22} {'worker RSS':>11} {'worker PSS':>11} {'worker USS':>11} "
+          f"{'master RSS':>11} {'total PSS':>10}  (MiB, {args.workers} workers)")
+    for name, overrides in SCENARIOS:
+        row = run_scenario(name, overrides, args, photo, plant_model_path)
+        rows.append(row)
+        worker = row["mean_worker"]
+        print(f"{name:<22} {worker['rss'] / mib:11.1f} {worker['pss'] / mib:11.1f} {worker['uss'] / mib:11.1f} "
+              f"{row['master']['rss'] / mib:11.1f} {row['total_pss'] / mib:10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
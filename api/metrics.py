@@ -0,0 +1,243 @@
+"""In-process metrics with Prometheus text exposition.
+
+Recording is an in-memory update under a lock.  When METRICS_DIR is set, every
+worker process periodically writes a snapshot of its metrics to that directory,
+and /metrics merges the snapshots of all workers: counters and histograms are
+summed (including workers that have since exited), gauges are reported per live
+worker.  Snapshot files are named by pid and process start time, so a worker
+that reuses an old pid does not overwrite its predecessor's counts.  The
+directory is emptied with clear_snapshots() when the server starts (see
+gunicorn.conf.py).
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, self.labels, time.perf_counter() - self.started)
+        return False
+
+
+def _label_key(labels):
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_snapshots(directory):
+    # Removes the snapshots left by a previous run of the server
+    for path in glob.glob(os.path.join(directory, "metrics-*.json*")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def bucket_quantile(q, buckets, counts):
+    # Linear interpolation inside the bucket holding the q-th observation, like histogram_quantile()
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank, cumulative, lower = q * total, 0, 0.0
+    for upper, count in zip(buckets, counts):
+        if count and cumulative + count >= rank:
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return buckets[-1]  # in the +Inf bucket; report the largest finite bound
+
+
+class Metrics:
+    def __init__(self, namespace="agri", directory=None, flush_interval=1.0, buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._descriptions = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._started = time.time()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._flusher = None
+
+    def describe(self, name, kind, help_text):
+        self._descriptions[name] = (kind, help_text)
+
+    def register_collector(self, collect):
+        # collect() is called before every snapshot, to refresh gauges that are read rather than recorded
+        self._collectors.append(collect)
+
+    def _check_fork(self):
+        # A forked worker starts from empty metrics and runs its own flusher
+        if self._pid != os.getpid():
+            self._reset()
+        if self.directory and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_fork()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, labels, value):
+        with self._lock:
+            self._check_fork()
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, labels, value):
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._check_fork()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def timer(self, name, **labels):
+        return _Timer(self, name, labels)
+
+    def stage_timer(self, name, **labels):
+        # Returns stage(label) -> context manager, for timing the steps of one code path
+        return lambda stage: _Timer(self, name, {**labels, "stage": stage})
+
+    def snapshot(self):
+        for collect in self._collectors:
+            collect(self)
+        with self._lock:
+            return {
+                "pid": self._pid,
+                "started": self._started,
+                "counters": [[n, list(k), v] for (n, k), v in self._counters.items()],
+                "gauges": [[n, list(k), v] for (n, k), v in self._gauges.items()],
+                "histograms": [[n, list(k), list(h)] for (n, k), h in self._histograms.items()],
+            }
+
+    def flush(self):
+        if not self.directory:
+            return
+        with self._lock:
+            self._check_fork()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics-{self._pid}-{int(self._started * 1000)}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error writing metrics snapshot: {e}")
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; the next scrape will pick it up
+        return snapshots
+
+    def collect(self):
+        # Merge every worker's snapshot: sum counters and histograms, keep gauges of live workers
+        counters, gauges, histograms = {}, {}, {}
+        snapshots = self._snapshots()
+        # A pid can appear twice if it was reused; only the latest process holding it can be alive
+        latest = {}
+        for snapshot in snapshots:
+            latest[snapshot["pid"]] = max(latest.get(snapshot["pid"], 0), snapshot.get("started", 0))
+        for snapshot in snapshots:
+            pid = snapshot["pid"]
+            for name, key, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, key)))
+                counters[key] = counters.get(key, 0) + value
+            if snapshot.get("started", 0) == latest[pid] and (pid == os.getpid() or _pid_alive(pid)):
+                for name, key, value in snapshot["gauges"]:
+                    gauges[(name, tuple(map(tuple, key)) + (("worker", str(pid)),))] = value
+            for name, key, values in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, key)))
+                merged = histograms.get(key)
+                histograms[key] = values if merged is None else [a + b for a, b in zip(merged, values)]
+        return counters, gauges, histograms
+
+    def render(self):
+        counters, gauges, histograms = self.collect()
+        families = {}
+        for (name, key), value in counters.items():
+            families.setdefault((name, "counter"), []).append(f"{self.namespace}_{name}{_format_labels(key)} {value}")
+        for (name, key), value in gauges.items():
+            families.setdefault((name, "gauge"), []).append(f"{self.namespace}_{name}{_format_labels(key)} {value}")
+        for (name, key), values in sorted(histograms.items()):
+            counts, total = values[:-1], values[-1]
+            lines = families.setdefault((name, "histogram"), [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.namespace}_{name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.namespace}_{name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.namespace}_{name}_count{_format_labels(key)} {cumulative}")
+            quantiles = families.setdefault((f"{name}_quantile", "gauge"), [])
+            for q in QUANTILES:
+                estimate = bucket_quantile(q, self.buckets, counts)
+                quantiles.append(f"{self.namespace}_{name}_quantile{_format_labels(key, [('quantile', str(q))])} {estimate:.6g}")
+
+        output = []
+        for (name, kind), lines in sorted(families.items()):
+            help_text = self._descriptions.get(name, (kind, name.replace("_", " ")))[1]
+            if name.endswith("_quantile") and name not in self._descriptions:
+                help_text = f"p50/p95/p99 of {self.namespace}_{name[:-len('_quantile')]} estimated from its buckets"
+            output.append(f"# HELP {self.namespace}_{name} {help_text}")
+            output.append(f"# TYPE {self.namespace}_{name} {kind}")
+            output.extend(sorted(lines) if kind != "histogram" else lines)
+        return "\n".join(output) + "\n"
@@ -0,0 +1,153 @@
+"""Lazily loaded models.
+
+Each model is registered with a loader function and is only loaded the first
+time it is requested, or when warmup() is called explicitly.  Load time and the
+change in resident memory are recorded per model.
+
+A model can also be registered with a warmup function that runs synthetic
+inputs through it.  warmup() loads and warms models synchronously at startup;
+ready() reports whether every model has been loaded and warmed up, and
+warmup_in_background() lets a readiness probe start that work without
+blocking.
+
+Models registered with fork_safe=False (anything that owns threads or native
+runtime state, like a TFLite interpreter) are dropped by after_fork(), so a
+forked worker reloads them instead of using the parent's copy.
+"""
+import os
+import resource
+import threading
+import time
+
+
+def initial_stats():
+    return {"loaded": False, "load_seconds": None, "rss_delta_bytes": None, "error": None,
+            "warmed_up": False, "warmup_seconds": None, "warmup_error": None}
+
+
+def current_rss():
+    # Resident set size of this process in bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is a peak rather than a current value, but is the best we have off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelUnavailable(RuntimeError):
+    pass
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._stats = {}
+        self._fork_safe = {}
+        self._warmups = {}
+        self._warmup_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._warmup_thread = None
+
+    def register(self, name, loader, fork_safe=True, warmup=None):
+        # warmup(model) runs synthetic inputs through a freshly loaded model
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+        self._fork_safe[name] = fork_safe
+        self._warmups[name] = warmup
+        self._stats[name] = initial_stats()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+        return model
+
+    def _load(self, name):
+        rss_before = current_rss()
+        started = time.perf_counter()
+        try:
+            model = self._loaders[name]()
+        except Exception as e:
+            # Not cached, so the next request retries the load
+            self._stats[name]["error"] = str(e)
+            print(f"Error loading {name} model: {e}")
+            raise ModelUnavailable(f"The {name} model is not available: {e}") from e
+        elapsed = time.perf_counter() - started
+
+        self._models[name] = model
+        self._stats[name] = {
+            **initial_stats(),
+            "loaded": True,
+            "load_seconds": elapsed,
+            "rss_delta_bytes": current_rss() - rss_before
+        }
+        print(f"Loaded {name} model in {elapsed * 1000:.1f} ms")
+        return model
+
+    def after_fork(self):
+        # Call in a forked child: a lock held by another parent thread would never be released here
+        self._warmup_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._warmup_thread = None
+        for name in self._loaders:
+            self._locks[name] = threading.Lock()
+            if not self._fork_safe[name] and self._models.pop(name, None) is not None:
+                self._stats[name] = initial_stats()
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warmup(self, names=None, fork_safe_only=False):
+        # Load and warm up the given models (all by default) now instead of on first use
+        errors = {}
+        with self._warmup_lock:
+            for name in names or list(self._loaders):
+                if fork_safe_only and not self._fork_safe[name]:
+                    continue
+                try:
+                    self._warm(name, self.get(name))
+                except ModelUnavailable as e:
+                    errors[name] = str(e)
+                except Exception as e:
+                    errors[name] = f"Warmup of the {name} model failed: {e}"
+        return errors
+
+    def _warm(self, name, model):
+        stats = self._stats[name]
+        if stats["warmed_up"]:
+            return
+        warmup = self._warmups[name]
+        started = time.perf_counter()
+        try:
+            if warmup is not None:
+                warmup(model)
+        except Exception as e:
+            stats["warmup_error"] = str(e)
+            print(f"Error warming up {name} model: {e}")
+            raise
+        stats.update(warmed_up=True, warmup_seconds=time.perf_counter() - started, warmup_error=None)
+        print(f"Warmed up {name} model in {stats['warmup_seconds'] * 1000:.1f} ms")
+
+    def warmup_in_background(self):
+        # Starts warmup() on a thread unless one is already running; returns immediately
+        with self._thread_lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return
+            self._warmup_thread = threading.Thread(target=self.warmup, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def ready(self):
+        return all(stats["warmed_up"] for stats in self._stats.values())
+
+    def stats(self):
+        return {
+            "process_rss_bytes": current_rss(),
+            "models": {name: dict(stats) for name, stats in self._stats.items()}
+        }
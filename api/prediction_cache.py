@@ -0,0 +1,169 @@
+"""Bounded LRU/TTL cache for model outputs.
+
+Entries are limited both by count and by their JSON-encoded size.  Concurrent
+misses for the same key are collapsed so the value is computed only once.  An
+optional SQLite file can be used as a second level shared by all worker
+processes on the machine.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class SharedStore:
+    # SQLite-backed store that every gunicorn worker on the host can read and write
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+
+    def _connect(self):
+        # Connections are per thread and per process; never reuse one across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, encoded):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+                     (key, time.time() + self.ttl, encoded))
+        self._writes += 1
+        if self._writes % 256 == 0:
+            # Periodically drop expired rows and trim the table to its size limit
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+            conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                         (self.max_entries,))
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024, ttl=300.0, shared_path=None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl)
+        self.shared = SharedStore(shared_path, self.ttl, self.max_entries * 4) if shared_path else None
+
+        self._entries = OrderedDict()  # key -> (expires, size, value)
+        self._inflight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "shared_hits": 0, "collapsed": 0,
+                          "evictions": 0, "expirations": 0, "errors": 0, "shared_errors": 0}
+
+    def get_or_compute(self, key, compute):
+        # compute() must return a JSON-serializable value
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry[2]
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # Someone is already computing this key; wait for their result
+                self._counters["collapsed"] += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value, encoded = self._compute(key, compute)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._counters["errors"] += 1
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, value, len(key) + len(encoded))
+        future.set_result(value)
+        return value
+
+    def _compute(self, key, compute):
+        if self.shared is not None:
+            try:
+                encoded = self.shared.get(key)
+            except sqlite3.Error as e:
+                # A locked or unreadable file counts as a miss
+                print(f"Error reading from shared prediction cache: {e}")
+                self._count("shared_errors")
+                encoded = None
+            if encoded is not None:
+                self._count("shared_hits")
+                return json.loads(encoded), encoded
+
+        self._count("misses")
+        value = compute()
+        encoded = json.dumps(value, separators=(",", ":"))
+        if self.shared is not None:
+            try:
+                self.shared.put(key, encoded)
+            except sqlite3.Error as e:
+                # The shared level is best effort; the local cache still works without it
+                print(f"Error writing to shared prediction cache: {e}")
+                self._count("shared_errors")
+        return value, encoded
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "shared_path": self.shared.path if self.shared is not None else None,
+                **self._counters
+            }
@@ -0,0 +1,217 @@
+"""Image preprocessing for the plant classifier.
+
+Uploads are decoded at reduced size when the format allows it (JPEG draft
+mode), converted to the model's colour mode once, and normalized straight into
+a reusable per-thread buffer of the interpreter's input dtype.
+
+Only the image header is read before the size check: images whose decoded
+size (after draft scaling) exceeds max_pixels are rejected without decoding,
+and decodes are admitted against a per-process MemoryBudget so concurrent
+large uploads cannot exhaust the worker's memory.
+
+Clients that resize on-device can send the pixels themselves, as a raw buffer
+or a .npy file of exactly the input shape.  These skip decoding entirely; a
+buffer already in the input dtype is used in place without a copy.
+"""
+import io
+import math
+import threading
+from contextlib import ExitStack, contextmanager, nullcontext
+
+import numpy as np
+from PIL import Image
+
+# Modes that are cheaper to resize first and convert afterwards; anything else
+# (alpha, palette, CMYK, ...) is converted at full size, which also avoids the
+# premultiplied-alpha resize path
+RESIZE_FIRST_MODES = {"RGB", "L"}
+
+
+def no_timer(stage):
+    return nullcontext()
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class BudgetTimeout(Exception):
+    pass
+
+
+class TensorFormatError(ValueError):
+    pass
+
+
+def parse_npy_header(data):
+    # Returns (shape, dtype, offset of the array data) of a .npy file held in memory
+    stream = io.BytesIO(data)
+    try:
+        version = np.lib.format.read_magic(stream)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(stream)
+    except ValueError as e:
+        raise TensorFormatError(f"Invalid .npy body: {e}") from e
+    if fortran_order:
+        raise TensorFormatError("Fortran-ordered .npy arrays are not supported")
+    return shape, dtype, stream.tell()
+
+
+def parse_shape(text):
+    try:
+        return tuple(int(part) for part in text.replace("x", ",").split(","))
+    except ValueError:
+        raise TensorFormatError(f"Invalid tensor shape {text!r}; expected e.g. 256,256,3") from None
+
+
+class MemoryBudget:
+    # Byte-counting semaphore: decodes reserve their estimated size and wait while the budget is exhausted
+    def __init__(self, limit_bytes, timeout=10.0):
+        self.limit_bytes = int(limit_bytes)
+        self.timeout = timeout
+        self._used = 0
+        self._peak = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        if nbytes > self.limit_bytes:
+            raise ImageTooLarge(f"Decoding this image needs {nbytes} bytes, more than the "
+                                f"{self.limit_bytes} byte budget")
+        with self._condition:
+            if self._used + nbytes > self.limit_bytes:
+                self._waits += 1
+                if not self._condition.wait_for(lambda: self._used + nbytes <= self.limit_bytes, self.timeout):
+                    self._timeouts += 1
+                    raise BudgetTimeout(f"No decode memory became available within {self.timeout} seconds")
+            self._used += nbytes
+            self._peak = max(self._peak, self._used)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._used -= nbytes
+                self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "limit_bytes": self.limit_bytes,
+                "used_bytes": self._used,
+                "peak_bytes": self._peak,
+                "waits": self._waits,
+                "timeouts": self._timeouts
+            }
+
+
+class ImagePreprocessor:
+    def __init__(self, height, width, channels=3, dtype=np.float32, max_pixels=None, budget=None):
+        if channels not in (1, 3):
+            raise ValueError(f"Unsupported number of input channels: {channels}")
+        self.height = int(height)
+        self.width = int(width)
+        self.channels = int(channels)
+        self.dtype = np.dtype(dtype)
+        self.mode = "RGB" if self.channels == 3 else "L"
+        # Float models take pixels scaled to [0, 1]; integer models take raw pixel values
+        self.normalize = np.issubdtype(self.dtype, np.floating)
+        self.max_pixels = max_pixels
+        self.budget = budget
+        self._local = threading.local()
+
+    @classmethod
+    def from_input_details(cls, details, **kwargs):
+        _, height, width, channels = details['shape']
+        return cls(height, width, channels, details['dtype'], **kwargs)
+
+    @property
+    def shape(self):
+        return (self.height, self.width, self.channels)
+
+    def buffer(self):
+        # One input-sized buffer per thread, reused across requests on that thread
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            buf = self._local.buffer = np.empty(self.shape, dtype=self.dtype)
+        return buf
+
+    def tensor(self, data, shape=None, dtype=np.uint8, offset=0):
+        # A client-preprocessed image of exactly the input shape. uint8 pixels are normalized
+        # into the thread's buffer; data already in the input dtype is wrapped without a copy.
+        shape = self.shape if shape is None else tuple(shape)
+        if len(shape) == len(self.shape) + 1 and shape[0] == 1:
+            shape = shape[1:]
+        if shape != self.shape:
+            raise TensorFormatError(f"Tensor shape {shape} does not match the model input shape {self.shape}")
+        try:
+            dtype = np.dtype(dtype)
+        except TypeError:
+            raise TensorFormatError(f"Unknown tensor dtype {dtype!r}") from None
+        if dtype != np.uint8 and dtype != self.dtype:
+            raise TensorFormatError(f"Tensor dtype must be uint8 or {self.dtype}, not {dtype}")
+        expected = math.prod(shape) * dtype.itemsize
+        if len(data) - offset != expected:
+            raise TensorFormatError(f"Tensor of shape {shape} and dtype {dtype} needs {expected} bytes, "
+                                    f"got {len(data) - offset}")
+
+        array = np.frombuffer(data, dtype=dtype, offset=offset).reshape(self.shape)
+        if dtype == self.dtype:
+            if self.normalize and not np.isfinite(array).all():
+                raise TensorFormatError("Tensor contains NaN or infinite values")
+            return array
+        return self.fill(array, self.buffer())
+
+    def reserve(self, img):
+        # Checks the decoded size from the header alone, then holds budget for the decode
+        width, height = img.size
+        if self.max_pixels and width * height > self.max_pixels:
+            raise ImageTooLarge(f"Image is {width}x{height} pixels; at most {self.max_pixels} pixels "
+                                f"can be decoded")
+        if self.budget is None:
+            return nullcontext()
+        # The decoded image plus one full-size conversion
+        return self.budget.reserve(width * height * (len(img.getbands()) + self.channels))
+
+    def load(self, fp, timer=no_timer):
+        # Decode and resize to the model's input size and colour mode.
+        # timer(stage) returns a context manager wrapped around each step.
+        with ExitStack() as stack:
+            with timer("decode"):
+                try:
+                    img = Image.open(fp)  # reads only the header
+                except Image.DecompressionBombError as e:
+                    raise ImageTooLarge(str(e)) from e
+                # For JPEGs, let the decoder scale down by up to 8x while staying >= the target size
+                img.draft(self.mode, (self.width, self.height))
+                stack.enter_context(self.reserve(img))
+                img.load()
+
+            with timer("resize"):
+                if img.mode not in RESIZE_FIRST_MODES:
+                    img = img.convert(self.mode)
+                if img.size != (self.width, self.height):
+                    img = img.resize((self.width, self.height), reducing_gap=3.0)
+                if img.mode != self.mode:
+                    img = img.convert(self.mode)
+        return img
+
+    def __call__(self, fp, out=None, timer=no_timer):
+        # Write the normalized image into out (the thread's buffer by default) and return it
+        if out is None:
+            out = self.buffer()
+        img = self.load(fp, timer)
+        with timer("normalize"):
+            return self.fill(img, out)
+
+    def fill(self, img, out):
+        # Normalize a loaded image, or its pixel array, into out
+        pixels = np.asarray(img)
+        if pixels.ndim == 2:
+            pixels = pixels[..., np.newaxis]
+        if self.normalize:
+            np.divide(pixels, 255.0, out=out, dtype=self.dtype, casting="unsafe")
+        else:
+            np.copyto(out, pixels, casting="unsafe")
+        return out
@@ -0,0 +1,175 @@
+"""Image preprocessing in worker processes, handing tensors over in shared memory.
+
+Decoding and resizing hold the GIL in parts, so in a threaded worker one
+large upload slows every other request.  DecodePool moves decode, resize and
+normalization into a pool of processes.  The results are not sent back: a
+block of shared memory holds a fixed number of input-sized slots, each process
+writes its image straight into the slot it was given, and the caller reads the
+slot in place as a NumPy view.  Only the encoded upload and the stage timings
+cross the process boundary.
+
+A slot stays reserved until its reader is done with it, so the slot count
+bounds how many images can be in flight at once; callers wait for a free slot
+up to the pool's timeout.
+"""
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from preprocess import ImagePreprocessor
+
+# Set in each decoding process by init_worker
+_preprocessor = None
+_slots = None
+_shm = None
+
+
+class SlotTimeout(TimeoutError):
+    pass
+
+
+def init_worker(shm_name, slots, height, width, channels, dtype, max_pixels):
+    global _preprocessor, _slots, _shm
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _preprocessor = ImagePreprocessor(height, width, channels, dtype, max_pixels=max_pixels)
+    _slots = np.ndarray((slots,) + _preprocessor.shape, dtype=_preprocessor.dtype, buffer=_shm.buf)
+
+
+def decode_into(slot, data):
+    # Runs in a worker process; returns seconds per stage
+    timings = {}
+
+    @contextmanager
+    def timer(stage):
+        started = time.perf_counter()
+        yield
+        timings[stage] = time.perf_counter() - started
+
+    _preprocessor(io.BytesIO(data), out=_slots[slot], timer=timer)
+    return timings
+
+
+class DecodePool:
+    def __init__(self, height, width, channels=3, dtype=np.float32, processes=2, slots=None, max_pixels=None,
+                 timeout=10.0):
+        self.shape = (int(height), int(width), int(channels))
+        self.dtype = np.dtype(dtype)
+        self.processes = max(1, int(processes))
+        self.slots = max(1, int(slots or 2 * self.processes))
+        self.max_pixels = max_pixels
+        self.timeout = timeout
+
+        size = self.slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._tensors = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        self._free = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+
+        self._lock = threading.Lock()
+        self._decodes = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._restarts = 0
+        self._executor = self._start()
+
+    @classmethod
+    def from_input_details(cls, details, **kwargs):
+        _, height, width, channels = details['shape']
+        return cls(height, width, channels, details['dtype'], **kwargs)
+
+    def _start(self):
+        # The parent holds TFLite interpreter threads, so the processes are spawned rather than forked
+        return ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=init_worker,
+                                   initargs=(self._shm.name, self.slots, *self.shape, self.dtype.str,
+                                             self.max_pixels))
+
+    def _restart(self, broken):
+        # A worker died (killed for memory, for instance); replace the pool once for all its callers
+        with self._lock:
+            if self._executor is broken:
+                self._restarts += 1
+                self._executor = self._start()
+        broken.shutdown(wait=False)
+
+    def _acquire(self, timeout):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            self._waits += 1
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise SlotTimeout(f"No preprocessing slot became available within {timeout} seconds") from None
+
+    @contextmanager
+    def decode(self, data, timeout=None):
+        # Yields (view of the slot holding the normalized image, seconds per stage).
+        # The view is only valid inside the with block.
+        timeout = self.timeout if timeout is None else timeout
+        slot = self._acquire(timeout)
+        future = None
+        try:
+            executor = self._executor
+            try:
+                future = executor.submit(decode_into, slot, data)
+                timings = future.result(timeout)
+            except BrokenProcessPool:
+                self._restart(executor)
+                raise
+            with self._lock:
+                self._decodes += 1
+            yield self._tensors[slot], timings
+        finally:
+            if future is None or future.done():
+                self._free.put(slot)
+            else:
+                # Timed out while a worker is still writing into the slot; free it once the worker is done
+                future.add_done_callback(lambda _: self._free.put(slot))
+
+    def warmup(self, data):
+        # Start every process and run one decode in each, so the spawn and imports
+        # happen now rather than in the first requests
+        with self._lock:
+            executor = self._executor
+        slots = [self._acquire(self.timeout) for _ in range(min(self.processes, self.slots))]
+        try:
+            for future in [executor.submit(decode_into, slot, data) for slot in slots]:
+                future.result()
+        finally:
+            for slot in slots:
+                self._free.put(slot)
+
+    def close(self):
+        if self._tensors is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._tensors = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self):
+        with self._lock:
+            free = self._free.qsize()
+            return {
+                "processes": self.processes,
+                "slots": self.slots,
+                "slots_in_use": self.slots - free,
+                "decodes": self._decodes,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "restarts": self._restarts
+            }
@@ -0,0 +1,214 @@
+"""Opt-in profiling of single requests or a time window inside a running worker.
+
+Nothing is installed unless a profile directory is configured, so there is no
+overhead when profiling is off.  Once installed:
+
+- A request is profiled when it carries the X-Profile-Token header with the
+  configured token, or at random with the configured sample rate.  Its thread
+  runs under cProfile and the stats are written as <id>.prof (open them with
+  `python -m pstats` or snakeviz).  The id is returned in the X-Profile-Id
+  header.
+- GET /debug/profile?seconds=10 (token required) samples the stacks of every
+  thread in the worker, including the batching threads that run inference,
+  and writes them as <id>.collapsed, the folded format read by flamegraph.pl
+  and speedscope.
+
+With memory profiling on, tracemalloc also runs while profiling, and
+<id>.alloc.txt lists the allocation sites by size: those still holding memory
+at the end of a request, or the growth over a window.  Only one profile runs
+at a time in a worker; requests sampled while another is running are skipped.
+"""
+import collections
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+from flask import g, jsonify, request
+
+TOKEN_HEADER = "X-Profile-Token"
+ALLOCATION_FRAMES = 25
+ALLOCATION_SITES = 25
+
+
+def take_snapshot():
+    # Without the profiler's own bookkeeping
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+def format_allocations(statistics, title, traced=None):
+    lines = [title]
+    if traced is not None:
+        current, peak = traced
+        lines.append(f"traced memory: {current / 2 ** 20:.2f} MiB at the end, {peak / 2 ** 20:.2f} MiB peak")
+    lines.append("")
+    for stat in statistics[:ALLOCATION_SITES]:
+        size = getattr(stat, "size_diff", stat.size)
+        count = getattr(stat, "count_diff", stat.count)
+        lines.append(f"{size / 1024:12.1f} KiB {count:8d} blocks  {stat.traceback[0]}")
+    # Where the largest sites were reached from
+    for stat in statistics[:3]:
+        lines.append("")
+        lines.append(f"{stat.traceback[0]}:")
+        lines.extend(f"    {line}" for line in stat.traceback.format(most_recent_first=True)[:2 * ALLOCATION_FRAMES])
+    return "\n".join(lines) + "\n"
+
+
+def sample_stacks(seconds, interval):
+    # Folded stacks of every other thread, "thread;outer;...;inner" -> number of samples
+    counts = collections.Counter()
+    me = threading.get_ident()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+class Profiler:
+    def __init__(self, directory, token=None, sample_rate=0.0, memory=False, max_seconds=60.0):
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self.max_seconds = max_seconds
+        self._busy = threading.Lock()
+
+    def install(self, app):
+        if not self.directory:
+            return
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.teardown_request(self.abandon_request)
+        app.add_url_rule("/debug/profile", "debug_profile", self.profile_window)
+
+    def authorized(self):
+        supplied = request.headers.get(TOKEN_HEADER)
+        return bool(self.token and supplied and hmac.compare_digest(supplied, self.token))
+
+    def new_id(self, label):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "root"
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{slug}-{random.randrange(16 ** 4):04x}"
+
+    def path(self, profile_id, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def start_tracing(self):
+        # Returns whether this call started tracemalloc, so only that caller stops it
+        if not self.memory or tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(ALLOCATION_FRAMES)
+        return True
+
+    def start_request(self):
+        if request.endpoint == "debug_profile":
+            return
+        if not (self.authorized() or (self.sample_rate and random.random() < self.sample_rate)):
+            return
+        if not self._busy.acquire(blocking=False):
+            return
+        g.profile = {"id": self.new_id(request.path), "tracing": self.start_tracing(), "profile": cProfile.Profile()}
+        g.profile["profile"].enable()
+
+    def finish_request(self, response):
+        state = g.pop("profile", None)
+        if state is None:
+            return response
+        try:
+            state["profile"].disable()
+            if state["tracing"]:
+                report = format_allocations(take_snapshot().statistics("lineno"),
+                                            f"{request.method} {request.path} -> {response.status_code}",
+                                            tracemalloc.get_traced_memory())
+                with open(self.path(state["id"], ".alloc.txt"), "w") as f:
+                    f.write(report)
+            state["profile"].dump_stats(self.path(state["id"], ".prof"))
+            response.headers["X-Profile-Id"] = state["id"]
+        finally:
+            self.release(state)
+        return response
+
+    def abandon_request(self, exc):
+        # The request failed before after_request ran
+        state = g.pop("profile", None)
+        if state is not None:
+            state["profile"].disable()
+            self.release(state)
+
+    def release(self, state):
+        if state["tracing"]:
+            tracemalloc.stop()
+        self._busy.release()
+
+    def profile_window(self):
+        if not self.authorized():
+            return jsonify({
+                "status": "error",
+                "message": f"Profiling requires the {TOKEN_HEADER} header"
+            }), 403
+        try:
+            seconds = float(request.args.get("seconds", 10))
+            interval = float(request.args.get("interval_ms", 5)) / 1000
+            if not 0 < seconds <= self.max_seconds or interval <= 0:
+                raise ValueError()
+        except ValueError:
+            return jsonify({
+                "status": "error",
+                "message": f"seconds must be between 0 and {self.max_seconds}, and interval_ms positive"
+            }), 400
+        if not self._busy.acquire(blocking=False):
+            return jsonify({
+                "status": "error",
+                "message": "Another profile is running in this worker"
+            }), 409
+
+        state = {"id": self.new_id("window"), "tracing": self.start_tracing()}
+        try:
+            before = take_snapshot() if state["tracing"] else None
+            counts = sample_stacks(seconds, interval)
+            with open(self.path(state["id"], ".collapsed"), "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+            files = [state["id"] + ".collapsed"]
+            if before is not None:
+                growth = take_snapshot().compare_to(before, "lineno")
+                report = format_allocations([stat for stat in growth if stat.size_diff > 0],
+                                            f"Allocation growth over {seconds:g} s", tracemalloc.get_traced_memory())
+                with open(self.path(state["id"], ".alloc.txt"), "w") as f:
+                    f.write(report)
+                files.append(state["id"] + ".alloc.txt")
+        finally:
+            self.release(state)
+
+        # The functions most often on top of a stack, as a first hint before opening the flamegraph
+        leaves = collections.Counter()
+        for stack, count in counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return jsonify({
+            "status": "success",
+            "id": state["id"],
+            "pid": os.getpid(),
+            "directory": self.directory,
+            "files": files,
+            "samples": sum(counts.values()),
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in leaves.most_common(10)]
+        })
@@ -0,0 +1,260 @@
+"""Offline batch scoring of leaf photo directories and soil sample files.
+
+Uses the same models, preprocessing and result format as the API, without
+going through HTTP:
+
+    python score.py images photos/ --output plants.jsonl [--workers 8] [--batch-size 32]
+    python score.py crop soil.csv --output crops.jsonl [--chunk-size 10000]
+    python score.py fertilizer soil.parquet --output fertilizers.jsonl
+
+Images are decoded and resized in a pool of worker processes while the main
+process feeds fixed-size batches to the TFLite interpreter.  Tabular files
+(CSV, or Parquet when pyarrow is installed) are scored a chunk at a time with
+one predict call per chunk.  Results are appended to the output as JSON lines
+as soon as each batch or chunk is scored, so an interrupted run can be
+continued with --resume: images already in the output are skipped, and table
+rows continue after the last one written.  Progress and throughput are
+reported on stderr.
+"""
+import argparse
+import collections
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import UnidentifiedImageError
+
+from preprocess import ImagePreprocessor, ImageTooLarge
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
+
+# Set in each decoding process by init_decoder
+_decoder = None
+
+
+class Progress:
+    # Periodic throughput lines on stderr
+    def __init__(self, unit, total=None, interval=5.0):
+        self.unit = unit
+        self.total = total
+        self.interval = interval
+        self.done = self.errors = 0
+        self.started = self.last_report = time.perf_counter()
+
+    def update(self, count, errors=0):
+        self.done += count
+        self.errors += errors
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def rate(self):
+        return self.done / max(time.perf_counter() - self.started, 1e-9)
+
+    def report(self, prefix="scored"):
+        total = f"/{self.total}" if self.total is not None else ""
+        print(f"{prefix} {self.done}{total} {self.unit} ({self.errors} errors), {self.rate():.1f} {self.unit}/s",
+              file=sys.stderr, flush=True)
+
+
+def open_output(path, resume):
+    # Returns the complete lines already written, after dropping a line cut off by an interruption
+    if not os.path.exists(path):
+        return []
+    if not resume:
+        raise SystemExit(f"{path} already exists; pass --resume to continue it, or remove it")
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+    return data[:end].decode().splitlines()
+
+
+def find_images(directory):
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+    return paths
+
+
+def init_decoder(height, width, channels, dtype, max_pixels):
+    global _decoder
+    _decoder = ImagePreprocessor(height, width, channels, dtype, max_pixels=max_pixels)
+
+
+def decode_image(path):
+    # Runs in a worker process. Only the resized 8-bit pixels are sent back, which
+    # is a quarter of the float32 input; the parent normalizes them into the batch.
+    try:
+        with open(path, "rb") as f:
+            return np.asarray(_decoder.load(f)), None
+    except UnidentifiedImageError:
+        return None, "Could not read image: not a supported image file"
+    except ImageTooLarge as e:
+        return None, f"Image too large: {e}"
+    except Exception as e:
+        return None, f"Could not read image: {e}"
+
+
+def score_images(args):
+    import app
+
+    done = {json.loads(line)["path"] for line in open_output(args.output, args.resume)}
+    paths = [path for path in find_images(args.directory) if os.path.relpath(path, args.directory) not in done]
+    if done:
+        print(f"Resuming: {len(done)} images already scored", file=sys.stderr)
+
+    details = app.models.get("plant").input_details[0]
+    preprocessor = ImagePreprocessor.from_input_details(details)
+    # Every batch has the same shape, so the interpreter is resized once; the last one is padded
+    batch = np.zeros((args.batch_size,) + preprocessor.shape, dtype=preprocessor.dtype)
+    progress = Progress("images", total=len(paths))
+    decode_wait = inference = 0.0
+
+    # The parent holds TFLite interpreter threads, so the decoders are spawned rather than forked
+    context = multiprocessing.get_context("spawn")
+    init_args = (preprocessor.height, preprocessor.width, preprocessor.channels, preprocessor.dtype.str,
+                 app.PLANT_MAX_IMAGE_PIXELS)
+    with context.Pool(args.workers, initializer=init_decoder, initargs=init_args) as pool, \
+            open(args.output, "a") as out:
+        # At most two batches of decodes are in flight, so decoded pixels do not pile up in
+        # memory when the interpreter is slower than the decoders
+        queued, pending = iter(paths), collections.deque()
+
+        def submit(count):
+            pending.extend(pool.apply_async(decode_image, (path,)) for path in itertools.islice(queued, count))
+
+        submit(2 * args.batch_size)
+        for start in range(0, len(paths), args.batch_size):
+            names = [os.path.relpath(path, args.directory) for path in paths[start:start + args.batch_size]]
+            errors, filled = {}, []
+            waited = time.perf_counter()
+            for name in names:
+                pixels, error = pending.popleft().get()
+                if error is None:
+                    preprocessor.fill(pixels, batch[len(filled)])
+                    filled.append(name)
+                else:
+                    errors[name] = error
+            decode_wait += time.perf_counter() - waited
+            # The next batch is already decoding; queue the one after it during inference
+            submit(len(names))
+
+            started = time.perf_counter()
+            outputs = app.run_plant_batch(batch) if filled else []
+            inference += time.perf_counter() - started
+
+            predictions = dict(zip(filled, outputs))
+            lines = []
+            for name in names:
+                head = '"path":%s' % json.dumps(name)
+                if name in predictions:
+                    fragment = app.encode_plant_prediction(predictions[name], args.top_k, args.compact)
+                    lines.append('{%s,"status":"success",%s}\n' % (head, fragment))
+                else:
+                    lines.append('{%s,"status":"error","message":%s}\n' % (head, json.dumps(errors[name])))
+            out.write("".join(lines))
+            out.flush()
+            progress.update(len(names), len(errors))
+
+    progress.report("finished:")
+    print(f"waited {decode_wait:.1f} s for decoding, spent {inference:.1f} s in inference", file=sys.stderr)
+
+
+def read_rows(path, aliases):
+    # Row dicts with the same header normalization as the bulk CSV endpoints
+    import app
+
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet files requires pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        fields = [app.normalize_csv_header(name, aliases) for name in parquet.schema_arrow.names]
+        for record_batch in parquet.iter_batches(batch_size=10000):
+            for values in zip(*(column.to_pylist() for column in record_batch.columns)):
+                yield dict(zip(fields, values))
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        fields = [app.normalize_csv_header(name, aliases) for name in next(reader, [])]
+        for row in reader:
+            yield dict(zip(fields, row))
+
+
+def score_table(args):
+    import app
+
+    recommend, aliases = {
+        "crop": (app.recommend_crops, app.CROP_CSV_ALIASES),
+        "fertilizer": (app.recommend_fertilizers, app.FERTILIZER_CSV_ALIASES),
+    }[args.command]
+
+    # One output line per input row, so the line count is where to continue
+    skip = len(open_output(args.output, args.resume))
+    if skip:
+        print(f"Resuming after {skip} rows", file=sys.stderr)
+    rows = itertools.islice(read_rows(args.input, aliases), skip, None)
+    progress = Progress("rows")
+
+    with open(args.output, "a") as out:
+        while True:
+            chunk = list(itertools.islice(rows, args.chunk_size))
+            if not chunk:
+                break
+            results = recommend(chunk)
+            errors = 0
+            for result in results:
+                result["index"] += skip + progress.done
+                errors += result["status"] == "error"
+            out.write("".join(json.dumps(result) + "\n" for result in results))
+            out.flush()
+            progress.update(len(chunk), errors)
+
+    progress.report("finished:")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    images = commands.add_parser("images", help="classify every image under a directory")
+    images.add_argument("directory")
+    images.add_argument("--workers", type=int, default=os.cpu_count(), help="decoding processes")
+    images.add_argument("--batch-size", type=int, default=32, help="images per interpreter call")
+    images.add_argument("--top-k", type=int, default=3)
+    images.add_argument("--compact", action="store_true", help="class indexes only, as with format=compact")
+    images.set_defaults(run=score_images)
+
+    for name in ("crop", "fertilizer"):
+        table = commands.add_parser(name, help=f"{name} recommendations for every row of a CSV or Parquet file")
+        table.add_argument("input")
+        table.add_argument("--chunk-size", type=int, default=10000, help="rows per predict call")
+        table.set_defaults(run=score_table)
+
+    for command in commands.choices.values():
+        command.add_argument("--output", required=True, help="JSON lines file the results are appended to")
+        command.add_argument("--resume", action="store_true", help="continue an interrupted run")
+
+    args = parser.parse_args()
+    if args.command == "images":
+        import app
+
+        if not 1 <= args.top_k <= len(app.PLANT_NAMES):
+            parser.error(f"--top-k must be between 1 and {len(app.PLANT_NAMES)}")
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
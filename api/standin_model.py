@@ -0,0 +1,134 @@
+"""Generate a small TFLite classifier with the plant model's input and output shape.
+
+The trained medicinal-plant model is not in the repository.  This writes a
+stand-in with the same interface (float32 [batch, 256, 256, 3] in, softmax over
+the 30 plant classes out) so the API and the benchmarks can run without it:
+
+    CONV_2D (3x3, stride 2, 16 filters, ReLU) -> MEAN over H, W -> FULLY_CONNECTED -> SOFTMAX
+
+The weights are random, so the predictions are meaningless.  The model is built
+directly from the TFLite flatbuffer schema, so TensorFlow is not required.
+
+    python standin_model.py [output.tflite]
+"""
+import argparse
+import os
+
+import flatbuffers
+import numpy as np
+from ai_edge_litert import schema_py_generated as schema
+
+INPUT_SHAPE = (1, 256, 256, 3)
+NUM_CLASSES = 30
+CONV_FILTERS = 16
+
+
+def build_standin_model(input_shape=INPUT_SHAPE, num_classes=NUM_CLASSES, seed=0):
+    _, height, width, channels = input_shape
+    rng = np.random.default_rng(seed)
+    buffers = [schema.BufferT()]  # buffer 0 is the conventional empty buffer
+    tensors = []
+
+    def add_tensor(name, shape, data=None, dtype=np.float32):
+        buffer = schema.BufferT()
+        if data is not None:
+            buffer.data = np.ascontiguousarray(data, dtype=dtype).view(np.uint8).ravel()
+        buffers.append(buffer)
+        tensor = schema.TensorT()
+        tensor.name = name
+        tensor.shape = np.array(shape, dtype=np.int32)
+        # The batch dimension is dynamic so the interpreter can be resized for batches
+        tensor.shapeSignature = np.array([-1] + list(shape[1:]), dtype=np.int32) if data is None else None
+        tensor.type = schema.TensorType.INT32 if dtype == np.int32 else schema.TensorType.FLOAT32
+        tensor.buffer = len(buffers) - 1
+        tensors.append(tensor)
+        return len(tensors) - 1
+
+    conv_height, conv_width = (height + 1) // 2, (width + 1) // 2
+    image = add_tensor("image", input_shape)
+    conv_weights = add_tensor("conv/weights", (CONV_FILTERS, 3, 3, channels),
+                              rng.normal(0, 0.5, (CONV_FILTERS, 3, 3, channels)))
+    conv_bias = add_tensor("conv/bias", (CONV_FILTERS,), np.zeros(CONV_FILTERS))
+    conv = add_tensor("conv", (1, conv_height, conv_width, CONV_FILTERS))
+    axes = add_tensor("mean/axes", (2,), np.array([1, 2]), dtype=np.int32)
+    pooled = add_tensor("pooled", (1, CONV_FILTERS))
+    dense_weights = add_tensor("dense/weights", (num_classes, CONV_FILTERS),
+                               rng.normal(0, 1.0, (num_classes, CONV_FILTERS)))
+    dense_bias = add_tensor("dense/bias", (num_classes,), rng.normal(0, 0.1, num_classes))
+    logits = add_tensor("logits", (1, num_classes))
+    probabilities = add_tensor("probabilities", (1, num_classes))
+
+    opcodes = []
+
+    def add_operator(opcode, inputs, outputs, options_type, options):
+        code = schema.OperatorCodeT()
+        code.builtinCode = opcode
+        code.deprecatedBuiltinCode = min(opcode, 127)
+        code.version = 1
+        opcodes.append(code)
+        operator = schema.OperatorT()
+        operator.opcodeIndex = len(opcodes) - 1
+        operator.inputs = np.array(inputs, dtype=np.int32)
+        operator.outputs = np.array(outputs, dtype=np.int32)
+        operator.builtinOptionsType = options_type
+        operator.builtinOptions = options
+        return operator
+
+    conv_options = schema.Conv2DOptionsT()
+    conv_options.padding = schema.Padding.SAME
+    conv_options.strideH = conv_options.strideW = 2
+    conv_options.dilationHFactor = conv_options.dilationWFactor = 1
+    conv_options.fusedActivationFunction = schema.ActivationFunctionType.RELU
+    mean_options = schema.ReducerOptionsT()
+    mean_options.keepDims = False
+    dense_options = schema.FullyConnectedOptionsT()
+    softmax_options = schema.SoftmaxOptionsT()
+    softmax_options.beta = 1.0
+
+    subgraph = schema.SubGraphT()
+    subgraph.name = "main"
+    subgraph.tensors = tensors
+    subgraph.inputs = np.array([image], dtype=np.int32)
+    subgraph.outputs = np.array([probabilities], dtype=np.int32)
+    subgraph.operators = [
+        add_operator(schema.BuiltinOperator.CONV_2D, [image, conv_weights, conv_bias], [conv],
+                     schema.BuiltinOptions.Conv2DOptions, conv_options),
+        add_operator(schema.BuiltinOperator.MEAN, [conv, axes], [pooled],
+                     schema.BuiltinOptions.ReducerOptions, mean_options),
+        add_operator(schema.BuiltinOperator.FULLY_CONNECTED, [pooled, dense_weights, dense_bias], [logits],
+                     schema.BuiltinOptions.FullyConnectedOptions, dense_options),
+        add_operator(schema.BuiltinOperator.SOFTMAX, [logits], [probabilities],
+                     schema.BuiltinOptions.SoftmaxOptions, softmax_options),
+    ]
+
+    model = schema.ModelT()
+    model.version = 3
+    model.description = "Stand-in medicinal plant classifier (random weights)"
+    model.operatorCodes = opcodes
+    model.subgraphs = [subgraph]
+    model.buffers = buffers
+
+    builder = flatbuffers.Builder(1024)
+    builder.Finish(model.Pack(builder), file_identifier=b"TFL3")
+    return bytes(builder.Output())
+
+
+def write_standin_model(path, **kwargs):
+    with open(path, "wb") as f:
+        f.write(build_standin_model(**kwargs))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "medicinal-plant-prediction.tflite"))
+    args = parser.parse_args()
+    if os.path.exists(args.output):
+        parser.error(f"{args.output} already exists; refusing to overwrite it")
+    write_standin_model(args.output)
+    print(f"Wrote stand-in model to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Shared setup for the API tests.
+
+The app is configured through environment variables read at import time, so
+they are set here, before any test module imports it.  The prediction cache is
+disabled so every request reaches the models, and the generated stand-in plant
+model is used when the trained one is missing (see standin_model.py).
+"""
+import os
+import sys
+import tempfile
+import warnings
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+os.environ["CACHE_ENABLED"] = "0"
+_standin_dir = tempfile.TemporaryDirectory()
+if not os.path.exists(os.environ.get("PLANT_MODEL_PATH", os.path.join(API_DIR, "medicinal-plant-prediction.tflite"))):
+    from standin_model import write_standin_model
+    os.environ["PLANT_MODEL_PATH"] = write_standin_model(os.path.join(_standin_dir.name, "standin-plant-model.tflite"))
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+CROP_SAMPLE = {"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 20.87,
+               "humidity": 82.00, "ph": 6.5, "rainfall": 202.93}
+
+
+@pytest.fixture(scope="session")
+def api():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
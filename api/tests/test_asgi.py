@@ -0,0 +1,151 @@
+import asyncio
+import io
+import json
+
+import pytest
+from PIL import Image
+from werkzeug.test import EnvironBuilder
+
+from conftest import CROP_SAMPLE
+
+
+@pytest.fixture(scope="module")
+def asgi(api):
+    import asgi
+    return asgi
+
+
+def http_scope(method, path, headers=(), query_string=b""):
+    return {"type": "http", "http_version": "1.1", "method": method, "path": path, "root_path": "",
+            "query_string": query_string, "headers": [(k.lower().encode(), v.encode()) for k, v in headers]}
+
+
+async def drive(adapter, scope, chunks=(b"",), before=None):
+    # Runs one request through the adapter; returns the messages it sent and how many it received
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent, received = [], []
+
+    async def receive():
+        received.append(1)
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    if before is not None:
+        await before()
+    await adapter(scope, receive, send)
+    return sent, len(received)
+
+
+def request(adapter, method, path, body=b"", headers=(), query_string=b"", chunks=None):
+    if chunks is None:
+        chunks = [body]
+        headers = list(headers) + [("Content-Length", str(len(body)))]
+    sent, _ = asyncio.run(drive(adapter, http_scope(method, path, headers, query_string), chunks))
+    return parse(sent)
+
+
+def parse(sent):
+    start, bodies = sent[0], [message["body"] for message in sent[1:]]
+    assert start["type"] == "http.response.start"
+    assert all(message["more_body"] for message in sent[1:-1]) and not sent[-1].get("more_body")
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, bodies
+
+
+def assert_same_as_wsgi(client, status, headers, bodies, wsgi_response):
+    assert status == wsgi_response.status_code
+    assert headers == {name.lower(): value for name, value in wsgi_response.headers.items()}
+    assert b"".join(bodies) == wsgi_response.get_data()
+
+
+def test_crop_response_matches_wsgi(asgi, client):
+    body = json.dumps(CROP_SAMPLE).encode()
+    status, headers, bodies = request(asgi.AsgiAdapter(asgi.wsgi_app), "POST", "/crop-recommendation", body,
+                                      [("Content-Type", "application/json")])
+    assert_same_as_wsgi(client, status, headers, bodies, client.post("/crop-recommendation", json=CROP_SAMPLE))
+
+
+def test_compact_plant_response_matches_wsgi(asgi, client):
+    photo = io.BytesIO()
+    Image.new("RGB", (320, 240), (40, 120, 30)).save(photo, "PNG")
+    upload = EnvironBuilder(method="POST", data={"file": (io.BytesIO(photo.getvalue()), "leaf.png")}).get_environ()
+    status, headers, bodies = request(asgi.AsgiAdapter(asgi.wsgi_app), "POST", "/medicinal-plant-prediction",
+                                      upload["wsgi.input"].read(), [("Content-Type", upload["CONTENT_TYPE"])],
+                                      query_string=b"format=compact&top_k=2")
+    expected = client.post("/medicinal-plant-prediction?format=compact&top_k=2",
+                           data={"file": (io.BytesIO(photo.getvalue()), "leaf.png")})
+    assert expected.status_code == 200
+    assert_same_as_wsgi(client, status, headers, bodies, expected)
+
+
+def test_bulk_csv_streams_one_chunk_at_a_time(api, asgi, client, monkeypatch):
+    monkeypatch.setattr(api, "BULK_CHUNK_SIZE", 2)
+    csv = ("N,P,K,temperature,humidity,ph,rainfall\n" + "90,42,43,20.87,82.0,6.5,202.93\n" * 5).encode()
+    # A chunked upload without Content-Length
+    status, headers, bodies = request(asgi.AsgiAdapter(asgi.wsgi_app), "POST", "/crop-recommendation/bulk",
+                                      headers=[("Content-Type", "text/csv")], chunks=[csv[:50], csv[50:]])
+    assert status == 200 and headers["content-type"].startswith("application/x-ndjson")
+    # Three chunks of rows and the completion line, each sent as it is produced
+    assert [len(body.splitlines()) for body in bodies[:-1]] == [2, 2, 1, 1]
+    assert b"".join(bodies) == client.post("/crop-recommendation/bulk", data=csv, content_type="text/csv").get_data()
+
+
+def test_declared_length_over_the_limit_is_413_before_reading(asgi):
+    adapter = asgi.AsgiAdapter(asgi.wsgi_app, body_limit=10)
+    sent, received = asyncio.run(drive(adapter, http_scope("POST", "/crop-recommendation",
+                                                           [("Content-Length", "11")])))
+    status, headers, bodies = parse(sent)
+    assert status == 413 and received == 0
+    assert json.loads(b"".join(bodies)) == {"status": "error", "message": "Request body exceeds the limit of 10 bytes"}
+
+
+def test_chunked_body_over_the_limit_is_413(asgi):
+    adapter = asgi.AsgiAdapter(asgi.wsgi_app, body_limit=10)
+    status, _, _ = request(adapter, "POST", "/crop-recommendation/bulk", chunks=[b"N,P,K\n", b"1,2,3\n"])
+    assert status == 413
+
+
+def test_full_queue_is_503(asgi):
+    adapter = asgi.AsgiAdapter(asgi.wsgi_app, max_queue=0)
+    status, headers, bodies = request(adapter, "GET", "/")
+    assert status == 503 and headers["retry-after"] == "1"
+    assert json.loads(b"".join(bodies))["message"] == "More than 0 requests are waiting"
+
+
+def test_queue_timeout_is_503(asgi):
+    adapter = asgi.AsgiAdapter(asgi.wsgi_app, max_concurrency=1, queue_timeout=0.05)
+    # Every app thread is taken
+    sent, _ = asyncio.run(drive(adapter, http_scope("GET", "/"), before=adapter._slots.acquire))
+    status, headers, bodies = parse(sent)
+    assert status == 503 and headers["retry-after"] == "1"
+    assert "No worker thread became available within 0.05 seconds" in json.loads(b"".join(bodies))["message"]
+
+
+class RecordingModels:
+    def __init__(self):
+        self.warmed_up = False
+
+    def warmup(self):
+        self.warmed_up = True
+
+
+@pytest.mark.parametrize("preload", [True, False])
+def test_lifespan_warms_up_models_when_preloading(asgi, monkeypatch, preload):
+    models = RecordingModels()
+    monkeypatch.setattr(asgi, "models", models)
+    monkeypatch.setattr(asgi, "PRELOAD_MODELS", preload)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.AsgiAdapter(asgi.wsgi_app)({"type": "lifespan"}, receive, send))
+    assert sent == [{"type": "lifespan.startup.complete"}, {"type": "lifespan.shutdown.complete"}]
+    assert models.warmed_up is preload
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher, QueueFull
+
+
+def blocked_batcher(**kwargs):
+    # The first batch waits for release, so later submissions queue up behind it
+    release, batches = threading.Event(), []
+
+    def run_batch(items):
+        batches.append(list(items))
+        if len(batches) == 1:
+            release.wait(5)
+        return [item * 2 for item in items]
+
+    return MicroBatcher(run_batch, **kwargs), release, batches
+
+
+def submit_in_threads(batcher, items, results):
+    threads = [threading.Thread(target=lambda item=item: results.append(batcher.submit(item, timeout=5)))
+               for item in items]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_queued_items_are_run_as_one_batch():
+    batcher, release, batches = blocked_batcher(max_batch_size=8, max_wait_ms=50)
+    results = []
+    threads = submit_in_threads(batcher, [0], results)
+    wait_for(lambda: batches)
+    threads += submit_in_threads(batcher, range(1, 6), results)
+    wait_for(lambda: batcher.stats()["queue_depth"] == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [0, 2, 4, 6, 8, 10]
+    assert batches[0] == [0] and sorted(batches[1]) == [1, 2, 3, 4, 5]
+    assert batcher.stats()["batch_size_counts"] == {"1": 1, "5": 1}
+
+
+def test_batches_are_capped_at_max_batch_size():
+    batcher, release, batches = blocked_batcher(max_batch_size=2, max_wait_ms=50)
+    results = []
+    threads = submit_in_threads(batcher, [0], results)
+    wait_for(lambda: batches)
+    threads += submit_in_threads(batcher, range(1, 6), results)
+    wait_for(lambda: batcher.stats()["queue_depth"] == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [len(batch) for batch in batches] == [1, 2, 2, 1]
+
+
+def test_batch_errors_reach_every_caller():
+    def run_batch(items):
+        raise ValueError("model failed")
+
+    with pytest.raises(ValueError, match="model failed"):
+        MicroBatcher(run_batch).submit(1, timeout=5)
+
+    with pytest.raises(RuntimeError, match="0 results for 1 items"):
+        MicroBatcher(lambda items: []).submit(1, timeout=5)
+
+
+def test_full_queue_rejects_submissions():
+    batcher, release, batches = blocked_batcher(max_queue=1)
+    threads = submit_in_threads(batcher, [0], [])
+    wait_for(lambda: batches)
+    threads += submit_in_threads(batcher, [1], [])
+    wait_for(lambda: batcher.stats()["queue_depth"] == 1)
+    with pytest.raises(QueueFull):
+        batcher.submit(2, timeout=5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert batcher.stats()["rejected"] == 1
+
+
+def test_timed_out_items_are_dropped():
+    batcher, release, batches = blocked_batcher()
+    threads = submit_in_threads(batcher, [0], [])
+    wait_for(lambda: batches)
+    with pytest.raises(TimeoutError):
+        batcher.submit(1, timeout=0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert batcher.submit(2, timeout=5) == 4
+    assert batches == [[0], [2]]
+    assert batcher.stats()["timed_out"] == 1
+
+
+def test_timed_out_running_item_is_not_released_before_its_batch_is_done():
+    # The batch reads the caller's buffer only after the caller's timeout has passed
+    seen = []
+
+    def run_batch(items):
+        time.sleep(0.2)
+        seen.extend(item[0] for item in items)
+        return [item[0] for item in items]
+
+    batcher = MicroBatcher(run_batch)
+    buffer = [1]
+    assert batcher.submit(buffer, timeout=0.05) == 1
+    # The caller may now reuse its buffer
+    buffer[0] = 2
+    time.sleep(0.05)
+    assert seen == [1]
+    assert batcher.stats()["late"] == 1 and batcher.stats()["timed_out"] == 0
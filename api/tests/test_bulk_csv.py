@@ -0,0 +1,41 @@
+import io
+import json
+
+CROP_HEADER = "N,P,K,temperature,humidity,ph,rainfall\n"
+CROP_ROW = "90,42,43,20.87,82.0,6.5,202.93\n"
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_bad_cells_fail_only_their_rows(api, client, monkeypatch):
+    monkeypatch.setattr(api, "BULK_CHUNK_SIZE", 2)
+    body = CROP_HEADER + CROP_ROW + "90,42,43,inf,82.0,6.5,202.93\n" + CROP_ROW + "90,42,43,20.87,nan,6.5,\n" + CROP_ROW
+    lines = read_ndjson(client.post("/crop-recommendation/bulk", data=body, content_type="text/csv"))
+    assert [line["index"] for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    assert [line["status"] for line in lines[:-1]] == ["success", "error", "success", "error", "success"]
+    assert lines[-1] == {"status": "complete", "rows": 5, "errors": 2}
+
+
+def test_multipart_upload_matches_raw_body(client):
+    body = CROP_HEADER + CROP_ROW * 3
+    raw = read_ndjson(client.post("/crop-recommendation/bulk", data=body, content_type="text/csv"))
+    multipart = read_ndjson(client.post("/crop-recommendation/bulk",
+                                        data={"file": (io.BytesIO(body.encode()), "soil.csv")}))
+    assert raw == multipart
+    assert raw[-1]["errors"] == 0
+
+
+def test_fertilizer_aliases_and_invalid_category(client):
+    body = ("Temparature,Humidity,Moisture,Soil Type,Crop Type,Nitrogen,Potassium,Phosphorous\n"
+            "26,52,38,Sandy,Maize,37,0,0\n"
+            "26,52,38,Mud,Maize,37,0,0\n")
+    lines = read_ndjson(client.post("/fertilizer-recommendation/bulk", data=body, content_type="text/csv"))
+    assert [line["status"] for line in lines] == ["success", "error", "complete"]
+
+
+def test_unreadable_upload_ends_the_stream(client):
+    body = CROP_HEADER.encode() + b"\xff\xfe\xfa,1,2\n"
+    lines = read_ndjson(client.post("/crop-recommendation/bulk", data=body, content_type="text/csv"))
+    assert lines[-1]["status"] == "error"
@@ -0,0 +1,88 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+
+def test_catalog_is_revalidated_with_its_etag(api, client):
+    response = client.get("/catalog")
+    assert response.status_code == 200
+    assert response.headers["X-Catalog-Version"] == api.CATALOG_VERSION
+    assert response.headers["Cache-Control"] == f"public, max-age={api.CATALOG_MAX_AGE}"
+    assert len(response.get_json()["plants"]) == len(api.PLANT_NAMES)
+
+    cached = client.get("/catalog", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304 and cached.get_data() == b""
+
+
+def test_versioned_catalog_is_immutable(api, client):
+    response = client.get(f"/catalog/{api.CATALOG_VERSION}")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.get_data() == client.get("/catalog").get_data()
+
+
+def test_unknown_catalog_version_is_404(api, client):
+    response = client.get("/catalog/0123456789abcdef")
+    assert response.status_code == 404
+    assert response.get_json()["version"] == api.CATALOG_VERSION
+
+
+@pytest.mark.parametrize("query", ["top_k=0", "top_k=31", "top_k=-1", "top_k=three", "format=xml"])
+def test_invalid_response_options_are_rejected(api, query):
+    args = dict(pair.split("=") for pair in query.split("&"))
+    with pytest.raises(ValueError):
+        api.parse_plant_response_options(args)
+
+
+def test_plant_endpoint_rejects_top_k_out_of_range(api, client):
+    for top_k in (0, len(api.PLANT_NAMES) + 1):
+        response = client.post(f"/medicinal-plant-prediction?top_k={top_k}", data={"file": (io.BytesIO(b"x"), "a")})
+        assert response.status_code == 400
+        assert response.get_json()["message"] == f"top_k must be between 1 and {len(api.PLANT_NAMES)}"
+
+
+def test_response_options(api):
+    assert api.parse_plant_response_options({}) == (3, False)
+    assert api.parse_plant_response_options({"top_k": "30", "format": "compact"}) == (30, True)
+
+
+def describe_plant_prediction(api, predictions, top_k):
+    # The response as it was built with jsonify() before it was pre-encoded
+    def describe(idx):
+        return {
+            "class_name": api.PLANT_NAMES[idx],
+            "confidence": float(predictions[idx]),
+            "class_index": int(idx),
+            "ayurvedic_info": api.AYURVEDIC_INFO.get(api.PLANT_NAMES[idx], api.UNKNOWN_PLANT_INFO)
+        }
+
+    return {
+        "status": "success",
+        "prediction": describe(int(np.argmax(predictions))),
+        "top_predictions": [describe(int(idx)) for idx in np.argsort(predictions)[-top_k:][::-1]]
+    }
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 30])
+def test_pre_encoded_response_parses_to_the_jsonify_response(api, top_k):
+    rng = np.random.default_rng(top_k)
+    for predictions in [rng.dirichlet(np.ones(len(api.PLANT_NAMES))).astype(np.float32),
+                        np.full(len(api.PLANT_NAMES), 1 / len(api.PLANT_NAMES), dtype=np.float32)]:
+        fragment = api.encode_plant_prediction(predictions, top_k, False)
+        body = '{"status":"success",%s}' % fragment
+        expected = describe_plant_prediction(api, predictions, top_k)
+        assert json.loads(body) == expected
+        assert json.loads(body) == json.loads(api.app.json.dumps(expected))
+
+
+def test_compact_response_refers_to_the_catalog(api):
+    predictions = np.linspace(0, 1, len(api.PLANT_NAMES), dtype=np.float32)
+    compact = json.loads("{%s}" % api.encode_plant_prediction(predictions, 2, True))
+    assert compact == {
+        "prediction": {"class_index": 29, "confidence": 1.0},
+        "top_predictions": [{"class_index": 29, "confidence": 1.0},
+                            {"class_index": 28, "confidence": float(predictions[28])}],
+        "catalog_version": api.CATALOG_VERSION
+    }
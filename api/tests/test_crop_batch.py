@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import CROP_SAMPLE
+
+
+def test_batch_matches_single_endpoint(client):
+    samples = [CROP_SAMPLE, dict(CROP_SAMPLE, rainfall=40.0, ph=5.2)]
+    response = client.post("/crop-recommendation/batch", json={"samples": samples})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["count"] == 2
+    for sample, result in zip(samples, body["results"]):
+        single = client.post("/crop-recommendation", json=sample).get_json()
+        assert result["status"] == "success"
+        assert result["recommendation"] == single["recommendation"]
+
+
+@pytest.mark.parametrize("bad", [
+    {"nitrogen": "inf"},
+    {"temperature": "nan"},
+    {"humidity": "-Infinity"},
+    {"rainfall": 1e400},
+    {"nitrogen": 10 ** 400},
+    {"ph": "acidic"},
+])
+def test_bad_row_fails_only_itself(client, bad):
+    samples = [CROP_SAMPLE, dict(CROP_SAMPLE, **bad), CROP_SAMPLE]
+    response = client.post("/crop-recommendation/batch", json=samples)
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == ["success", "error", "success"]
+    assert results[1]["index"] == 1
+
+
+def test_missing_field_is_reported_per_row(client):
+    sample = dict(CROP_SAMPLE)
+    del sample["nitrogen"]
+    results = client.post("/crop-recommendation/batch", json=[sample]).get_json()["results"]
+    assert results == [{"index": 0, "status": "error", "message": "'nitrogen'"}]
+
+
+def test_oversized_batch_is_413(api, client, monkeypatch):
+    monkeypatch.setattr(api, "BATCH_MAX_SIZE", 2)
+    response = client.post("/crop-recommendation/batch", json=[CROP_SAMPLE] * 3)
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("body", [[], {}, {"samples": "x"}, CROP_SAMPLE])
+def test_malformed_body_is_400(client, body):
+    assert client.post("/crop-recommendation/batch", json=body).status_code == 400
@@ -0,0 +1,129 @@
+import io
+import os
+import signal
+import threading
+import time
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocess import ImagePreprocessor
+from preprocess_pool import DecodePool, SlotTimeout
+
+SHAPE = (64, 64, 3)
+
+
+def photo(width=640, height=480, fmt="JPEG"):
+    gradient = Image.linear_gradient("L").resize((width, height))
+    buffer = io.BytesIO()
+    Image.merge("RGB", [gradient, gradient.rotate(90), gradient.transpose(Image.FLIP_LEFT_RIGHT)]).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def wait_for(condition, seconds=10):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool():
+    pool = DecodePool(*SHAPE, processes=1, slots=2, timeout=5.0)
+    yield pool
+    pool.close()
+
+
+def test_decode_matches_in_thread_preprocessing(pool):
+    data = photo()
+    expected = ImagePreprocessor(*SHAPE)(io.BytesIO(data))
+    with pool.decode(data) as (tensor, timings):
+        assert np.array_equal(tensor, expected)
+        assert set(timings) >= {"decode", "resize"}
+    assert pool.stats()["slots_in_use"] == 0 and pool.stats()["decodes"] == 1
+
+
+def test_decode_errors_reach_the_caller_and_free_the_slot(pool):
+    with pytest.raises(Exception, match="cannot identify image file"):
+        with pool.decode(b"not an image"):
+            pass
+    assert pool.stats()["slots_in_use"] == 0
+
+
+def test_busy_slots_time_out(pool):
+    data = photo()
+    with pool.decode(data), pool.decode(data):
+        with pytest.raises(SlotTimeout):
+            with pool.decode(data, timeout=0.05):
+                pass
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["waits"] == 1
+
+
+def test_timed_out_decode_frees_its_slot_once_the_worker_is_done(pool):
+    with pytest.raises(TimeoutError):
+        with pool.decode(photo(4000, 3000, "PNG"), timeout=0.001):
+            pass
+    # The worker is still writing into the slot, so it stays reserved until the decode finishes
+    assert pool.stats()["slots_in_use"] == 1
+    wait_for(lambda: pool.stats()["slots_in_use"] == 0, seconds=30)
+
+
+def test_dead_worker_is_replaced_once_for_all_callers(pool):
+    data = photo()
+    pool.warmup(data)
+    executor = pool._executor
+    for pid in list(executor._processes):
+        os.kill(pid, signal.SIGKILL)
+    wait_for(lambda: executor._broken)
+
+    errors = []
+
+    def decode():
+        try:
+            with pool.decode(data):
+                pass
+        except BrokenProcessPool as e:
+            errors.append(e)
+
+    callers = [threading.Thread(target=decode) for _ in range(2)]
+    for thread in callers:
+        thread.start()
+    for thread in callers:
+        thread.join()
+    assert len(errors) == 2
+    assert pool.stats()["restarts"] == 1
+    with pool.decode(data) as (tensor, _):
+        assert tensor.shape == SHAPE
+
+
+def test_close_unlinks_the_shared_memory():
+    pool = DecodePool(*SHAPE, processes=1, slots=1)
+    name = pool._shm.name
+    pool.close()
+    pool.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_plant_endpoint_uses_the_pool_and_answers_503_when_slots_are_busy(api, client, monkeypatch):
+    pool = DecodePool.from_input_details(api.models.get("plant").input_details[0], processes=1, slots=1,
+                                         timeout=0.5)
+    try:
+        monkeypatch.setattr(api, "PLANT_DECODE_PROCESSES", 1)
+        monkeypatch.setattr(api, "_plant_decode_pool", pool)
+        data = photo()
+        pool.warmup(data)
+        response = client.post("/medicinal-plant-prediction", data={"file": (io.BytesIO(data), "leaf.jpg")})
+        assert response.status_code == 200 and pool.stats()["decodes"] == 1
+
+        with pool.decode(data):
+            response = client.post("/medicinal-plant-prediction", data={"file": (io.BytesIO(data), "leaf.jpg")})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert "No preprocessing slot" in response.get_json()["message"]
+    finally:
+        pool.close()
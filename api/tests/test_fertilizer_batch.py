@@ -0,0 +1,52 @@
+import pytest
+
+FERTILIZER_SAMPLE = {"temperature": 26, "humidity": 52, "moisture": 38, "nitrogen": 37, "potassium": 0,
+                     "phosphorous": 0, "soil_type": "Sandy", "crop_type": "Maize"}
+
+
+def test_batch_matches_single_endpoint(api, client):
+    samples = [dict(FERTILIZER_SAMPLE, soil_type=soil, crop_type=crop)
+               for soil in api.soil_dict for crop in api.crop_type_dict]
+    results = client.post("/fertilizer-recommendation/batch", json=samples).get_json()["results"]
+    assert [result["status"] for result in results[:4]] == ["success"] * 4
+    for sample, result in zip(samples, results):
+        single = client.post("/fertilizer-recommendation", json=sample).get_json()
+        assert result["status"] == "success"
+        assert result["recommendation"] == single["recommendation"]
+
+
+def test_encode_categories_matches_dict_lookup(api):
+    values = list(api.soil_dict) + ["Mud", "", None, 3, "loamy"]
+    codes = api.encode_categories(values, api.SOIL_KEYS, api.SOIL_CODES)
+    assert list(codes) == [api.soil_dict.get(value, 0) if isinstance(value, str) else 0 for value in values]
+
+
+def test_batch_behaves_like_single_requests(client):
+    samples = [dict(FERTILIZER_SAMPLE, **changes) for changes in [
+        {}, {"nitrogen": 10 ** 20}, {"nitrogen": 10 ** 30}, {"potassium": -(10 ** 30)}, {"nitrogen": 10 ** 400},
+        {"temperature": 26.9}, {"humidity": "52"}, {"moisture": "inf"}, {"soil_type": "Mud"}, {"crop_type": None},
+    ]]
+    results = client.post("/fertilizer-recommendation/batch", json=samples).get_json()["results"]
+    assert [result["status"] for result in results[:4]] == ["success"] * 4
+    for sample, result in zip(samples, results):
+        single = client.post("/fertilizer-recommendation", json=sample).get_json()
+        assert result["status"] == single["status"], sample
+        if single["status"] == "success":
+            assert result["recommendation"] == single["recommendation"]
+
+
+@pytest.mark.parametrize("bad, message", [
+    ({"nitrogen": 10 ** 400}, "too large"),
+    ({"temperature": "inf"}, ""),
+    ({"humidity": float("nan")}, ""),
+    ({"soil_type": "Mud"}, "Invalid soil type"),
+    ({"crop_type": "Rice"}, "Invalid crop type"),
+    ({"soil_type": None}, "Invalid soil type"),
+])
+def test_bad_row_fails_only_itself(client, bad, message):
+    samples = [FERTILIZER_SAMPLE, dict(FERTILIZER_SAMPLE, **bad), FERTILIZER_SAMPLE]
+    response = client.post("/fertilizer-recommendation/batch", json=samples)
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == ["success", "error", "success"]
+    assert message in results[1]["message"]
@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import CROP_SAMPLE
+
+FIELD_SAMPLE = dict(CROP_SAMPLE, moisture=38, soil_type="Loamy", crop_type="Sugarcane")
+
+
+def test_batch_matches_single_endpoints(api, client):
+    samples = [dict(FIELD_SAMPLE, rainfall=rainfall, soil_type=soil)
+               for rainfall in (60, 120, 200) for soil in api.soil_dict]
+    results = client.post("/field-advisory/batch", json=samples).get_json()["results"]
+    for sample, result in zip(samples, results):
+        single = client.post("/field-advisory", json=sample).get_json()
+        assert result["status"] == "success"
+        assert result["recommendation"] == single["recommendation"]
+
+
+def test_parallel_path_matches_serial(api, client, monkeypatch):
+    samples = [dict(FIELD_SAMPLE, nitrogen=n) for n in range(0, 140, 7)]
+    serial = client.post("/field-advisory/batch", json=samples).get_json()
+    monkeypatch.setattr(api, "ADVISORY_PARALLEL_ROWS", 1)
+    assert client.post("/field-advisory/batch", json=samples).get_json() == serial
+
+
+def test_batch_behaves_like_single_requests(client):
+    samples = [dict(FIELD_SAMPLE, **changes) for changes in [
+        {}, {"nitrogen": 10 ** 20}, {"potassium": -(10 ** 30)}, {"nitrogen": 10 ** 400}, {"temperature": 26.9},
+        {"humidity": "52"}, {"moisture": "inf"}, {"ph": None}, {"soil_type": "Mud"}, {"crop_type": 3},
+    ]]
+    results = client.post("/field-advisory/batch", json=samples).get_json()["results"]
+    assert [result["status"] for result in results[:3]] == ["success"] * 3
+    for sample, result in zip(samples, results):
+        single = client.post("/field-advisory", json=sample).get_json()
+        assert result["status"] == single["status"], sample
+        if single["status"] == "success":
+            assert result["recommendation"] == single["recommendation"]
+        else:
+            assert result["message"] == single["message"]
+
+
+@pytest.mark.parametrize("bad", [
+    {"nitrogen": 10 ** 400},
+    {"temperature": "inf"},
+    {"rainfall": float("inf")},
+    {"ph": float("nan")},
+    {"moisture": None},
+    {"soil_type": "Mud"},
+])
+def test_bad_row_fails_only_itself(client, bad):
+    samples = [FIELD_SAMPLE, dict(FIELD_SAMPLE, **bad), FIELD_SAMPLE]
+    response = client.post("/field-advisory/batch", json=samples)
+    assert response.status_code == 200
+    assert [result["status"] for result in response.get_json()["results"]] == ["success", "error", "success"]
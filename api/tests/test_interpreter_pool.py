@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from interpreter_pool import InterpreterPool, PoolTimeout
+
+
+@pytest.fixture
+def pool(api):
+    # The conftest points PLANT_MODEL_PATH at the stand-in model when the trained one is missing
+    return InterpreterPool(api.plant_model_path, size=1, timeout=5)
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert condition()
+
+
+def test_checkout_times_out_while_every_interpreter_is_held(pool):
+    with pool.checkout():
+        assert pool.stats()["in_use"] == 1
+        started = time.monotonic()
+        with pytest.raises(PoolTimeout, match="within 0.1 seconds"):
+            with pool.checkout(timeout=0.1):
+                pass
+        assert time.monotonic() - started >= 0.1
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["checkouts"] == 1
+    assert stats["waiting"] == 0 and stats["idle"] == 1
+    assert stats["wait_seconds"] >= 0.1
+
+
+def test_waiting_caller_gets_the_released_interpreter(pool):
+    got = []
+
+    def wait_for_interpreter():
+        with pool.checkout() as interpreter:
+            got.append(interpreter)
+
+    with pool.checkout() as held:
+        waiter = threading.Thread(target=wait_for_interpreter)
+        waiter.start()
+        wait_until(lambda: pool.stats()["waiting"] == 1)
+        time.sleep(0.05)
+    waiter.join(5)
+    assert got == [held]
+    stats = pool.stats()
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 0 and stats["idle"] == 1
+    assert stats["wait_seconds"] >= 0.05
@@ -0,0 +1,45 @@
+import json
+import os
+
+from metrics import Metrics, clear_snapshots
+
+
+def write_snapshot(directory, pid, started, counters=(), gauges=()):
+    snapshot = {"pid": pid, "started": started, "counters": list(counters), "gauges": list(gauges),
+                "histograms": []}
+    with open(os.path.join(directory, f"metrics-{pid}-{int(started * 1000)}.json"), "w") as f:
+        json.dump(snapshot, f)
+
+
+def test_snapshots_are_merged_across_workers(tmp_path):
+    metrics = Metrics(directory=str(tmp_path))
+    metrics.inc("requests_total", {"status": "200"}, 3)
+    metrics.set_gauge("model_loaded", {"model": "crop"}, 1)
+    metrics.observe("request_duration_seconds", {}, 0.02)
+    # A worker that has exited, and an earlier process that held this process's pid
+    write_snapshot(tmp_path, 2 ** 22 + 1, 100.0, counters=[["requests_total", [["status", "200"]], 2]],
+                   gauges=[["model_loaded", [["model", "crop"]], 1]])
+    write_snapshot(tmp_path, os.getpid(), 50.0, counters=[["requests_total", [["status", "200"]], 5]],
+                   gauges=[["model_loaded", [["model", "crop"]], 0]])
+
+    counters, gauges, histograms = metrics.collect()
+    assert counters[("requests_total", (("status", "200"),))] == 10
+    assert gauges == {("model_loaded", (("model", "crop"), ("worker", str(os.getpid())))): 1}
+    assert sum(histograms[("request_duration_seconds", ())][:-1]) == 1
+    assert 'agri_requests_total{status="200"} 10' in metrics.render()
+
+
+def test_snapshot_file_is_named_by_pid_and_start_time(tmp_path):
+    metrics = Metrics(directory=str(tmp_path))
+    metrics.inc("requests_total", {})
+    metrics.flush()
+    [name] = os.listdir(tmp_path)
+    assert name.startswith(f"metrics-{os.getpid()}-") and name.endswith(".json")
+
+
+def test_clear_snapshots_keeps_other_files(tmp_path):
+    write_snapshot(tmp_path, 1, 1.0)
+    (tmp_path / "metrics-1-1000.json.tmp").write_text("{")
+    (tmp_path / "notes.txt").write_text("keep")
+    clear_snapshots(str(tmp_path))
+    assert os.listdir(tmp_path) == ["notes.txt"]
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry, ModelUnavailable
+
+
+def test_models_are_loaded_once_on_first_use():
+    models = ModelRegistry()
+    loads = []
+    models.register("crop", lambda: loads.append(1) or "crop model")
+    assert not models.is_loaded("crop")
+    assert models.get("crop") == models.get("crop") == "crop model"
+    assert len(loads) == 1
+    assert models.stats()["models"]["crop"]["loaded"]
+
+
+def test_failed_load_is_retried():
+    models = ModelRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file is being replaced")
+        return "crop model"
+
+    models.register("crop", flaky)
+    with pytest.raises(ModelUnavailable, match="being replaced"):
+        models.get("crop")
+    assert models.stats()["models"]["crop"]["error"] == "model file is being replaced"
+    assert models.warmup() == {}
+    assert models.get("crop") == "crop model" and models.ready()
+    assert models.stats()["models"]["crop"]["error"] is None
+
+
+def test_failed_warmup_is_reported_and_retried():
+    models = ModelRegistry()
+    calls = []
+
+    def warm(model):
+        calls.append(model)
+        if len(calls) == 1:
+            raise RuntimeError("no tensors allocated")
+
+    models.register("plant", lambda: "plant model", warmup=warm)
+    assert "no tensors allocated" in models.warmup()["plant"]
+    assert not models.ready()
+    assert models.warmup() == {} and models.ready()
+    assert len(calls) == 2
+
+
+def test_after_fork_drops_only_fork_unsafe_models():
+    models = ModelRegistry()
+    models.register("crop", lambda: "crop model")
+    models.register("plant", lambda: "plant model", fork_safe=False)
+    assert models.warmup() == {} and models.ready()
+    models.after_fork()
+    assert models.is_loaded("crop") and not models.is_loaded("plant")
+    assert models.stats()["models"]["crop"]["warmed_up"]
+    assert not models.stats()["models"]["plant"]["loaded"]
+    assert not models.ready()
+
+
+def test_warmup_can_skip_fork_unsafe_models():
+    models = ModelRegistry()
+    models.register("crop", lambda: "crop model")
+    models.register("plant", lambda: "plant model", fork_safe=False)
+    models.warmup(fork_safe_only=True)
+    assert models.is_loaded("crop") and not models.is_loaded("plant")
+
+
+def test_ready_is_503_until_the_background_warmup_finishes(api, client, monkeypatch):
+    models = ModelRegistry()
+    release = threading.Event()
+    models.register("crop", lambda: release.wait(5) and "crop model")
+    monkeypatch.setattr(api, "models", models)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "not ready"
+    # A second probe does not start another warmup
+    assert client.get("/ready").status_code == 503
+    thread = models._warmup_thread
+    release.set()
+    thread.join(5)
+    assert models._warmup_thread is thread
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["models"]["crop"]["warmed_up"]
+
+
+def test_ready_recovers_after_a_failed_load(api, client, monkeypatch):
+    models = ModelRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file missing")
+        return "crop model"
+
+    models.register("crop", flaky)
+    monkeypatch.setattr(api, "models", models)
+
+    response = client.get("/ready")
+    models._warmup_thread.join(5)
+    assert response.status_code == 503
+    assert models.stats()["models"]["crop"]["error"] == "model file missing"
+
+    # The next probe retries the load in the background
+    assert client.get("/ready").status_code == 503
+    models._warmup_thread.join(5)
+    assert client.get("/ready").status_code == 200
+    assert len(attempts) == 2
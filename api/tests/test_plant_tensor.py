@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+URL = "/medicinal-plant-prediction"
+
+
+@pytest.fixture(scope="module")
+def pixels(api):
+    height, width, channels = api.get_plant_preprocessor().shape
+    return np.random.default_rng(0).integers(0, 256, (height, width, channels), dtype=np.uint8)
+
+
+def npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def predictions(response):
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["top_predictions"]
+
+
+def test_tensor_formats_match_an_image_upload(api, client, pixels):
+    png = io.BytesIO()
+    Image.fromarray(pixels).save(png, "PNG")
+    expected = predictions(client.post(URL, data={"file": (io.BytesIO(png.getvalue()), "leaf.png")}))
+
+    normalized = api.get_plant_preprocessor().tensor(pixels.tobytes()).copy()
+    requests = [
+        dict(data=pixels.tobytes(), content_type="application/octet-stream"),
+        dict(data=pixels.tobytes(), content_type="application/octet-stream",
+             headers={"X-Tensor-Shape": "1x%dx%dx%d" % pixels.shape}),
+        dict(data=npy(pixels), content_type="application/x-npy"),
+        dict(data=normalized.tobytes(), content_type="application/octet-stream",
+             headers={"X-Tensor-Dtype": str(normalized.dtype)}),
+        dict(data=npy(normalized), content_type="application/x-npy"),
+    ]
+    for kwargs in requests:
+        assert predictions(client.post(URL, **kwargs)) == expected
+
+
+def test_invalid_tensors_are_rejected(api, client, pixels):
+    nan = api.get_plant_preprocessor().tensor(pixels.tobytes()).copy()
+    nan[0, 0, 0] = np.nan
+    invalid = [
+        (dict(data=pixels.tobytes()[:-1], content_type="application/octet-stream"), "needs"),
+        (dict(data=pixels[:-1].tobytes(), content_type="application/octet-stream",
+              headers={"X-Tensor-Shape": "%d,%d,%d" % pixels[:-1].shape}), "does not match"),
+        (dict(data=pixels.tobytes(), content_type="application/octet-stream",
+              headers={"X-Tensor-Shape": "wide"}), "Invalid tensor shape"),
+        (dict(data=pixels.astype(np.int16).tobytes(), content_type="application/octet-stream",
+              headers={"X-Tensor-Dtype": "int16"}), "dtype must be"),
+        (dict(data=pixels.tobytes(), content_type="application/octet-stream",
+              headers={"X-Tensor-Dtype": "pixel"}), "Unknown tensor dtype"),
+        (dict(data=npy(nan), content_type="application/x-npy"), "NaN or infinite"),
+        (dict(data=npy(np.asfortranarray(pixels)), content_type="application/x-npy"), "Fortran"),
+        (dict(data=b"not a npy file", content_type="application/x-npy"), "Invalid .npy body"),
+    ]
+    for kwargs, message in invalid:
+        response = client.post(URL, **kwargs)
+        assert response.status_code == 400, message
+        assert message in response.get_json()["message"]
@@ -0,0 +1,77 @@
+import io
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+from batching import QueueFull
+from interpreter_pool import PoolTimeout
+from preprocess import BudgetTimeout
+from preprocess_pool import SlotTimeout
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def upload(client, data, url="/medicinal-plant-prediction"):
+    return client.post(url, data={"file": (io.BytesIO(data), "photo")})
+
+
+def test_photo_is_classified(client):
+    response = upload(client, encode(Image.new("RGB", (640, 480), (40, 120, 30)), "JPEG"))
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "success"
+
+
+def test_undecodable_upload_is_rejected(client):
+    response = upload(client, b"not an image")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Could not read image: not a supported image file"
+
+
+def test_oversized_image_is_rejected_from_its_header(api, client):
+    side = int(api.PLANT_MAX_IMAGE_PIXELS ** 0.5) + 1
+    response = upload(client, encode(Image.new("L", (side, side)), "PNG"))
+    assert response.status_code == 413
+    assert response.get_json()["message"].startswith("Image too large")
+
+
+def test_batch_errors_apply_to_their_image_only(client):
+    photo = encode(Image.new("RGB", (320, 240), (40, 120, 30)), "PNG")
+    response = client.post("/medicinal-plant-prediction/batch",
+                           data={"files": [(io.BytesIO(photo), "a.png"), (io.BytesIO(b"junk"), "b.png"),
+                                           (io.BytesIO(photo), "c.png")]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == ["success", "error", "success"]
+    assert results[1]["message"] == "Could not read image: not a supported image file"
+
+
+class FailingDecodePool:
+    def __init__(self, error):
+        self.error = error
+
+    def decode(self, data, timeout=None):
+        raise self.error
+
+
+@pytest.mark.parametrize("error", [
+    SlotTimeout("No preprocessing slot became available within 10 seconds"),
+    BudgetTimeout("No decode memory became available within 10 seconds"),
+    BrokenProcessPool("A process in the process pool was terminated abruptly"),
+    PoolTimeout("No interpreter became available within 10 seconds"),
+    QueueFull("plant-batcher queue is full (64 waiting)"),
+])
+def test_capacity_errors_are_503_on_single_and_batch_routes(api, client, monkeypatch, error):
+    monkeypatch.setattr(api, "get_plant_decode_pool", lambda *args: FailingDecodePool(error))
+    photo = encode(Image.new("RGB", (320, 240), (40, 120, 30)), "PNG")
+    single = upload(client, photo)
+    batch = client.post("/medicinal-plant-prediction/batch",
+                        data={"files": [(io.BytesIO(photo), "a.png"), (io.BytesIO(photo), "b.png")]})
+    for response in (single, batch):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert response.get_json()["message"] == str(error)
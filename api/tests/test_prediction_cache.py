@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from prediction_cache import PredictionCache
+
+
+def test_hits_skip_the_computation():
+    cache = PredictionCache()
+    calls = []
+    assert cache.get_or_compute("a", lambda: calls.append(1) or {"crop": 1}) == {"crop": 1}
+    assert cache.get_or_compute("a", lambda: calls.append(1) or {"crop": 2}) == {"crop": 1}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("c", lambda: 3)
+    assert cache.get_or_compute("a", lambda: "recomputed") == 1
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_entries_are_bounded_by_encoded_size():
+    cache = PredictionCache(max_bytes=100)
+    cache.get_or_compute("large", lambda: "x" * 200)
+    assert cache.stats()["entries"] == 0
+    for key in "abcdefgh":
+        cache.get_or_compute(key, lambda: "x" * 20)
+    assert cache.stats()["bytes"] <= 100
+
+
+def test_entries_expire():
+    cache = PredictionCache(ttl=0.05)
+    cache.get_or_compute("a", lambda: 1)
+    time.sleep(0.1)
+    assert cache.get_or_compute("a", lambda: 2) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_concurrent_misses_are_collapsed():
+    cache = PredictionCache()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("a", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("a", compute)))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while cache.stats()["collapsed"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+    assert results == [42] * 4 and len(calls) == 1
+
+
+def test_errors_are_not_cached():
+    cache = PredictionCache()
+
+    def fail():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("a", fail)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.stats()["errors"] == 1
+
+
+def test_shared_level_is_read_by_other_caches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    PredictionCache(shared_path=path).get_or_compute("a", lambda: {"crop": 1})
+    other = PredictionCache(shared_path=path)
+    assert other.get_or_compute("a", lambda: {"crop": 2}) == {"crop": 1}
+    assert other.stats()["shared_hits"] == 1
+
+
+def test_unreadable_shared_level_falls_back_to_computing(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PredictionCache(shared_path=path)
+    # Another process breaking the file: every read and write now fails
+    cache.shared._connect().execute("DROP TABLE cache")
+    assert cache.get_or_compute("a", lambda: {"crop": 1}) == {"crop": 1}
+    assert cache.get_or_compute("a", lambda: {"crop": 2}) == {"crop": 1}
+    stats = cache.stats()
+    assert stats["shared_errors"] == 2 and stats["misses"] == 1 and stats["errors"] == 0
@@ -0,0 +1,99 @@
+import os
+import pstats
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from profiling import TOKEN_HEADER, Profiler
+
+TOKEN = "secret"
+
+
+def make_app(directory, **options):
+    app = Flask(__name__)
+
+    @app.route("/work")
+    def work():
+        return jsonify({"total": sum(i * i for i in range(10000))})
+
+    profiler = Profiler(directory, token=TOKEN, **options)
+    profiler.install(app)
+    return app, profiler
+
+
+def test_nothing_is_installed_without_a_directory():
+    app, _ = make_app(None)
+    assert not app.before_request_funcs and not app.after_request_funcs and not app.teardown_request_funcs
+    assert "debug_profile" not in app.view_functions
+    assert app.test_client().get("/debug/profile", headers={TOKEN_HEADER: TOKEN}).status_code == 404
+
+
+def test_the_app_has_no_profiler_by_default(api):
+    # The tests run without PROFILE_DIR
+    assert api.PROFILE_DIR is None
+    assert "debug_profile" not in api.app.view_functions
+    hooks = [hook for funcs in api.app.before_request_funcs.values() for hook in funcs]
+    assert not any(isinstance(getattr(hook, "__self__", None), Profiler) for hook in hooks)
+
+
+def test_request_with_the_token_is_profiled(tmp_path):
+    app, _ = make_app(str(tmp_path))
+    client = app.test_client()
+
+    response = client.get("/work")
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/work", headers={TOKEN_HEADER: "wrong"}).headers.get("X-Profile-Id") is None
+    assert not os.listdir(tmp_path)
+
+    response = client.get("/work", headers={TOKEN_HEADER: TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert os.listdir(tmp_path) == [profile_id + ".prof"]
+    functions = {function for _, _, function in pstats.Stats(str(tmp_path / (profile_id + ".prof"))).stats}
+    assert "work" in functions
+
+
+def test_memory_profiling_writes_allocation_sites(tmp_path):
+    app, _ = make_app(str(tmp_path), memory=True)
+    profile_id = app.test_client().get("/work", headers={TOKEN_HEADER: TOKEN}).headers["X-Profile-Id"]
+    assert sorted(os.listdir(tmp_path)) == [profile_id + ".alloc.txt", profile_id + ".prof"]
+    assert (tmp_path / (profile_id + ".alloc.txt")).read_text().startswith("GET /work -> 200")
+
+
+def test_window_requires_the_token(tmp_path):
+    app, _ = make_app(str(tmp_path))
+    client = app.test_client()
+    assert client.get("/debug/profile?seconds=0.1").status_code == 403
+    assert client.get("/debug/profile?seconds=0.1", headers={TOKEN_HEADER: "wrong"}).status_code == 403
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.parametrize("query", ["seconds=0", "seconds=61", "seconds=abc", "seconds=1&interval_ms=0"])
+def test_window_rejects_bad_durations(tmp_path, query):
+    app, _ = make_app(str(tmp_path))
+    assert app.test_client().get(f"/debug/profile?{query}", headers={TOKEN_HEADER: TOKEN}).status_code == 400
+
+
+def test_window_samples_stacks_and_allows_one_profile_at_a_time(tmp_path):
+    app, profiler = make_app(str(tmp_path))
+    results = []
+    window = threading.Thread(target=lambda: results.append(
+        app.test_client().get("/debug/profile?seconds=0.5", headers={TOKEN_HEADER: TOKEN})))
+    window.start()
+    deadline = time.monotonic() + 5
+    while not profiler._busy.locked() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    client = app.test_client()
+    assert client.get("/debug/profile?seconds=0.1", headers={TOKEN_HEADER: TOKEN}).status_code == 409
+    # A request sampled during the window is served but not profiled
+    assert "X-Profile-Id" not in client.get("/work", headers={TOKEN_HEADER: TOKEN}).headers
+    window.join(5)
+
+    body = results[0].get_json()
+    assert results[0].status_code == 200 and body["samples"] > 0
+    assert body["files"] == [body["id"] + ".collapsed"]
+    assert os.listdir(tmp_path) == [body["id"] + ".collapsed"]
+    assert "X-Profile-Id" in client.get("/work", headers={TOKEN_HEADER: TOKEN}).headers
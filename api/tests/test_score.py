@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from PIL import Image
+
+from conftest import API_DIR
+
+
+def score(*args):
+    return subprocess.run([sys.executable, os.path.join(API_DIR, "score.py"), *args],
+                          capture_output=True, text=True, cwd=API_DIR)
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_images_are_scored_in_order_with_per_image_errors(tmp_path):
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    for i in range(7):
+        Image.new("RGB", (64 + i, 48), (40, 20 * i, 30)).save(photos / f"{i}.png")
+    (photos / "3b.jpg").write_bytes(b"not an image")
+    output = tmp_path / "plants.jsonl"
+
+    result = score("images", str(photos), "--output", str(output), "--workers", "2", "--batch-size", "3")
+    assert result.returncode == 0, result.stderr
+    lines = read_lines(output)
+    assert [line["path"] for line in lines] == ["0.png", "1.png", "2.png", "3.png", "3b.jpg", "4.png", "5.png",
+                                                "6.png"]
+    assert [line["status"] for line in lines].count("error") == 1
+    assert lines[4]["message"] == "Could not read image: not a supported image file"
+    assert all(len(line["top_predictions"]) == 3 for line in lines if line["status"] == "success")
+
+    # Resuming after an interruption only scores the images missing from the output
+    with open(output, "r+") as f:
+        f.truncate(len("".join(f.readlines()[:5])) + 10)
+    result = score("images", str(photos), "--output", str(output), "--batch-size", "3", "--resume")
+    assert result.returncode == 0, result.stderr
+    assert read_lines(output) == lines
+
+
+def test_top_k_is_limited_to_the_plant_classes(api, tmp_path):
+    result = score("images", str(tmp_path), "--output", str(tmp_path / "out.jsonl"),
+                   "--top-k", str(len(api.PLANT_NAMES) + 1))
+    assert result.returncode == 2
+    assert f"between 1 and {len(api.PLANT_NAMES)}" in result.stderr
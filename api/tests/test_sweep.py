@@ -0,0 +1,60 @@
+import numpy as np
+
+from conftest import CROP_SAMPLE
+
+FERTILIZER_SAMPLE = {"temperature": 26, "humidity": 52, "moisture": 38, "nitrogen": 37, "potassium": 0,
+                     "phosphorous": 0, "soil_type": "Sandy", "crop_type": "Maize"}
+
+
+def expand(runs):
+    return [code for code, length, *_ in runs for _ in range(length)]
+
+
+def test_run_length_encode(api):
+    codes = np.array([0, 0, 1, 1, 1, 0, 2])
+    confidence = np.array([0.5, 0.7, 1.0, 0.8, 0.6, 0.9, 0.4])
+    assert api.run_length_encode(codes, confidence) == [[0, 2, 0.6], [1, 3, 0.8], [0, 1, 0.9], [2, 1, 0.4]]
+    assert api.run_length_encode(codes, None) == [[0, 2], [1, 3], [0, 1], [2, 1]]
+
+
+def test_crop_sweep_matches_single_endpoint(client):
+    sweep = [{"feature": "rainfall", "start": 40, "stop": 240, "steps": 6},
+             {"feature": "nitrogen", "values": [10, 90.7, 140]}]
+    result = client.post("/crop-recommendation/sweep", json={"base": CROP_SAMPLE, "sweep": sweep}).get_json()
+    assert result["shape"] == [6, 3] and result["points"] == 18
+    assert result["axes"][1]["values"] == [10, 90, 140]
+    crops = expand(result["runs"])
+    for i, rainfall in enumerate(result["axes"][0]["values"]):
+        for j, nitrogen in enumerate(result["axes"][1]["values"]):
+            single = client.post("/crop-recommendation",
+                                 json=dict(CROP_SAMPLE, rainfall=rainfall, nitrogen=nitrogen)).get_json()
+            assert result["classes"][crops[i * 3 + j]] == single["recommendation"]
+
+
+def test_fertilizer_sweep_defaults_to_every_category(api, client):
+    sweep = {"feature": "soil_type"}
+    result = client.post("/fertilizer-recommendation/sweep", json={"base": FERTILIZER_SAMPLE, "sweep": sweep})
+    result = result.get_json()
+    assert result["axes"][0]["values"] == list(api.soil_dict)
+    fertilizers = expand(result["runs"])
+    for soil, code in zip(api.soil_dict, fertilizers):
+        single = client.post("/fertilizer-recommendation", json=dict(FERTILIZER_SAMPLE, soil_type=soil)).get_json()
+        assert result["classes"][code]["fertilizer"] == single["recommendation"]["fertilizer"]
+
+
+def test_too_many_points_is_413(api, client, monkeypatch):
+    monkeypatch.setattr(api, "SWEEP_MAX_POINTS", 100)
+    sweep = [{"feature": "rainfall", "start": 40, "stop": 240, "steps": 20},
+             {"feature": "humidity", "start": 10, "stop": 90, "steps": 20}]
+    assert client.post("/crop-recommendation/sweep", json={"base": CROP_SAMPLE, "sweep": sweep}).status_code == 413
+    sweep = {"feature": "rainfall", "start": 40, "stop": 240, "steps": 101}
+    assert client.post("/crop-recommendation/sweep", json={"base": CROP_SAMPLE, "sweep": sweep}).status_code == 413
+
+
+def test_invalid_sweeps_are_400(client):
+    for sweep in [{"feature": "rainfall", "values": [40, float("nan")]},
+                  {"feature": "rainfall", "start": 40, "stop": 240, "steps": float("inf")},
+                  {"feature": "colour", "values": [1]},
+                  [{"feature": "ph", "values": [6]}, {"feature": "ph", "values": [7]}]]:
+        response = client.post("/crop-recommendation/sweep", json={"base": CROP_SAMPLE, "sweep": sweep})
+        assert response.status_code == 400, sweep
@@ -0,0 +1,87 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from compile_models import MODELS, load_dataset, random_samples
+from tree_engine import CompiledTreeModel, SizeRoutedModel, check_parity, compile_estimator, load_compiled, \
+    save_compiled
+
+# The models were fitted on DataFrames; predicting on arrays is expected here
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+
+def load_estimator(name):
+    with open(MODELS[name], "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_compiled_model_matches_sklearn(name, tmp_path):
+    estimator = load_estimator(name)
+    save_compiled(tmp_path / name, compile_estimator(estimator))
+    compiled = load_compiled(tmp_path / name)
+    dataset = load_dataset(name)
+    X = np.concatenate([dataset, random_samples(estimator, dataset, 5000)])
+    parity = check_parity(estimator, compiled, X)
+    assert parity["prediction_mismatches"] == 0
+    assert parity["max_proba_difference"] == 0.0
+
+
+def test_compiled_model_rejects_non_finite_rows(tmp_path):
+    compiled = CompiledTreeModel(compile_estimator(load_estimator("crop")))
+    with pytest.raises(ValueError, match="NaN or infinity"):
+        compiled.predict([[90, 42, 43, 20.87, 82.0, np.inf, 202.93]])
+
+
+class Recorder:
+    def __init__(self, model):
+        self.model, self.calls = model, 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        self.calls += 1
+        return self.model.predict(X)
+
+
+def test_size_routed_model_sends_large_inputs_to_sklearn():
+    estimator = Recorder(load_estimator("crop"))
+    compiled = CompiledTreeModel(compile_estimator(estimator.model))
+    loads = []
+    routed = SizeRoutedModel(compiled, lambda: loads.append(1) or estimator, max_rows=100)
+    X = random_samples(compiled, np.empty((0, 7)), 150)
+    assert routed.n_features_in_ == 7 and routed.classes_ is compiled.classes_
+
+    small = routed.predict_proba(X[:99])
+    assert estimator.calls == 0 and not loads
+    assert np.array_equal(routed.predict(X), compiled.predict(X))
+    routed.predict_proba(X)
+    assert estimator.calls == 2 and len(loads) == 1
+    assert np.array_equal(small, compiled.predict_proba(X[:99]))
+
+
+@pytest.mark.parametrize("error", [ModuleNotFoundError("No module named 'sklearn'"),
+                                   FileNotFoundError("fertilizer_model.pkl")])
+def test_size_routed_model_without_estimator_stays_compiled(error):
+    compiled = CompiledTreeModel(compile_estimator(load_estimator("fertilizer")))
+
+    def missing():
+        raise error
+
+    routed = SizeRoutedModel(compiled, missing, max_rows=1)
+    X = np.tile([[26, 52, 38, 37, 0, 0, 2, 11]], (10, 1))
+    assert np.array_equal(routed.predict(X), compiled.predict(X))
+    assert routed._load_estimator is None
+
+
+def test_warmup_loads_the_estimator(api):
+    compiled = CompiledTreeModel(compile_estimator(load_estimator("crop")))
+    loads = []
+    routed = SizeRoutedModel(compiled, lambda: loads.append(1) or load_estimator("crop"), max_rows=4000)
+    api.warm_up_tree_model(routed)
+    assert len(loads) == 1
+    routed.predict(random_samples(compiled, np.empty((0, 7)), 4000))
+    assert len(loads) == 1
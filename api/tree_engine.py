@@ -0,0 +1,251 @@
+"""Flat NumPy inference for the pickled sklearn tree models.
+
+compile_estimator() exports a fitted DecisionTreeClassifier or random forest
+into a handful of flat arrays: every node of every tree is stored in one table,
+and leaves point back at themselves.  CompiledTreeModel evaluates all rows and
+all trees together, one tree level per step.  The first levels are evaluated
+densely; after that, (row, tree) pairs are dropped from the working set as soon
+as they reach a leaf.  It follows sklearn's arithmetic
+(float32 inputs, per-tree accumulation in estimator order), so predictions and
+probabilities match sklearn exactly.
+
+Compiled models are saved as a directory of .npy files, already in the layout
+the engine evaluates, and loaded with mmap_mode="r".  The arrays are then
+read-only views of the page cache, shared by every process that loads the
+same files instead of being copied into each worker.
+
+The engine is fastest on small batches, but sklearn's traversal overtakes it
+at around a thousand rows.  SizeRoutedModel serves a compiled model and loads
+the original estimator only for inputs above a row threshold.
+"""
+import os
+import shutil
+import threading
+
+import numpy as np
+
+# Rows evaluated together; keeps the (rows x trees) working arrays cache-sized
+CHUNK_ROWS = 1024
+
+# Levels are evaluated densely until this share of the training samples has reached a leaf
+DENSE_LEAF_FRACTION = 0.7
+
+
+def node_depths(tree):
+    depths = np.zeros(tree.node_count, dtype=np.int64)
+    for node in range(tree.node_count):
+        if tree.children_left[node] != -1:
+            depths[tree.children_left[node]] = depths[tree.children_right[node]] = depths[node] + 1
+    return depths
+
+
+def dense_steps(trees):
+    # First depth by which DENSE_LEAF_FRACTION of the training samples sit in a leaf
+    max_depth = max(tree.max_depth for tree in trees)
+    reached = np.zeros(max_depth + 1)
+    for tree in trees:
+        is_leaf = tree.children_left == -1
+        weights = tree.weighted_n_node_samples[is_leaf] / tree.weighted_n_node_samples[0]
+        np.add.at(reached, node_depths(tree)[is_leaf], weights / len(trees))
+    return int(np.searchsorted(np.cumsum(reached), DENSE_LEAF_FRACTION))
+
+
+def compile_estimator(estimator):
+    if hasattr(estimator, "estimators_"):
+        kind, trees = "forest", [tree.tree_ for tree in estimator.estimators_]
+    elif hasattr(estimator, "tree_"):
+        kind, trees = "tree", [estimator.tree_]
+    else:
+        raise TypeError(f"Cannot compile {type(estimator).__name__}: expected a tree or forest classifier")
+    if getattr(estimator, "n_outputs_", 1) != 1 or not hasattr(estimator, "classes_"):
+        raise TypeError("Only single-output classifiers can be compiled")
+
+    n_classes = len(estimator.classes_)
+    features, thresholds, children, leaves, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Leaves loop back to themselves, so extra traversal steps are harmless
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+        # Children interleaved as [left, right] so one gather picks the next node
+        children.append(np.stack([left, right], axis=1).ravel())
+        leaves.append(is_leaf)
+        values.append(tree.value[:, 0, :n_classes])
+        roots.append(offset)
+        offset += tree.node_count
+
+    classes = np.asarray(estimator.classes_)
+    if classes.dtype == object:
+        classes = classes.astype(str)
+
+    return {
+        "kind": np.array(kind),
+        "n_features": np.array(estimator.n_features_in_),
+        "max_depth": np.array(max(tree.max_depth for tree in trees)),
+        "dense_steps": np.array(dense_steps(trees)),
+        "classes": classes,
+        # Indices are stored as intp so they can be used for gathers without conversion
+        "feature": np.concatenate(features).astype(np.intp),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "children": np.concatenate(children).astype(np.intp),
+        "is_leaf": np.concatenate(leaves),
+        "value": np.concatenate(values).astype(np.float64),
+        "roots": np.array(roots, dtype=np.intp),
+    }
+
+
+def save_compiled(path, arrays):
+    # Written next to the destination and renamed into place, so readers never see a partial model
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path, mmap=True):
+    arrays = {}
+    for filename in os.listdir(path):
+        name, ext = os.path.splitext(filename)
+        if ext == ".npy":
+            arrays[name] = np.load(os.path.join(path, filename), mmap_mode="r" if mmap else None,
+                                   allow_pickle=False)
+    return CompiledTreeModel(arrays)
+
+
+class CompiledTreeModel:
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.max_depth = int(arrays["max_depth"])
+        self.dense_steps = min(int(arrays["dense_steps"]), self.max_depth)
+        self.classes_ = arrays["classes"]
+        # Used as stored (possibly memory-mapped); astype(copy=False) only copies on a platform mismatch
+        self.feature = arrays["feature"].astype(np.intp, copy=False)
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"].astype(np.intp, copy=False)
+        self.is_leaf = arrays["is_leaf"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"].astype(np.intp, copy=False)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _validate(self, X):
+        # sklearn evaluates trees on float32 inputs; do the same so thresholds compare identically
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, but the model expects {self.n_features_in_} features")
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        return X
+
+    def _chunks(self, X):
+        X = self._validate(X)
+        for start in range(0, len(X), CHUNK_ROWS):
+            yield start, self._apply_chunk(X[start:start + CHUNK_ROWS])
+
+    def apply(self, X):
+        # Leaf index (into the flat node table) of every row in every tree
+        leaves = np.empty((len(X), self.n_trees), dtype=np.intp)
+        for start, chunk in self._chunks(X):
+            leaves[start:start + len(chunk)] = chunk
+        return leaves
+
+    def _apply_chunk(self, X):
+        rows, trees = len(X), self.n_trees
+        flat = X.ravel()
+        # One entry per (row, tree) pair, row-major
+        nodes = np.tile(self.roots, rows)
+        row_offsets = np.repeat(np.arange(rows, dtype=np.intp) * self.n_features_in_, trees)
+
+        # Upper levels: nearly every pair is still descending, so step them all
+        for _ in range(self.dense_steps):
+            go_right = flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(nodes * 2 + go_right)
+
+        # Lower levels: only step the pairs that have not reached a leaf yet
+        active = np.flatnonzero(~self.is_leaf.take(nodes))
+        for _ in range(self.max_depth - self.dense_steps):
+            if not len(active):
+                break
+            current = nodes.take(active)
+            go_right = flat.take(row_offsets.take(active) + self.feature.take(current)) > self.threshold.take(current)
+            current = self.children.take(current * 2 + go_right)
+            nodes[active] = current
+            active = active[~self.is_leaf.take(current)]
+        return nodes.reshape(rows, trees)
+
+    def predict_proba(self, X):
+        proba = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        for start, leaves in self._chunks(X):
+            out = proba[start:start + len(leaves)]
+            if self.kind == "tree":
+                out[:] = self.value[leaves[:, 0]]
+                continue
+            # Sum tree by tree in estimator order, exactly like sklearn's forest
+            for tree in range(self.n_trees):
+                out += self.value[leaves[:, tree]]
+            out /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class SizeRoutedModel:
+    # A compiled model that hands inputs of max_rows rows or more to the sklearn estimator,
+    # loaded by load_estimator() at warmup, or on first use if the model was not warmed up
+    def __init__(self, compiled, load_estimator, max_rows):
+        self.compiled = compiled
+        self.max_rows = max_rows
+        self._load_estimator = load_estimator
+        self._estimator = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # classes_, n_features_in_, n_trees, ...
+        return getattr(self.compiled, name)
+
+    def load_estimator(self):
+        with self._lock:
+            if self._estimator is None and self._load_estimator is not None:
+                try:
+                    self._estimator = self._load_estimator()
+                except (ImportError, OSError) as e:
+                    # sklearn is not installed or the pickle is gone; keep using the compiled model
+                    print(f"Scoring large inputs with the compiled model: {e}")
+                    self._load_estimator = None
+        return self._estimator
+
+    def _model_for(self, X):
+        if len(X) < self.max_rows or self._load_estimator is None:
+            return self.compiled
+        estimator = self.load_estimator()
+        return self.compiled if estimator is None else estimator
+
+    def predict_proba(self, X):
+        return self._model_for(X).predict_proba(X)
+
+    def predict(self, X):
+        return self._model_for(X).predict(X)
+
+
+def check_parity(estimator, compiled, X):
+    # Number of differing predictions and the largest probability difference against sklearn
+    expected_proba = estimator.predict_proba(X)
+    actual_proba = compiled.predict_proba(X)
+    expected = np.asarray(estimator.predict(X)).astype(compiled.classes_.dtype)
+    actual = compiled.predict(X)
+    return {
+        "rows": len(X),
+        "prediction_mismatches": int(np.count_nonzero(expected != actual)),
+        "max_proba_difference": float(np.max(np.abs(expected_proba - actual_proba))) if len(X) else 0.0,
+    }